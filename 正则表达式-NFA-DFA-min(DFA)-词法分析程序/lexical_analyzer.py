@@ -10,10 +10,18 @@
 
 import re
 import json
-from typing import Dict, List, Set, Tuple, Optional, Union
+import time
+from typing import Dict, List, Set, FrozenSet, Tuple, Optional, Union, Iterator, TextIO, Callable
 from enum import Enum
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import defaultdict, deque
+from bisect import bisect_right
+from array import array
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
 
 
 # ==================== Token定义 ====================
@@ -85,6 +93,51 @@ class Token:
         return f"Token({self.type.value}, '{self.value}', {self.line}:{self.column})"
 
 
+class SourceToken:
+    """引用源文本的Token（零拷贝）
+
+    只保存类型和在源文本中的区间 [start, end)，所有Token共用同一份源文本，
+    value、line、column 在访问时才由源文本切片、由行首偏移索引换算。
+    只需要Token类型的后续阶段不会为每个Token分配字符串。
+    """
+
+    __slots__ = ('type', 'source', 'start', 'end', 'line_index')
+
+    def __init__(self, token_type: TokenType, source: str, start: int, end: int,
+                 line_index: 'LineIndex'):
+        self.type = token_type
+        self.source = source
+        self.start = start
+        self.end = end
+        self.line_index = line_index
+
+    @property
+    def value(self) -> str:
+        return self.source[self.start:self.end]
+
+    @property
+    def line(self) -> int:
+        return self.line_index.position(self.start)[0]
+
+    @property
+    def column(self) -> int:
+        return self.line_index.position(self.start)[1]
+
+    def to_token(self) -> Token:
+        """生成内容相同的 Token 对象"""
+        line, column = self.line_index.position(self.start)
+        return Token(self.type, self.value, line, column)
+
+    def __eq__(self, other):
+        if not isinstance(other, (Token, SourceToken)):
+            return NotImplemented
+        return (self.type == other.type and self.value == other.value
+                and self.line == other.line and self.column == other.column)
+
+    __hash__ = None
+    __str__ = Token.__str__
+
+
 # ==================== 自动机相关类 ====================
 
 class State:
@@ -125,12 +178,15 @@ class NFA:
         self.accept_states: Set[State] = set()
         self.alphabet: Set[str] = set()
         self.state_counter = 0
+        # ε闭包表（见 closure_table），增加状态或ε转移时作废
+        self._closures: Optional[Tuple[List[State], Dict[State, int], List[int]]] = None
     
     def create_state(self) -> State:
         """创建新状态"""
         state = State(self.state_counter)
         self.state_counter += 1
         self.states.add(state)
+        self._closures = None
         return state
     
     def set_start(self, state: State):
@@ -149,20 +205,54 @@ class NFA:
         from_state.add_transition(symbol, to_state)
         if symbol != 'ε':  # ε不加入字母表
             self.alphabet.add(symbol)
+        else:
+            self._closures = None
     
-    def epsilon_closure(self, states: Set[State]) -> Set[State]:
-        """计算状态集合的ε闭包"""
-        closure = set(states)
-        stack = list(states)
+    def closure_table(self) -> Tuple[List[State], Dict[State, int], List[int]]:
+        """预先算好的各状态ε闭包（位集），NFA不变时只计算一次
         
-        while stack:
-            current = stack.pop()
-            for next_state in current.get_transitions('ε'):
-                if next_state not in closure:
-                    closure.add(next_state)
-                    stack.append(next_state)
-        
-        return closure
+        状态按编号稠密排列，第 i 个状态对应第 i 位。
+        返回 (按编号排列的状态, 状态 -> 位下标, 各状态ε闭包的位集)。
+        """
+        if self._closures is None:
+            order = sorted(self.states, key=lambda state: state.id)
+            bit_of = {state: index for index, state in enumerate(order)}
+            masks = [0] * len(order)
+            for index, state in enumerate(order):
+                mask = 1 << index
+                stack = [state]
+                while stack:
+                    for target in stack.pop().transitions.get('ε', ()):
+                        target_index = bit_of[target]
+                        if mask >> target_index & 1:
+                            continue
+                        if masks[target_index]:
+                            # 已算好的闭包直接并入，不再沿它的ε转移搜索
+                            mask |= masks[target_index]
+                        else:
+                            mask |= 1 << target_index
+                            stack.append(target)
+                masks[index] = mask
+            self._closures = (order, bit_of, masks)
+        return self._closures
+    
+    def states_of(self, mask: int) -> FrozenSet[State]:
+        """位集 mask（见 closure_table）对应的状态集合"""
+        order = self.closure_table()[0]
+        states = []
+        while mask:
+            low = mask & -mask
+            states.append(order[low.bit_length() - 1])
+            mask ^= low
+        return frozenset(states)
+    
+    def epsilon_closure(self, states: Set[State]) -> Set[State]:
+        """计算状态集合的ε闭包（由预先算好的各状态闭包位集合并）"""
+        _, bit_of, masks = self.closure_table()
+        mask = 0
+        for state in states:
+            mask |= masks[bit_of[state]]
+        return set(self.states_of(mask))
 
 
 class DFA:
@@ -242,54 +332,78 @@ class RegexToNFA:
 
 
 class NFAToDFA:
-    """NFA到DFA转换器（子集构造法）"""
+    """NFA到DFA转换器（子集构造法）
+    
+    NFA状态集合表示为位集（见 NFA.closure_table），各NFA状态在每个符号下的
+    后继的ε闭包预先算好，move 加闭包只是若干次按位或；
+    位集为键索引已有的DFA状态，查找为O(1)；工作队列使用 deque。
+    总耗时与输出DFA的规模大致成线性关系。
+    """
+    
+    def __init__(self):
+        # 最近一次转换的统计：DFA状态数、转移数、耗时（秒）
+        self.stats: Dict[str, float] = {}
     
     def convert(self, nfa: NFA) -> DFA:
         """将NFA转换为DFA"""
+        started = time.perf_counter()
         dfa = DFA()
         dfa.alphabet = nfa.alphabet.copy()
         
-        # 计算初始状态的ε闭包
-        start_closure = nfa.epsilon_closure({nfa.start_state})
-        start_id = dfa.create_state(start_closure)
+        # 各NFA状态在每个符号下的后继的ε闭包位集；只有非ε出边的状态才需要查看
+        order, bit_of, masks = nfa.closure_table()
+        steps: List[Dict[str, int]] = []
+        movable = 0
+        for index, nfa_state in enumerate(order):
+            step: Dict[str, int] = {}
+            for symbol, targets in nfa_state.transitions.items():
+                if symbol != 'ε':
+                    mask = 0
+                    for target in targets:
+                        mask |= masks[bit_of[target]]
+                    step[symbol] = mask
+            if step:
+                movable |= 1 << index
+            steps.append(step)
+        
+        # 初始状态的ε闭包
+        start_mask = masks[bit_of[nfa.start_state]]
+        start_id = dfa.create_state(nfa.states_of(start_mask))
         dfa.start_state = start_id
         
-        # 工作队列
-        unprocessed = [start_id]
-        processed = set()
+        # NFA状态位集 -> DFA状态ID
+        state_ids: Dict[int, int] = {start_mask: start_id}
+        unprocessed = deque([start_mask])
         
         while unprocessed:
-            current_id = unprocessed.pop(0)
-            if current_id in processed:
-                continue
-            processed.add(current_id)
+            current_mask = unprocessed.popleft()
+            current_id = state_ids[current_mask]
             
-            current_nfa_states = dfa.states[current_id]
+            # 按符号合并各NFA状态的后继闭包，即 move 之后再取ε闭包
+            moves: Dict[str, int] = {}
+            mask = current_mask & movable
+            while mask:
+                low = mask & -mask
+                for symbol, target in steps[low.bit_length() - 1].items():
+                    moves[symbol] = moves.get(symbol, 0) | target
+                mask ^= low
             
-            # 对每个输入符号
-            for symbol in dfa.alphabet:
-                # 计算转移目标
-                target_states = set()
-                for nfa_state in current_nfa_states:
-                    target_states.update(nfa_state.get_transitions(symbol))
+            for symbol in sorted(moves):
+                # 查找或创建目标DFA状态
+                target_mask = moves[symbol]
+                target_id = state_ids.get(target_mask)
+                if target_id is None:
+                    target_id = dfa.create_state(nfa.states_of(target_mask))
+                    state_ids[target_mask] = target_id
+                    unprocessed.append(target_mask)
                 
-                if target_states:
-                    # 计算ε闭包
-                    target_closure = nfa.epsilon_closure(target_states)
-                    
-                    # 查找或创建目标DFA状态
-                    target_id = None
-                    for existing_id, existing_states in dfa.states.items():
-                        if existing_states == target_closure:
-                            target_id = existing_id
-                            break
-                    
-                    if target_id is None:
-                        target_id = dfa.create_state(target_closure)
-                        unprocessed.append(target_id)
-                    
-                    dfa.add_transition(current_id, symbol, target_id)
+                dfa.add_transition(current_id, symbol, target_id)
         
+        self.stats = {
+            'states': len(dfa.states),
+            'transitions': len(dfa.transitions),
+            'time': time.perf_counter() - started,
+        }
         return dfa
 
 
@@ -332,14 +446,180 @@ class DFAMinimizer:
 
 # ==================== 词法分析器 ====================
 
+# 关键字字母数不超过该值时预先展开全部大小写形式（2^n 个），更长的关键字查表前转小写
+KEYWORD_VARIANT_LIMIT = 12
+
+
+def keyword_variants(keyword: str) -> List[str]:
+    """返回关键字的全部大小写形式"""
+    variants = ['']
+    for char in keyword:
+        cases = {char.lower(), char.upper()}
+        variants = [prefix + case for prefix in variants for case in cases]
+    return variants
+
+
+# 默认起始条件：不带起始条件的规则在其中生效，分析总是从它开始
+INITIAL_MODE = 'INITIAL'
+
+# 规则文件中的起始条件前缀：<COMMENT>、<STR,CHAR>，<*> 表示全部起始条件
+MODE_PREFIX = re.compile(r'<(\*|[A-Za-z_]\w*(?:\s*,\s*[A-Za-z_]\w*)*)>')
+
+# 规则动作：push:模式 / pop / begin:模式 切换起始条件，more 把本段文本并入下一个Token
+RULE_ACTIONS = ('push', 'pop', 'begin', 'more')
+
+# 错误信息条数上限，超出的错误只计数，分析结束时追加一条汇总（None 表示不限）
+MAX_ERRORS = 100
+
+# 错误信息中一段未识别字符最多显示的字符数
+ERROR_PREVIEW = 20
+
+# 字符类中的 \d、\w 等类别 -> 正则写法
+_CATEGORY_CLASSES = {
+    sre_parse.CATEGORY_DIGIT: r'\d', sre_parse.CATEGORY_NOT_DIGIT: r'\D',
+    sre_parse.CATEGORY_SPACE: r'\s', sre_parse.CATEGORY_NOT_SPACE: r'\S',
+    sre_parse.CATEGORY_WORD: r'\w', sre_parse.CATEGORY_NOT_WORD: r'\W',
+}
+
+# Python 3.11 新增的结构，旧版本中不存在
+_POSSESSIVE_REPEAT = getattr(sre_parse, 'POSSESSIVE_REPEAT', None)
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+
+
+def _class_text(items) -> Optional[str]:
+    """把语法树中的字符类（IN 的内容）还原为 [...] 写法，含无法还原的成员时返回None"""
+    negate = ''
+    body = []
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = '^'
+        elif op is sre_parse.LITERAL:
+            body.append(re.escape(chr(av)))
+        elif op is sre_parse.RANGE:
+            body.append(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+        elif op is sre_parse.CATEGORY and av in _CATEGORY_CLASSES:
+            body.append(_CATEGORY_CLASSES[av])
+        else:
+            return None
+    return f"[{negate}{''.join(body)}]"
+
+
+def _first_chars(items) -> Tuple[Optional[List[str]], bool]:
+    """求正则语法树能匹配的首字符
+
+    返回 (首字符的字符类写法列表, 能否匹配空串)，含无法分析的结构时返回 (None, True)。
+    锚点和环视不消耗字符，按可空处理（忽略环视的限制只会使首字符集合偏大）。
+    """
+    parts: List[str] = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            return parts + [re.escape(chr(av))], False
+        if op is sre_parse.NOT_LITERAL:
+            return parts + [f"[^{re.escape(chr(av))}]"], False
+        if op is sre_parse.ANY:
+            return parts + [r'[\s\S]'], False
+        if op is sre_parse.IN:
+            part = _class_text(av)
+            if part is None:
+                return None, True
+            return parts + [part], False
+        if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue
+
+        if op is sre_parse.SUBPATTERN:
+            if av[1] & re.IGNORECASE:
+                return None, True
+            alternatives = [av[3]]
+        elif op is sre_parse.BRANCH:
+            alternatives = av[1]
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, _POSSESSIVE_REPEAT):
+            alternatives = [av[2]]
+        elif op is _ATOMIC_GROUP:
+            alternatives = [av]
+        else:
+            return None, True
+
+        nullable = False
+        for alternative in alternatives:
+            first, empty = _first_chars(alternative)
+            if first is None:
+                return None, True
+            parts.extend(first)
+            nullable = nullable or empty
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, _POSSESSIVE_REPEAT) and av[0] == 0:
+            nullable = True
+        if not nullable:
+            return parts, False
+    return parts, True
+
+
+def start_char_regex(patterns: List[str]) -> Optional['re.Pattern']:
+    """把一组规则的首字符集合合并为一个正则，文本中不被它匹配的位置不可能开始任何Token
+
+    错误恢复时据此直接跳过不可能开始Token的字符。有规则无法分析首字符
+    （含反向引用、忽略大小写、能匹配空串等）时返回None，表示每个位置都可能开始Token。
+    """
+    parts: List[str] = []
+    for pattern in patterns:
+        try:
+            parsed = sre_parse.parse(pattern)
+        except re.error:
+            return None
+        # 解析结果的全局状态在 Python 3.8 之前名为 pattern
+        state = getattr(parsed, 'state', None) or parsed.pattern
+        if state.flags & re.IGNORECASE:
+            return None
+        first, nullable = _first_chars(parsed)
+        if first is None or nullable:
+            return None
+        parts.extend(first)
+    if not parts:
+        return None
+    return re.compile('|'.join(dict.fromkeys(parts)))
+
+
+class LineIndex:
+    """源文本的行首偏移索引
+
+    构建时一次性找出全部换行符，之后由偏移求 (行号, 列号) 只需一次二分查找。
+    只有 '\\n' 算作换行，行号、列号都从1开始。
+    """
+
+    def __init__(self, text: str):
+        self.starts = array('q', [0])
+        self.starts.extend(match.end() for match in re.finditer('\n', text))
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """偏移 offset 对应的 (行号, 列号)"""
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+
 class LexicalAnalyzer:
     """词法分析器主类"""
     
     def __init__(self):
-        self.rules: List[Tuple[str, TokenType, int]] = []  # (pattern, token_type, priority)
+        # (pattern, token_type, priority) 或 (pattern, token_type, priority, modes, action)
+        # modes 为规则生效的起始条件元组（空元组表示 INITIAL 及全部包含型起始条件，'*' 表示全部），
+        # action 为规则动作字符串（如 'push:COMMENT'、'pop'、'push:STR,more'），无动作时为None
+        self.rules: List[tuple] = []
+        # 已声明的起始条件：名称 -> 是否为排他型（%x，只有标明该起始条件的规则生效）
+        self.modes: Dict[str, bool] = {}
         self.keywords: Dict[str, TokenType] = {}
-        self.tokens: List[Token] = []
+        self.tokens: List[Union[Token, SourceToken]] = []
         self.errors: List[str] = []
+        # 错误信息条数上限（None 表示不限），超出部分只计数
+        self.max_errors: Optional[int] = MAX_ERRORS
+        self._suppressed_errors = 0
+        # 编译缓存：规则集不变时复用各起始条件合并后的主正则
+        self._compiled_key: Optional[tuple] = None
+        self._matchers: Dict[str, Callable] = {}
+        # 各起始条件下查找下一个可能开始Token的位置（首字符正则的 search），无法确定时为None
+        self._start_searchers: Dict[str, Optional[Callable]] = {}
+        # 关键字查找表：以Token原文为键（含全部大小写形式），识别标识符时无需转小写
+        self._keyword_key: Optional[tuple] = None
+        self._keyword_table: Dict[str, TokenType] = {}
+        self._long_keywords: Dict[str, TokenType] = {}
         self._init_default_rules()
     
     def _init_default_rules(self):
@@ -404,92 +684,522 @@ class LexicalAnalyzer:
             (r'[ \t]+', TokenType.WHITESPACE, 1),
         ]
     
+    def declare_mode(self, name: str, exclusive: bool = True):
+        """声明起始条件（exclusive 对应 flex 的 %x，否则对应 %s）"""
+        if name == INITIAL_MODE or not re.fullmatch(r'[A-Za-z_]\w*', name):
+            raise ValueError(f"无效的起始条件名 '{name}'")
+        self.modes[name] = exclusive
+    
     def load_rules_from_file(self, filename: str) -> bool:
-        """从文件加载词法规则"""
+        """从文件加载词法规则
+
+        文件中的规则取代默认规则和已声明的起始条件（关键字保持不变）：
+        默认规则与文件中同优先级的规则排序时在前，若保留，会先于文件规则被匹配。
+        """
         try:
             with open(filename, 'r', encoding='utf-8') as f:
                 content = f.read().strip()
                 if content:
+                    self.rules = []
+                    self.modes = {}
                     # 简单的规则文件格式：每行一个规则
-                    # 格式：pattern|token_type|priority
+                    # 格式：[<起始条件>]pattern|token_type[|priority[|action]]
+                    # 起始条件声明：%x NAME ...（排他型）或 %s NAME ...（包含型）
                     lines = content.split('\n')
                     for line in lines:
                         if line.strip() and not line.startswith('#'):
-                            parts = line.split('|')
-                            if len(parts) >= 2:
-                                pattern = parts[0].strip()
-                                token_type_str = parts[1].strip()
-                                priority = int(parts[2].strip()) if len(parts) > 2 else 5
-                                
-                                # 查找对应的TokenType
-                                token_type = None
-                                for tt in TokenType:
-                                    if tt.value == token_type_str:
-                                        token_type = tt
-                                        break
-                                
-                                if token_type:
+                            if line.startswith(('%x', '%s')):
+                                for name in line[2:].split():
+                                    self.declare_mode(name, exclusive=line[1] == 'x')
+                                continue
+                            
+                            modes = ()
+                            prefix = MODE_PREFIX.match(line)
+                            if prefix:
+                                modes = tuple(name.strip() for name in prefix.group(1).split(','))
+                                line = line[prefix.end():]
+                            
+                            rule = self._parse_rule_line(line)
+                            if rule:
+                                pattern, token_type, priority, action = rule
+                                if modes or action:
+                                    self.rules.append((pattern, token_type, priority, modes, action))
+                                else:
                                     self.rules.append((pattern, token_type, priority))
             return True
         except Exception as e:
             self.errors.append(f"加载规则文件失败: {e}")
             return False
     
-    def analyze(self, text: str) -> List[Token]:
-        """执行词法分析"""
+    @staticmethod
+    def _parse_rule_line(line: str) -> Optional[Tuple[str, TokenType, int, Optional[str]]]:
+        """解析一行规则，返回 (pattern, token_type, priority, action)，类型未知时返回None
+
+        模式本身可能含有 '|'（如 '([^'\\]|\\.)*'），因此从右侧识别各字段：
+        依次尝试 pattern|type|priority|action、pattern|type|priority、pattern|type。
+        """
+        parts = line.split('|')
+        token_types = {tt.value: tt for tt in TokenType}
+        
+        def is_priority(field: str) -> bool:
+            return re.fullmatch(r'\s*-?\d+\s*', field) is not None
+        
+        def is_action(field: str) -> bool:
+            return all(part.strip().split(':', 1)[0] in RULE_ACTIONS for part in field.split(','))
+        
+        if (len(parts) >= 4 and parts[-3].strip() in token_types
+                and is_priority(parts[-2]) and is_action(parts[-1])):
+            field_count, priority, action = 3, int(parts[-2]), parts[-1].strip()
+        elif len(parts) >= 3 and parts[-2].strip() in token_types and is_priority(parts[-1]):
+            field_count, priority, action = 2, int(parts[-1]), None
+        elif len(parts) >= 2:
+            field_count, priority, action = 1, 5, None
+        else:
+            return None
+        
+        token_type = token_types.get(parts[-field_count].strip())
+        if token_type is None:
+            return None
+        pattern = '|'.join(parts[:-field_count]).strip()
+        return pattern, token_type, priority, action
+    
+    def _compile_rules(self):
+        """编译词法规则（按规则集缓存）
+
+        对每个起始条件，将其中生效的规则按优先级排序后合并为一个命名分组的选择式主正则，
+        re 对选择式按从左到右的顺序尝试，与逐条按优先级匹配的结果一致。
+        处于某个起始条件时只尝试该条件下的规则（如注释内部只有一两条规则）。
+        规则无法合并时（如含编号反向引用、非起始位置的全局标志）
+        退回逐条匹配，但每条规则也只编译一次。
+        """
+        key = (tuple(self.rules), tuple(self.modes.items()))
+        if key == self._compiled_key:
+            return
+
+        specs = [self._rule_spec(rule) for rule in self.rules]
+        # sorted 是稳定排序，同优先级规则保持原有先后顺序
+        ordered = sorted(specs, key=lambda x: x[2], reverse=True)
+
+        self._matchers = {}
+        self._start_searchers = {}
+        for mode in [INITIAL_MODE, *self.modes]:
+            exclusive = self.modes.get(mode, False)
+            active = [(pattern, token_type, action)
+                      for pattern, token_type, _, modes, action in ordered
+                      if mode in modes or '*' in modes or (not modes and not exclusive)]
+            self._matchers[mode] = self._build_matcher(active)
+            start_chars = start_char_regex([pattern for pattern, _, _ in active])
+            self._start_searchers[mode] = start_chars.search if start_chars else None
+
+        self._compiled_key = key
+
+    def _rule_spec(self, rule: tuple) -> Tuple[str, TokenType, int, Tuple[str, ...], Optional[tuple]]:
+        """把规则统一为 (pattern, token_type, priority, modes, action)，并检查起始条件已声明
+
+        action 解析为 ((操作, 起始条件或None), ...)，无动作时为None。
+        """
+        pattern, token_type, priority, *extra = rule
+        modes = tuple(extra[0]) if extra and extra[0] else ()
+        known = {INITIAL_MODE, *self.modes}
+        for mode in modes:
+            if mode != '*' and mode not in known:
+                raise ValueError(f"规则 {pattern} 使用了未声明的起始条件 '{mode}'")
+
+        action = None
+        if len(extra) > 1 and extra[1]:
+            steps = []
+            for part in extra[1].split(','):
+                operation, _, mode = part.strip().partition(':')
+                if operation not in RULE_ACTIONS or bool(mode) != (operation in ('push', 'begin')):
+                    raise ValueError(f"规则 {pattern} 的动作 '{part.strip()}' 无法识别")
+                if mode and mode not in known:
+                    raise ValueError(f"规则 {pattern} 的动作使用了未声明的起始条件 '{mode}'")
+                steps.append((operation, mode or None))
+            action = tuple(steps)
+        return pattern, token_type, priority, modes, action
+
+    @staticmethod
+    def _build_matcher(rules: List[Tuple[str, TokenType, Optional[tuple]]]) -> Callable:
+        """为一组已按优先级排序的规则生成匹配函数
+
+        返回的函数 match_rule(text, position) 给出 (match, token_type, action)，
+        无匹配时返回 (None, None, None)。
+        """
+        master = None
+        if not any(re.search(r'\\[1-9]|\(\?P=', pattern) for pattern, _, _ in rules):
+            parts = [f"(?P<_rule{i}>{pattern})" for i, (pattern, _, _) in enumerate(rules)]
+            try:
+                master = re.compile('|'.join(parts)) if parts else None
+            except re.error:
+                master = None
+
+        if master is not None:
+            # 以分组编号索引Token类型和动作，匹配后用 lastindex 直接取得所属规则
+            group_types: List[Optional[TokenType]] = [None] * (master.groups + 1)
+            group_actions: List[Optional[tuple]] = [None] * (master.groups + 1)
+            for i, (_, token_type, action) in enumerate(rules):
+                group = master.groupindex[f"_rule{i}"]
+                group_types[group] = token_type
+                group_actions[group] = action
+            master_match = master.match
+
+            def match_rule(text: str, position: int):
+                match = master_match(text, position)
+                if match:
+                    group = match.lastindex
+                    return match, group_types[group], group_actions[group]
+                return None, None, None
+
+            return match_rule
+
+        compiled = [(re.compile(pattern), token_type, action) for pattern, token_type, action in rules]
+
+        def match_rule(text: str, position: int):
+            for regex, token_type, action in compiled:
+                match = regex.match(text, position)
+                if match:
+                    return match, token_type, action
+            return None, None, None
+
+        return match_rule
+
+    def _compile_keywords(self):
+        """按当前关键字集合构建（或复用）以原文为键的关键字查找表"""
+        key = tuple(self.keywords.items())
+        if key == self._keyword_key:
+            return
+        self._keyword_table = {}
+        self._long_keywords = {}
+        for keyword, token_type in self.keywords.items():
+            if keyword != keyword.lower():
+                # 标识符总是转小写后再比较，含大写字母的关键字永远不会被识别
+                continue
+            if sum(char.isalpha() for char in keyword) <= KEYWORD_VARIANT_LIMIT:
+                for variant in keyword_variants(keyword):
+                    self._keyword_table.setdefault(variant, token_type)
+            else:
+                self._long_keywords.setdefault(keyword, token_type)
+        self._keyword_key = key
+
+    def _lookup_keyword(self, value: str) -> Optional[TokenType]:
+        """查找标识符对应的关键字类型，不是关键字时返回None"""
+        keyword = self._keyword_table.get(value)
+        if keyword is None and self._long_keywords:
+            keyword = self._long_keywords.get(value.lower())
+        return keyword
+
+    def _match_rule(self, text: str, position: int, mode: str = INITIAL_MODE):
+        """在指定位置按起始条件 mode 匹配规则，返回 (match, token_type, action)，无匹配时返回 (None, None, None)"""
+        return self._matchers[mode](text, position)
+
+    @staticmethod
+    def _apply_action(action: tuple, mode_stack: List[str]) -> bool:
+        """执行规则动作，更新起始条件栈；返回本段文本是否并入下一个Token（more）"""
+        more = False
+        for operation, mode in action:
+            if operation == 'push':
+                mode_stack.append(mode)
+            elif operation == 'pop':
+                if len(mode_stack) > 1:
+                    mode_stack.pop()
+            elif operation == 'begin':
+                mode_stack[-1] = mode
+            else:
+                more = True
+        return more
+
+    @staticmethod
+    def _error_run_end(text: str, position: int, match_rule: Callable,
+                       find_start: Optional[Callable]) -> int:
+        """position 处无法匹配时，返回这段错误字符的结束位置（其后第一个能匹配规则的位置）
+
+        借助首字符正则跳过不可能开始Token的字符，只在可能的位置尝试匹配。
+        """
+        length = len(text)
+        end = position + 1
+        while end < length:
+            if find_start is not None:
+                found = find_start(text, end)
+                if found is None:
+                    return length
+                end = found.start()
+            if match_rule(text, end)[0]:
+                return end
+            end += 1
+        return length
+
+    @staticmethod
+    def _may_start(find_start: Optional[Callable], text: str, position: int) -> bool:
+        """position 处的字符能否开始某条规则的匹配（无法确定时为真）"""
+        return find_start is None or find_start(text, position, position + 1) is not None
+
+    @staticmethod
+    def _advance_position(line: int, column: int, value: str) -> Tuple[int, int]:
+        """流式分析中越过一段文本之后的 (行号, 列号)"""
+        newline = value.rfind('\n')
+        if newline < 0:
+            return line, column + len(value)
+        return line + value.count('\n'), len(value) - newline
+
+    def _record_error(self, message: str):
+        """记录一条错误信息，超过 max_errors 条后只计数"""
+        if self.max_errors is not None and len(self.errors) >= self.max_errors:
+            self._suppressed_errors += 1
+            return
+        self.errors.append(message)
+
+    def _report_error(self, value: str, line: int, column: int):
+        """记录一段未识别的字符"""
+        if len(value) == 1:
+            self._record_error(f"未识别的字符 '{value}' 在 {line}:{column}")
+        else:
+            preview = value if len(value) <= ERROR_PREVIEW else value[:ERROR_PREVIEW] + '...'
+            self._record_error(f"未识别的字符序列 '{preview}'（共 {len(value)} 个字符）在 {line}:{column}")
+
+    def _finish_errors(self):
+        """分析结束时为超出上限而未记录的错误追加一条汇总"""
+        if self._suppressed_errors:
+            self.errors.append(f"另有 {self._suppressed_errors} 处错误未列出")
+
+    def _finish_modes(self, mode_stack: List[str], pending: List[str],
+                      pending_line: int, pending_column: int) -> Optional[Token]:
+        """输入结束时检查起始条件：未完成的 more 文本作为错误Token返回"""
+        if pending:
+            value = ''.join(pending)
+            self._record_error(f"未结束的Token '{value}' 在 {pending_line}:{pending_column}")
+            return Token(TokenType.ERROR, value, pending_line, pending_column)
+        if self.modes.get(mode_stack[-1]):
+            self._record_error(f"输入在起始条件 {mode_stack[-1]} 中结束")
+        return None
+
+    def analyze(self, text: str, lazy_values: bool = False) -> List[Union[Token, SourceToken]]:
+        """执行词法分析
+
+        分析循环只记录偏移，产生Token时才由行首偏移索引换算行号和列号，
+        跨行的Token（多行注释、字符串）之后的位置同样正确。
+
+        lazy_values 为 True 时产生引用源文本的 SourceToken：不切片Token的值、
+        不换算行列，访问时才计算。只需要Token类型时可省去绝大部分字符串分配。
+        """
         self.tokens = []
         self.errors = []
-        
-        line = 1
-        column = 1
+        self._suppressed_errors = 0
+        self._compile_rules()
+        self._compile_keywords()
+        matchers = self._matchers
+        match_rule = matchers[INITIAL_MODE]
+        start_searchers = self._start_searchers
+        lookup_keyword = self._lookup_keyword if self._long_keywords else self._keyword_table.get
+        line_index = LineIndex(text)
+        position_of = line_index.position
+        line_starts = line_index.starts
+
         position = 0
-        
+        # 起始条件栈；pending 为 more 动作累积、尚未产生Token的文本，pending_start 为其起始偏移
+        mode_stack = [INITIAL_MODE]
+        pending: List[str] = []
+        pending_start = 0
+
         while position < len(text):
             matched = False
-            
-            # 按优先级尝试匹配规则
-            for pattern, token_type, priority in sorted(self.rules, key=lambda x: x[2], reverse=True):
-                regex = re.compile(pattern)
-                match = regex.match(text, position)
-                
-                if match:
-                    value = match.group(0)
-                    
-                    # 检查是否为关键字
-                    if token_type == TokenType.IDENTIFIER and value.lower() in self.keywords:
-                        token_type = self.keywords[value.lower()]
-                    
-                    # 创建Token（跳过空白字符和注释）
-                    if token_type not in [TokenType.WHITESPACE, TokenType.COMMENT]:
-                        token = Token(token_type, value, line, column)
-                        self.tokens.append(token)
-                    
-                    # 更新位置
-                    if token_type == TokenType.NEWLINE:
-                        line += 1
-                        column = 1
+
+            # 单次匹配即得到当前起始条件下优先级最高的规则
+            match, token_type, action = match_rule(text, position)
+
+            if match:
+                token_start = position
+                position = match.end()
+                matched = True
+
+                # 执行规则动作（切换起始条件），more 的文本留给下一个Token
+                if action is not None:
+                    more = self._apply_action(action, mode_stack)
+                    match_rule = matchers[mode_stack[-1]]
+                    if more:
+                        if not pending:
+                            pending_start = token_start
+                        pending.append(match.group(0))
+                        continue
+                # value 为None表示Token的值就是源文本 [token_start, position)
+                value = None
+                if pending:
+                    # more 累积的文本之间可能夹着错误字符，此时值不是源文本中连续的一段
+                    value = ''.join(pending) + match.group(0)
+                    token_start = pending_start
+                    pending = []
+                    if len(value) == position - token_start:
+                        value = None
+
+                # 检查是否为关键字（按原文查表，不分配小写字符串）
+                if token_type is TokenType.IDENTIFIER:
+                    word = text[token_start:position] if value is None else value
+                    token_type = lookup_keyword(word) or token_type
+
+                # 创建Token（跳过空白字符和注释）
+                if token_type not in [TokenType.WHITESPACE, TokenType.COMMENT]:
+                    if lazy_values and value is None:
+                        token = SourceToken(token_type, text, token_start, position, line_index)
                     else:
-                        column += len(value)
-                    
-                    position = match.end()
-                    matched = True
-                    break
-            
+                        line = bisect_right(line_starts, token_start)
+                        token = Token(token_type, text[token_start:position] if value is None else value,
+                                      line, token_start - line_starts[line - 1] + 1)
+                    self.tokens.append(token)
+
             if not matched:
-                # 未匹配的字符
-                char = text[position]
-                self.errors.append(f"未识别的字符 '{char}' 在 {line}:{column}")
-                error_token = Token(TokenType.ERROR, char, line, column)
+                # 未匹配的字符：一直跳到下一个能匹配规则的位置，整段只产生一个错误Token
+                end = self._error_run_end(text, position, match_rule, start_searchers[mode_stack[-1]])
+                value = text[position:end]
+                line, column = position_of(position)
+                self._report_error(value, line, column)
+                if lazy_values:
+                    error_token = SourceToken(TokenType.ERROR, text, position, end, line_index)
+                else:
+                    error_token = Token(TokenType.ERROR, value, line, column)
                 self.tokens.append(error_token)
-                position += 1
-                column += 1
+                position = end
+        
+        unfinished = self._finish_modes(mode_stack, pending, *position_of(pending_start))
+        if unfinished:
+            self.tokens.append(unfinished)
+        self._finish_errors()
         
         # 添加EOF标记
-        eof_token = Token(TokenType.EOF, '', line, column)
+        if lazy_values:
+            eof_token = SourceToken(TokenType.EOF, text, len(text), len(text), line_index)
+        else:
+            line, column = position_of(len(text))
+            eof_token = Token(TokenType.EOF, '', line, column)
         self.tokens.append(eof_token)
         
         return self.tokens
     
+    def analyze_stream(self, fp: TextIO, chunk_size: int = 64 * 1024) -> Iterator[Token]:
+        """流式词法分析：按块读取文件对象，边读边产生Token
+        
+        缓冲区只保留尚未消费的文本，内存占用约为 chunk_size 加上最长Token的长度，
+        与文件大小无关。跨块边界的Token由前瞻窗口保证：在某位置匹配之前，
+        其后至少已读入 chunk_size 个字符（或已到文件末尾）。若匹配一直延伸到
+        缓冲区末尾，或该位置的字符可能开始Token却没有规则匹配（如注释的结束符
+        尚未读入），则缓冲区成倍增长后重新匹配，直到结果确定或到达文件末尾，
+        因此未闭合的注释、字符串会一直读到文件末尾。
+        只有在较低优先级的规则先匹配、较高优先级的规则要在 chunk_size 之外才能
+        匹配时，结果才可能与 analyze() 不同。
+        
+        错误信息记录在 self.errors 中，self.tokens 不会被填充。
+        """
+        self.errors = []
+        self._suppressed_errors = 0
+        self._compile_rules()
+        self._compile_keywords()
+        matchers = self._matchers
+        match_rule = matchers[INITIAL_MODE]
+        start_searchers = self._start_searchers
+        lookup_keyword = self._lookup_keyword if self._long_keywords else self._keyword_table.get
+        
+        line = 1
+        column = 1
+        buffer = ''
+        position = 0
+        eof = False
+        need_more = False
+        mode_stack = [INITIAL_MODE]
+        pending: List[str] = []
+        pending_line = pending_column = 0
+        # 尚未产生的错误字符段：可能跨越缓冲区边界，遇到下一个匹配或输入结束时才产生
+        error_parts: List[str] = []
+        error_line = error_column = 0
+        
+        while True:
+            if not eof and (need_more or len(buffer) - position < chunk_size):
+                # 丢弃已消费部分后读入下一块；待定Token很长时按缓冲区大小成倍读入
+                buffer = buffer[position:]
+                position = 0
+                data = fp.read(max(chunk_size, len(buffer)))
+                if data:
+                    buffer += data
+                else:
+                    eof = True
+                need_more = False
+                continue
+            
+            if position >= len(buffer):
+                break
+            
+            match, token_type, action = match_rule(buffer, position)
+            
+            if not eof and (match.end() == len(buffer) if match
+                            else self._may_start(start_searchers[mode_stack[-1]], buffer, position)):
+                # 匹配到达缓冲区末尾，后续输入可能使其更长；或者规则还缺少后续输入才能匹配
+                need_more = True
+                continue
+            
+            if error_parts and match:
+                value = ''.join(error_parts)
+                error_parts = []
+                self._report_error(value, error_line, error_column)
+                yield Token(TokenType.ERROR, value, error_line, error_column)
+            
+            if match:
+                value = match.group(0)
+                token_line = line
+                token_column = column
+                
+                # 更新位置（Token可以跨行）
+                line, column = self._advance_position(line, column, value)
+                
+                position = match.end()
+                
+                # 执行规则动作（切换起始条件），more 的文本留给下一个Token
+                if action is not None:
+                    more = self._apply_action(action, mode_stack)
+                    match_rule = matchers[mode_stack[-1]]
+                    if more:
+                        if not pending:
+                            pending_line, pending_column = token_line, token_column
+                        pending.append(value)
+                        continue
+                if pending:
+                    value = ''.join(pending) + value
+                    token_line, token_column = pending_line, pending_column
+                    pending = []
+                
+                # 检查是否为关键字（按原文查表，不分配小写字符串）
+                if token_type is TokenType.IDENTIFIER:
+                    token_type = lookup_keyword(value) or token_type
+                
+                # 产生Token（跳过空白字符和注释）
+                if token_type not in [TokenType.WHITESPACE, TokenType.COMMENT]:
+                    yield Token(token_type, value, token_line, token_column)
+            else:
+                # 未匹配的字符：跳到下一个能匹配规则的位置，与后续缓冲区中的错误字符合并
+                find_start = start_searchers[mode_stack[-1]]
+                if eof:
+                    end = self._error_run_end(buffer, position, match_rule, find_start)
+                else:
+                    # 后续输入可能使其后的Token起始位置得到匹配，错误字符段先截断在那里
+                    found = find_start(buffer, position + 1) if find_start is not None else None
+                    if found is not None:
+                        end = found.start()
+                    else:
+                        end = len(buffer) if find_start is not None else position + 1
+                if not error_parts:
+                    error_line, error_column = line, column
+                error_parts.append(buffer[position:end])
+                line, column = self._advance_position(line, column, buffer[position:end])
+                position = end
+        
+        if error_parts:
+            value = ''.join(error_parts)
+            self._report_error(value, error_line, error_column)
+            yield Token(TokenType.ERROR, value, error_line, error_column)
+        unfinished = self._finish_modes(mode_stack, pending, pending_line, pending_column)
+        if unfinished:
+            yield unfinished
+        self._finish_errors()
+        
+        # 产生EOF标记
+        yield Token(TokenType.EOF, '', line, column)
+    
     def has_errors(self) -> bool:
         """检查是否有错误"""
         return len(self.errors) > 0
@@ -569,6 +1279,8 @@ def nfa_to_dfa_demo():
         print(f"\n转换成功！")
         print(f"原NFA状态数: {len(nfa.states)}")
         print(f"转换后DFA状态数: {len(dfa.states)}")
+        print(f"DFA转移数: {nfa_to_dfa.stats['transitions']}")
+        print(f"子集构造耗时: {nfa_to_dfa.stats['time'] * 1000:.2f} ms")
         print(f"字母表: {sorted(dfa.alphabet)}")
         
         # 显示DFA状态转移表
@@ -926,6 +1638,8 @@ def show_help():
     print("\n5. 文件格式说明:")
     print("   - 代码文件: 支持Pascal等语言")
     print("   - 规则文件: 每行格式为 pattern|token_type|priority")
+    print("   - 规则文件可用 %x/%s 声明起始条件，<NAME> 前缀限定规则，")
+    print("     第四列动作 push:NAME / pop / begin:NAME / more 切换起始条件")
     print("   - 输入文件: 普通文本文件")
     
     print("\n6. 使用建议:")
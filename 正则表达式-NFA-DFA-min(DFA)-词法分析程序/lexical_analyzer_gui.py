@@ -15,8 +15,10 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import networkx as nx
 import re
+from functools import lru_cache
+from itertools import islice
 from enum import Enum
-from typing import List, Dict, Set, Optional, Tuple
+from typing import List, Dict, Set, Optional, Tuple, Iterator, TextIO
 from dataclasses import dataclass
 import json
 
@@ -156,10 +158,201 @@ class DFA:
         self.alphabet: Set[str] = set()
         self.state_token_types: Dict[frozenset, TokenType] = {}
 
+# ==================== 正则表达式语法树 ====================
+
+@dataclass(frozen=True)
+class CharClass:
+    """字符类：排好序、互不重叠的字符区间 (起始字符, 结束字符)，单个字符也是字符类"""
+    ranges: Tuple[Tuple[str, str], ...]
+    
+    @property
+    def chars(self) -> List[str]:
+        """字符类中的全部字符（构造转移时才展开）"""
+        return [chr(code) for low, high in self.ranges for code in range(ord(low), ord(high) + 1)]
+    
+    def __str__(self):
+        if len(self.ranges) == 1 and self.ranges[0][0] == self.ranges[0][1]:
+            return self.ranges[0][0]
+        return '[' + ''.join(low if low == high else f"{low}-{high}" for low, high in self.ranges) + ']'
+
+@dataclass(frozen=True)
+class Epsilon:
+    """空串"""
+
+@dataclass(frozen=True)
+class Concat:
+    """连接 left right"""
+    left: object
+    right: object
+
+@dataclass(frozen=True)
+class Alternation:
+    """选择 left | right"""
+    left: object
+    right: object
+
+@dataclass(frozen=True)
+class Repeat:
+    """重复：operator 为 '*'、'+' 或 '?'"""
+    child: object
+    operator: str
+
+# 转义字符类
+_CLASS_ESCAPES = {
+    'd': [('0', '9')],
+    'w': [('0', '9'), ('A', 'Z'), ('_', '_'), ('a', 'z')],
+    's': [('\t', '\n'), ('\r', '\r'), (' ', ' ')],
+}
+_CHAR_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+
+def _char_class(ranges: List[Tuple[str, str]]) -> CharClass:
+    """排序并合并重叠或相邻的区间"""
+    merged: List[Tuple[str, str]] = []
+    for low, high in sorted(ranges):
+        if merged and ord(low) <= ord(merged[-1][1]) + 1:
+            if high > merged[-1][1]:
+                merged[-1] = (merged[-1][0], high)
+        else:
+            merged.append((low, high))
+    return CharClass(tuple(merged))
+
+class RegexParser:
+    """正则表达式的递归下降解析器
+    
+    文法（自顶向下优先级递增，连接和选择都是左结合的）：
+        alternation := concat ('|' concat)*
+        concat      := repeat*
+        repeat      := atom ('*' | '+' | '?')*
+        atom        := '(' alternation ')' | '[' 字符类 ']' | '\\' 转义 | 字符
+    
+    字符类 [a-z] 保存为一个区间，不展开为选择表达式；\\+ \\* \\( 等转义总是表示字符本身。
+    """
+    
+    def __init__(self, regex: str):
+        self.regex = regex
+        self.pos = 0
+    
+    def parse(self):
+        tree = self._alternation()
+        if self.pos < len(self.regex):
+            raise ValueError(f"第 {self.pos + 1} 个字符处的 ')' 没有对应的 '('")
+        return tree
+    
+    def _peek(self) -> str:
+        return self.regex[self.pos] if self.pos < len(self.regex) else ''
+    
+    def _alternation(self):
+        node = self._concat()
+        while self._peek() == '|':
+            self.pos += 1
+            node = Alternation(node, self._concat())
+        return node
+    
+    def _concat(self):
+        node = None
+        while self._peek() not in ('', '|', ')'):
+            item = self._repeat()
+            node = item if node is None else Concat(node, item)
+        return Epsilon() if node is None else node
+    
+    def _repeat(self):
+        node = self._atom()
+        while self._peek() in ('*', '+', '?'):
+            node = Repeat(node, self._peek())
+            self.pos += 1
+        return node
+    
+    def _atom(self):
+        char = self.regex[self.pos]
+        self.pos += 1
+        if char == '(':
+            node = self._alternation()
+            if self._peek() != ')':
+                raise ValueError("括号不匹配：缺少 ')'")
+            self.pos += 1
+            return node
+        if char == '[':
+            return self._char_class()
+        if char == '\\':
+            return _char_class(self._escape())
+        if char in '*+?':
+            raise ValueError(f"第 {self.pos} 个字符处的 '{char}' 缺少操作数")
+        return CharClass(((char, char),))
+    
+    def _escape(self) -> List[Tuple[str, str]]:
+        """解析 '\\' 之后的转义，返回字符区间"""
+        if self.pos >= len(self.regex):
+            raise ValueError("正则表达式不能以 '\\' 结尾")
+        char = self.regex[self.pos]
+        self.pos += 1
+        if char in _CLASS_ESCAPES:
+            return _CLASS_ESCAPES[char]
+        char = _CHAR_ESCAPES.get(char, char)
+        return [(char, char)]
+    
+    def _char_class(self) -> CharClass:
+        """解析 '[' 之后直到 ']' 的字符类"""
+        if self._peek() == '^':
+            raise ValueError("不支持取反的字符类 [^...]")
+        ranges: List[Tuple[str, str]] = []
+        while self._peek() not in ('', ']'):
+            if self._peek() == '\\':
+                self.pos += 1
+                escaped = self._escape()
+                if len(escaped) > 1 or escaped[0][0] != escaped[0][1]:
+                    ranges.extend(escaped)
+                    continue
+                low = escaped[0][0]
+            else:
+                low = self._peek()
+                self.pos += 1
+            high = low
+            if self._peek() == '-' and self.pos + 1 < len(self.regex) and self.regex[self.pos + 1] != ']':
+                # 处理范围 a-z
+                self.pos += 1
+                if self._peek() == '\\':
+                    self.pos += 1
+                    high = self._escape()[0][1]
+                else:
+                    high = self._peek()
+                    self.pos += 1
+                if high < low:
+                    raise ValueError(f"字符类范围错误: {low}-{high}")
+            ranges.append((low, high))
+        if self._peek() != ']':
+            raise ValueError("字符类缺少 ']'")
+        self.pos += 1
+        if not ranges:
+            raise ValueError("空字符类 []")
+        return _char_class(ranges)
+
+@lru_cache(maxsize=256)
+def parse_regex(regex: str):
+    """解析正则表达式为语法树（按正则缓存，语法树不可变）"""
+    return RegexParser(regex).parse()
+
+def regex_postorder(tree) -> Iterator:
+    """后序遍历语法树（显式栈），子结点从左到右"""
+    stack = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done or isinstance(node, (CharClass, Epsilon)):
+            yield node
+        elif isinstance(node, Repeat):
+            stack.append((node, True))
+            stack.append((node.child, False))
+        else:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+
 # ==================== 转换器类 ====================
 
 class RegexToNFA:
-    """正则表达式到NFA转换器 (Thompson构造法)"""
+    """正则表达式到NFA转换器 (Thompson构造法 / Glushkov构造法)"""
+    
+    THOMPSON = 'thompson'
+    GLUSHKOV = 'glushkov'
     
     def __init__(self):
         self.state_counter = 0
@@ -169,22 +362,22 @@ class RegexToNFA:
         self.state_counter += 1
         return state
     
-    def convert(self, regex: str, token_type: TokenType) -> NFA:
-        """将正则表达式转换为NFA"""
+    def convert(self, regex: str, token_type: TokenType, method: str = THOMPSON) -> NFA:
+        """将正则表达式转换为NFA
+        
+        method 为 GLUSHKOV 时构造位置自动机：没有ε转移，每个字符（或字符类）的
+        每次出现对应一个状态，另加一个开始状态，比Thompson NFA小得多。
+        """
         self.state_counter = 0
         
         try:
-            # 预处理：展开字符类和转义字符
-            processed_regex = self._preprocess_regex(regex)
-            
-            # 添加连接操作符
-            concat_regex = self._add_concat_operator(processed_regex)
-            
-            # 转换为后缀表达式
-            postfix = self._to_postfix(concat_regex)
+            tree = parse_regex(regex)
             
             # 构建NFA
-            nfa = self._build_nfa(postfix)
+            if method == self.GLUSHKOV:
+                nfa = self._glushkov_nfa(tree)
+            else:
+                nfa = self._build_nfa(tree)
             
             # 设置最终状态的token类型
             for final_state in nfa.final_states:
@@ -212,157 +405,100 @@ class RegexToNFA:
         
         return nfa
     
-    def _preprocess_regex(self, regex: str) -> str:
-        """预处理正则表达式"""
-        result = []
-        i = 0
-        while i < len(regex):
-            if regex[i] == '\\' and i + 1 < len(regex):
-                # 处理转义字符
-                next_char = regex[i + 1]
-                if next_char == 'd':
-                    result.append('[0-9]')
-                elif next_char == 'w':
-                    result.append('[a-zA-Z0-9_]')
-                elif next_char == 's':
-                    result.append('[ \t\n\r]')
-                elif next_char in '+*?()[]{}|.^$\\':
-                    result.append(next_char)
-                else:
-                    result.append(next_char)
-                i += 2
-            elif regex[i] == '[' and i + 1 < len(regex):
-                # 处理字符类
-                j = i + 1
-                while j < len(regex) and regex[j] != ']':
-                    j += 1
-                if j < len(regex):
-                    char_class = regex[i:j+1]
-                    expanded = self._expand_char_class(char_class)
-                    result.append(f'({expanded})')
-                    i = j + 1
-                else:
-                    result.append(regex[i])
-                    i += 1
-            else:
-                result.append(regex[i])
-                i += 1
-        
-        return ''.join(result)
-    
-    def _expand_char_class(self, char_class: str) -> str:
-        """展开字符类为选择表达式"""
-        content = char_class[1:-1]  # 去掉方括号
-        chars = []
-        i = 0
-        
-        while i < len(content):
-            if i + 2 < len(content) and content[i + 1] == '-':
-                # 处理范围 a-z
-                start = ord(content[i])
-                end = ord(content[i + 2])
-                for code in range(start, end + 1):
-                    chars.append(chr(code))
-                i += 3
-            else:
-                chars.append(content[i])
-                i += 1
-        
-        return '|'.join(chars) if chars else ''
-    
-    def _add_concat_operator(self, regex: str) -> str:
-        """添加连接操作符"""
-        output = []
-        for i in range(len(regex)):
-            output.append(regex[i])
-            if (i + 1 < len(regex) and 
-                regex[i] not in '(|' and 
-                regex[i + 1] not in ')|*+?'):
-                output.append('.')
-        return ''.join(output)
-    
-    def _to_postfix(self, regex: str) -> List[str]:
-        """转换为后缀表达式"""
-        precedence = {'|': 1, '.': 2, '*': 3, '+': 3, '?': 3}
-        operators = {'|', '.', '*', '+', '?', '(', ')'}
-        
-        output = []
-        operator_stack = []
-        
-        for token in regex:
-            if token not in operators:
-                output.append(token)
-            elif token == '(':
-                operator_stack.append(token)
-            elif token == ')':
-                while operator_stack and operator_stack[-1] != '(':
-                    output.append(operator_stack.pop())
-                operator_stack.pop()  # 弹出左括号
-            else:
-                while (operator_stack and operator_stack[-1] != '(' and 
-                       precedence.get(operator_stack[-1], 0) >= precedence.get(token, 0)):
-                    output.append(operator_stack.pop())
-                operator_stack.append(token)
-        
-        while operator_stack:
-            output.append(operator_stack.pop())
-        
-        return output
-    
-    def _build_nfa(self, postfix: List[str]) -> NFA:
-        """根据后缀表达式构建NFA"""
+    def _build_nfa(self, tree) -> NFA:
+        """后序遍历语法树构建Thompson NFA"""
         stack = []
         
-        for token in postfix:
-            if token == '|':
-                if len(stack) < 2:
-                    raise ValueError(f"联合操作需要两个操作数，当前栈大小: {len(stack)}")
+        for node in regex_postorder(tree):
+            if isinstance(node, Alternation):
                 nfa2 = stack.pop()
                 nfa1 = stack.pop()
                 stack.append(self._union_nfa(nfa1, nfa2))
-            elif token == '.':
-                if len(stack) < 2:
-                    raise ValueError(f"连接操作需要两个操作数，当前栈大小: {len(stack)}")
+            elif isinstance(node, Concat):
                 nfa2 = stack.pop()
                 nfa1 = stack.pop()
                 stack.append(self._concat_nfa(nfa1, nfa2))
-            elif token == '*':
-                if len(stack) < 1:
-                    raise ValueError(f"克莱尼星操作需要一个操作数，当前栈大小: {len(stack)}")
+            elif isinstance(node, Repeat):
                 nfa = stack.pop()
-                stack.append(self._kleene_star_nfa(nfa))
-            elif token == '+':
-                if len(stack) < 1:
-                    raise ValueError(f"加号操作需要一个操作数，当前栈大小: {len(stack)}")
-                nfa = stack.pop()
-                stack.append(self._plus_nfa(nfa))
-            elif token == '?':
-                if len(stack) < 1:
-                    raise ValueError(f"问号操作需要一个操作数，当前栈大小: {len(stack)}")
-                nfa = stack.pop()
-                stack.append(self._question_nfa(nfa))
+                if node.operator == '*':
+                    stack.append(self._kleene_star_nfa(nfa))
+                elif node.operator == '+':
+                    stack.append(self._plus_nfa(nfa))
+                else:
+                    stack.append(self._question_nfa(nfa))
+            elif isinstance(node, Epsilon):
+                stack.append(self._create_empty_nfa())
             else:
-                # 处理字符或字符组
-                if token.startswith('(') and token.endswith(')'):
-                    # 处理字符类展开后的选择表达式
-                    choices = token[1:-1].split('|')
-                    if len(choices) > 1:
-                        nfa_list = [self._basic_nfa(choice) for choice in choices]
-                        result_nfa = nfa_list[0]
-                        for i in range(1, len(nfa_list)):
-                            result_nfa = self._union_nfa(result_nfa, nfa_list[i])
-                        stack.append(result_nfa)
-                    else:
-                        stack.append(self._basic_nfa(choices[0]))
+                stack.append(self._basic_nfa(node))
+        
+        return stack.pop()
+    
+    def positions(self, tree) -> Tuple[List[CharClass], List[Set[int]], bool, Set[int], Set[int]]:
+        """计算语法树的位置集合
+        
+        后序遍历语法树，计算每个子表达式的 nullable、firstpos、lastpos，
+        并在连接和重复处填写 followpos。每个字符类（的每次出现）是一个位置，
+        位置从0开始按在正则中出现的顺序编号。
+        
+        返回 (各位置的字符类, 各位置的followpos, nullable, firstpos, lastpos)。
+        """
+        symbols: List[CharClass] = []
+        follow: List[Set[int]] = []
+        stack: List[Tuple[bool, Set[int], Set[int]]] = []   # (nullable, firstpos, lastpos)
+        
+        for node in regex_postorder(tree):
+            if isinstance(node, (Alternation, Concat)):
+                right_nullable, right_first, right_last = stack.pop()
+                left_nullable, left_first, left_last = stack.pop()
+                if isinstance(node, Alternation):
+                    stack.append((left_nullable or right_nullable,
+                                  left_first | right_first, left_last | right_last))
                 else:
-                    stack.append(self._basic_nfa(token))
+                    for position in left_last:
+                        follow[position] |= right_first
+                    stack.append((left_nullable and right_nullable,
+                                  left_first | right_first if left_nullable else left_first,
+                                  left_last | right_last if right_nullable else right_last))
+            elif isinstance(node, Repeat):
+                nullable, first, last = stack.pop()
+                if node.operator != '?':
+                    for position in last:
+                        follow[position] |= first
+                stack.append((nullable or node.operator != '+', first, last))
+            elif isinstance(node, Epsilon):
+                stack.append((True, set(), set()))
+            else:
+                position = len(symbols)
+                symbols.append(node)
+                follow.append(set())
+                stack.append((False, {position}, {position}))
+        
+        nullable, first, last = stack.pop()
+        return symbols, follow, nullable, first, last
+    
+    def _glushkov_nfa(self, tree) -> NFA:
+        """根据语法树构建位置自动机（Glushkov构造）
         
-        if len(stack) != 1:
-            raise ValueError(f"表达式构建失败，最终栈大小应为1，实际为: {len(stack)}")
+        状态 p 表示“刚读入位置 p 的字符”：开始状态到 firstpos 中的位置、
+        位置 q 到 followpos(q) 中的位置各有以目标位置的字符为符号的转移，
+        lastpos 中的位置为最终状态（能匹配空串时开始状态也是）。
+        """
+        symbols, follow, nullable, first, last = self.positions(tree)
         
-        return stack[0]
+        nfa = NFA()
+        start = self.new_state(is_final=nullable)
+        nfa.set_start_state(start)
+        states = [self.new_state(is_final=position in last) for position in range(len(symbols))]
+        for state in states:
+            nfa.add_state(state)
+        for source, targets in [(start, first)] + list(zip(states, follow)):
+            for position in sorted(targets):
+                for symbol in symbols[position].chars:
+                    nfa.add_transition(source, symbol, states[position])
+        return nfa
     
     def _create_empty_nfa(self) -> NFA:
+        """创建只接受空串的NFA"""
         nfa = NFA()
         start = self.new_state()
         final = self.new_state(is_final=True)
@@ -371,16 +507,17 @@ class RegexToNFA:
         nfa.add_state(final)
         return nfa
     
-    def _basic_nfa(self, symbol: str) -> NFA:
-        """创建基本NFA"""
+    def _basic_nfa(self, char_class: CharClass) -> NFA:
+        """创建基本NFA（两个状态，字符类中的每个字符各一条转移）"""
         nfa = NFA()
         start = self.new_state()
         end = self.new_state(is_final=True)
         
         nfa.set_start_state(start)
         nfa.add_state(end)
-        start.add_transition(symbol, end)
-        nfa.alphabet.add(symbol)
+        for symbol in char_class.chars:
+            start.add_transition(symbol, end)
+            nfa.alphabet.add(symbol)
         
         return nfa
     
@@ -544,16 +681,106 @@ class RegexToNFA:
         
         return result
 
+class RegexToDFA:
+    """正则表达式直接构造DFA (followpos方法，不经过NFA)
+    
+    在正则末尾接结束标记 #，按位置计算 followpos（见 RegexToNFA.positions）。
+    DFA状态是“接下来可能匹配的位置”的集合：开始状态为 firstpos，
+    状态 S 在字符 a 下转移到 S 中字符为 a 的各位置的 followpos 之并，
+    含 # 的位置的状态为最终状态。位置按教材习惯从1编号，# 为最后一个位置。
+    """
+    
+    def __init__(self):
+        self.parser = RegexToNFA()
+        # 最近一次转换的位置表：(位置, 字符, followpos)，# 的字符为 '#'
+        self.position_table: List[Tuple[int, str, Set[int]]] = []
+    
+    def convert(self, regex: str, token_type: TokenType) -> DFA:
+        """将正则表达式直接转换为DFA，正则无法解析时抛出 ValueError"""
+        symbols, follow, nullable, first, last = self.parser.positions(parse_regex(regex))
+        
+        # 位置从1编号，结束标记 # 为 end
+        end = len(symbols) + 1
+        followpos = [{position + 1 for position in targets} for targets in follow]
+        for position in last:
+            followpos[position].add(end)
+        start = {position + 1 for position in first}
+        if nullable:
+            start.add(end)
+        self.position_table = [(position + 1, str(symbols[position]), followpos[position])
+                               for position in range(len(symbols))]
+        self.position_table.append((end, '#', set()))
+        
+        dfa = DFA()
+        dfa.start_state = frozenset(start)
+        dfa.states.add(dfa.start_state)
+        unprocessed = [dfa.start_state]
+        
+        while unprocessed:
+            current = unprocessed.pop(0)
+            if end in current:
+                dfa.final_states.add(current)
+                dfa.state_token_types[current] = token_type
+            
+            # 按字符合并状态中各位置的 followpos
+            moves: Dict[str, Set[int]] = {}
+            for position in sorted(current):
+                if position != end:
+                    for symbol in symbols[position - 1].chars:
+                        moves.setdefault(symbol, set()).update(followpos[position - 1])
+            
+            for symbol, targets in moves.items():
+                target = frozenset(targets)
+                if target not in dfa.states:
+                    dfa.states.add(target)
+                    unprocessed.append(target)
+                dfa.transitions[(current, symbol)] = target
+                dfa.alphabet.add(symbol)
+        
+        return dfa
+
 class NFAToDFA:
-    """NFA到DFA转换器"""
+    """NFA到DFA转换器
+    
+    NFA状态集合表示为位集：先为每个NFA状态算好ε闭包的位集，
+    move 之后取闭包只是把各后继的闭包按位或起来，不再逐个子集重新搜索ε转移。
+    """
     
     def convert(self, nfa: NFA) -> DFA:
         """使用子集构造算法将NFA转换为DFA"""
         dfa = DFA()
+        order, bit_of, closures = self._closure_table(nfa)
+        
+        # 各NFA状态在每个符号下的后继的ε闭包位集
+        steps: List[Dict[str, int]] = []
+        for state in order:
+            step = {}
+            for symbol, targets in state.transitions.items():
+                mask = 0
+                for target in targets:
+                    mask |= closures[bit_of[target]]
+                step[symbol] = mask
+            steps.append(step)
+        
+        # 位集 -> DFA状态（NFA状态的 frozenset）
+        dfa_states: Dict[int, frozenset] = {}
+        
+        def to_dfa_state(mask: int) -> frozenset:
+            dfa_state = dfa_states.get(mask)
+            if dfa_state is None:
+                members = []
+                bits = mask
+                while bits:
+                    low = bits & -bits
+                    members.append(order[low.bit_length() - 1])
+                    bits ^= low
+                dfa_state = dfa_states[mask] = frozenset(members)
+            return dfa_state
         
         # 计算初始状态的ε闭包
-        start_closure = self._epsilon_closure({nfa.start_state})
-        dfa.start_state = frozenset(start_closure)
+        start_mask = closures[bit_of[nfa.start_state]]
+        start_closure = to_dfa_state(start_mask)
+        dfa.start_state = start_closure
         dfa.states.add(dfa.start_state)
         
         # 检查是否为最终状态
@@ -566,37 +793,43 @@ class NFAToDFA:
                     break
         
         # 工作队列
-        unprocessed = [dfa.start_state]
+        unprocessed = [start_mask]
         processed = set()
         
         while unprocessed:
-            current_dfa_state = unprocessed.pop(0)
-            if current_dfa_state in processed:
+            current_mask = unprocessed.pop(0)
+            if current_mask in processed:
                 continue
-            processed.add(current_dfa_state)
+            processed.add(current_mask)
+            current_dfa_state = dfa_states[current_mask]
+            
+            # 按符号合并各NFA状态的后继闭包（即 move 之后取ε闭包）
+            moves: Dict[str, int] = {}
+            bits = current_mask
+            while bits:
+                low = bits & -bits
+                for symbol, target in steps[low.bit_length() - 1].items():
+                    moves[symbol] = moves.get(symbol, 0) | target
+                bits ^= low
             
             # 对每个输入符号
             for symbol in nfa.alphabet:
-                # 计算转换
-                next_states = set()
-                for nfa_state in current_dfa_state:
-                    next_states.update(nfa_state.get_transitions(symbol))
+                next_mask = moves.get(symbol)
                 
-                if next_states:
-                    # 计算ε闭包
-                    next_closure = self._epsilon_closure(next_states)
-                    next_dfa_state = frozenset(next_closure)
+                if next_mask:
+                    is_new = next_mask not in dfa_states
+                    next_dfa_state = to_dfa_state(next_mask)
                     
                     # 添加状态和转换
-                    if next_dfa_state not in dfa.states:
+                    if is_new:
                         dfa.states.add(next_dfa_state)
-                        unprocessed.append(next_dfa_state)
+                        unprocessed.append(next_mask)
                         
                         # 检查是否为最终状态
-                        if any(state.is_final for state in next_closure):
+                        if any(state.is_final for state in next_dfa_state):
                             dfa.final_states.add(next_dfa_state)
                             # 设置token类型
-                            for state in next_closure:
+                            for state in next_dfa_state:
                                 if state.is_final and state.token_type:
                                     dfa.state_token_types[next_dfa_state] = state.token_type
                                     break
@@ -606,129 +839,149 @@ class NFAToDFA:
         
         return dfa
     
-    def _epsilon_closure(self, states: Set[State]) -> Set[State]:
-        """计算状态集合的ε闭包"""
-        closure = set(states)
-        stack = list(states)
+    @staticmethod
+    def _closure_table(nfa: NFA) -> Tuple[List[State], Dict[State, int], List[int]]:
+        """为NFA的全部状态（含只经ε转移到达的状态）按编号稠密编位，并算出各状态的ε闭包位集
         
+        返回 (按编号排列的状态, 状态 -> 位下标, 各状态ε闭包的位集)。
+        """
+        states = set(nfa.states)
+        if nfa.start_state is not None:
+            states.add(nfa.start_state)
+        stack = list(states)
         while stack:
-            current = stack.pop()
-            for epsilon_target in current.epsilon_transitions:
-                if epsilon_target not in closure:
-                    closure.add(epsilon_target)
-                    stack.append(epsilon_target)
-        
-        return closure
+            state = stack.pop()
+            for targets in (state.epsilon_transitions, *state.transitions.values()):
+                for target in targets:
+                    if target not in states:
+                        states.add(target)
+                        stack.append(target)
+        
+        order = sorted(states, key=lambda state: state.id)
+        bit_of = {state: index for index, state in enumerate(order)}
+        closures = [0] * len(order)
+        for index, state in enumerate(order):
+            mask = 1 << index
+            stack = [state]
+            while stack:
+                for target in stack.pop().epsilon_transitions:
+                    target_index = bit_of[target]
+                    if mask >> target_index & 1:
+                        continue
+                    if closures[target_index]:
+                        # 已算好的闭包直接并入，不再沿它的ε转移搜索
+                        mask |= closures[target_index]
+                    else:
+                        mask |= 1 << target_index
+                        stack.append(target)
+            closures[index] = mask
+        return order, bit_of, closures
 
 class DFAMinimizer:
     """DFA最小化器"""
     
     def minimize(self, dfa: DFA) -> DFA:
-        """使用分割算法最小化DFA"""
+        """使用Hopcroft分割细化算法最小化DFA"""
         if not dfa.states:
             return dfa
         
-        # 初始分割：最终状态和非最终状态
-        final_states = dfa.final_states
-        non_final_states = dfa.states - final_states
-        
-        partitions = []
-        if non_final_states:
-            partitions.append(non_final_states)
-        if final_states:
-            partitions.append(final_states)
-        
-        # 迭代分割直到稳定
-        changed = True
-        while changed:
-            changed = False
-            new_partitions = []
-            
-            for partition in partitions:
-                sub_partitions = self._split_partition(partition, partitions, dfa)
-                if len(sub_partitions) > 1:
-                    changed = True
-                new_partitions.extend(sub_partitions)
-            
-            partitions = new_partitions
+        partitions = self._refine(dfa)
         
         # 构建最小化的DFA
         return self._build_minimized_dfa(dfa, partitions)
     
-    def _split_partition(self, partition: Set[frozenset], all_partitions: List[Set[frozenset]], dfa: DFA) -> List[Set[frozenset]]:
-        """分割分区"""
-        if len(partition) <= 1:
-            return [partition]
+    def _refine(self, dfa: DFA) -> List[Set[frozenset]]:
+        """Hopcroft算法：返回等价状态的分区列表，时间复杂度 O(|Σ|·n·log n)
         
-        # 按转换行为分组
+        缺失的转换视为指向单独成块的虚拟死状态（None）；
+        最终状态按Token类型分块，不同类型的最终状态不会合并。
+        """
+        # 初始分割：非最终状态一块，最终状态按Token类型分块
         groups = {}
-        
-        for state in partition:
-            signature = []
-            for symbol in sorted(dfa.alphabet):
-                target = dfa.transitions.get((state, symbol))
-                if target:
-                    # 找到目标状态所在的分区
-                    target_partition_idx = -1
-                    for i, p in enumerate(all_partitions):
-                        if target in p:
-                            target_partition_idx = i
-                            break
-                    signature.append(target_partition_idx)
-                else:
-                    signature.append(-1)
-            
-            signature_tuple = tuple(signature)
-            if signature_tuple not in groups:
-                groups[signature_tuple] = set()
-            groups[signature_tuple].add(state)
-        
-        return list(groups.values())
+        for state in dfa.states:
+            is_final = state in dfa.final_states
+            key = (is_final, dfa.state_token_types.get(state) if is_final else None)
+            groups.setdefault(key, set()).add(state)
+        blocks = list(groups.values()) + [{None}]
+        block_of = {state: i for i, block in enumerate(blocks) for state in block}
+        
+        # 逆转换索引：inverse[符号][目标状态] = 经该符号转换到目标状态的状态列表
+        inverse = {}
+        for symbol in dfa.alphabet:
+            sources = {None: [None]}
+            for state in dfa.states:
+                sources.setdefault(dfa.transitions.get((state, symbol)), []).append(state)
+            inverse[symbol] = sources
+        
+        worklist = list(range(len(blocks)))
+        while worklist:
+            splitter = list(blocks[worklist.pop()])
+            for sources in inverse.values():
+                # 按所在块收集能转换进 splitter 的状态
+                touched = {}
+                for target in splitter:
+                    for state in sources.get(target, ()):
+                        touched.setdefault(block_of[state], set()).add(state)
+                
+                for i, inside in touched.items():
+                    if len(inside) == len(blocks[i]):
+                        continue
+                    outside = blocks[i] - inside
+                    # 较小的一半成为新块并加入工作表
+                    if len(inside) > len(outside):
+                        inside, outside = outside, inside
+                    blocks[i] = outside
+                    blocks.append(inside)
+                    for state in inside:
+                        block_of[state] = len(blocks) - 1
+                    worklist.append(len(blocks) - 1)
+        
+        return [block for block in blocks if None not in block]
     
     def _build_minimized_dfa(self, original_dfa: DFA, partitions: List[Set[frozenset]]) -> DFA:
         """根据分区构建最小化的DFA"""
         minimized_dfa = DFA()
-        
-        # 创建分区到新状态的映射
-        partition_to_state = {}
-        for i, partition in enumerate(partitions):
-            # 创建新的状态标识符，使用字符串而不是frozenset
-            new_state_id = f"q{i}"
-            partition_to_state[frozenset(partition)] = frozenset({new_state_id})
-        
-        # 设置状态
-        for partition in partitions:
-            new_state = partition_to_state[frozenset(partition)]
+        symbols = sorted(original_dfa.alphabet)
+        block_of = {state: i for i, partition in enumerate(partitions) for state in partition}
+        
+        # 按从开始状态出发的广度优先顺序编号，开始状态为 q0
+        order = []
+        if original_dfa.start_state in block_of:
+            order.append(block_of[original_dfa.start_state])
+        seen = set(order)
+        for i in order:
+            representative = next(iter(partitions[i]))
+            for symbol in symbols:
+                target = original_dfa.transitions.get((representative, symbol))
+                if target is not None and block_of[target] not in seen:
+                    seen.add(block_of[target])
+                    order.append(block_of[target])
+        order.extend(i for i in range(len(partitions)) if i not in seen)
+        # 新的状态标识符使用字符串而不是原来的frozenset
+        partition_to_state = {i: frozenset({f"q{number}"}) for number, i in enumerate(order)}
+        
+        for i in order:
+            partition = partitions[i]
+            new_state = partition_to_state[i]
             minimized_dfa.states.add(new_state)
+            representative = next(iter(partition))
             
             # 检查是否包含原始的开始状态
             if original_dfa.start_state in partition:
                 minimized_dfa.start_state = new_state
             
-            # 检查是否包含最终状态
-            if any(state in original_dfa.final_states for state in partition):
+            # 检查是否为最终状态（同一分区内的状态Token类型相同）
+            if representative in original_dfa.final_states:
                 minimized_dfa.final_states.add(new_state)
-                # 设置token类型
-                for state in partition:
-                    if state in original_dfa.state_token_types:
-                        minimized_dfa.state_token_types[new_state] = original_dfa.state_token_types[state]
-                        break
-        
-        # 设置转换
-        for partition in partitions:
-            current_state = partition_to_state[frozenset(partition)]
-            representative = next(iter(partition))
+                if representative in original_dfa.state_token_types:
+                    minimized_dfa.state_token_types[new_state] = original_dfa.state_token_types[representative]
             
-            for symbol in original_dfa.alphabet:
+            # 设置转换
+            for symbol in symbols:
                 target = original_dfa.transitions.get((representative, symbol))
-                if target:
-                    # 找到目标状态所在的分区
-                    for target_partition in partitions:
-                        if target in target_partition:
-                            target_state = partition_to_state[frozenset(target_partition)]
-                            minimized_dfa.transitions[(current_state, symbol)] = target_state
-                            minimized_dfa.alphabet.add(symbol)
-                            break
+                if target is not None:
+                    minimized_dfa.transitions[(new_state, symbol)] = partition_to_state[block_of[target]]
+                    minimized_dfa.alphabet.add(symbol)
         
         return minimized_dfa
 
@@ -740,6 +993,9 @@ class LexicalAnalyzer:
     def __init__(self):
         self.rules = []
         self.errors = []
+        # 最近一次分析结果及其中的错误Token，增量分析时据此维护错误信息
+        self._last_tokens: Optional[List[Token]] = None
+        self._error_tokens: List[Token] = []
         self._init_default_rules()
     
     def _init_default_rules(self):
@@ -828,66 +1084,239 @@ class LexicalAnalyzer:
             self.errors.append(f"无效的正则表达式 '{pattern}': {e}")
     
     def analyze(self, text: str) -> List[Token]:
-        """执行词法分析"""
-        tokens = []
-        lines = text.split('\n')
+        """执行词法分析
         
-        for line_num, line in enumerate(lines, 1):
-            column = 1
-            position = 0
-            
-            while position < len(line):
-                matched = False
-                
-                for rule in self.rules:
-                    match = rule['regex'].match(line, position)
-                    if match:
-                        value = match.group(0)
-                        
-                        # 跳过空白字符和注释
-                        if rule['token_type'] not in [TokenType.WHITESPACE, TokenType.COMMENT]:
-                            token = Token(
-                                type=rule['token_type'],
-                                value=value,
-                                line=line_num,
-                                column=column
-                            )
-                            tokens.append(token)
-                        
-                        position = match.end()
-                        column += len(value)
-                        matched = True
-                        break
-                
-                if not matched:
-                    # 错误处理
-                    error_char = line[position]
-                    self.errors.append(f"未识别的字符 '{error_char}' 在 {line_num}:{column}")
-                    tokens.append(Token(
-                        type=TokenType.ERROR,
-                        value=error_char,
-                        line=line_num,
-                        column=column
-                    ))
-                    position += 1
-                    column += 1
+        不把文本拆分为行字符串：按换行符的偏移逐行在原文本上限定范围匹配，
+        列号由偏移与行首偏移之差得到。
+        """
+        tokens = []
+        line_num = 1
+        line_start = 0
+        while True:
+            line_end = text.find('\n', line_start)
+            if line_end < 0:
+                line_end = len(text)
+            tokens.extend(self._analyze_span(text, line_start, line_end, line_num))
+            if line_end == len(text):
+                break
+            line_start = line_end + 1
+            line_num += 1
         
         # 添加EOF token
         tokens.append(Token(
             type=TokenType.EOF,
             value='',
-            line=len(lines),
+            line=line_num,
             column=1
         ))
         
+        self._last_tokens = tokens
+        self._error_tokens = [t for t in tokens if t.type is TokenType.ERROR]
         return tokens
     
+    def analyze_stream(self, fp: TextIO, chunk_size: int = 64 * 1024) -> Iterator[Token]:
+        """流式词法分析：按块读取文件对象，逐行分析并产生Token
+        
+        本分析器按行匹配，Token不会跨行，因此按行流式处理与 analyze() 结果完全一致。
+        缓冲区只保存最后一个不完整的行，内存占用约为 chunk_size 加上最长行的长度。
+        """
+        pending = []  # 尚未遇到换行符的行片段
+        line_num = 0
+        while True:
+            data = fp.read(chunk_size)
+            if not data:
+                break
+            pieces = data.split('\n')
+            if len(pieces) == 1:
+                pending.append(data)
+                continue
+            
+            pending.append(pieces[0])
+            lines = [''.join(pending)] + pieces[1:-1]
+            # 最后一段可能是不完整的行，留到下次读入后处理
+            pending = [pieces[-1]]
+            for line in lines:
+                line_num += 1
+                yield from self._analyze_line(line, line_num)
+        
+        line_num += 1
+        yield from self._analyze_line(''.join(pending), line_num)
+        
+        yield Token(
+            type=TokenType.EOF,
+            value='',
+            line=line_num,
+            column=1
+        )
+    
+    def _analyze_line(self, line: str, line_num: int) -> Iterator[Token]:
+        """分析单行文本，逐个产生Token"""
+        return self._analyze_span(line, 0, len(line), line_num)
+    
+    def _analyze_span(self, text: str, start: int, end: int, line_num: int) -> Iterator[Token]:
+        """分析 text[start:end]（第 line_num 行，不含换行符），逐个产生Token
+        
+        匹配以 end 为结束位置（endpos），与对切出的行字符串匹配结果相同。
+        """
+        position = start
+        
+        while position < end:
+            matched = False
+            
+            for rule in self.rules:
+                match = rule['regex'].match(text, position, end)
+                if match:
+                    # 跳过空白字符和注释
+                    if rule['token_type'] not in [TokenType.WHITESPACE, TokenType.COMMENT]:
+                        yield Token(
+                            type=rule['token_type'],
+                            value=match.group(0),
+                            line=line_num,
+                            column=position - start + 1
+                        )
+                    
+                    position = match.end()
+                    matched = True
+                    break
+            
+            if not matched:
+                # 错误处理
+                error_char = text[position]
+                column = position - start + 1
+                self.errors.append(f"未识别的字符 '{error_char}' 在 {line_num}:{column}")
+                yield Token(
+                    type=TokenType.ERROR,
+                    value=error_char,
+                    line=line_num,
+                    column=column
+                )
+                position += 1
+    
+    def relex(self, old_text: str, old_tokens: List[Token], offset: int,
+              deleted_length: int, inserted_text: str) -> Tuple[str, List[Token], Tuple[int, int, int]]:
+        """增量词法分析
+        
+        old_tokens 是 old_text 的分析结果（含末尾EOF）。编辑为：从 offset 起删除
+        deleted_length 个字符，再插入 inserted_text。
+        本分析器按行匹配，Token不跨行，因此只需重新分析编辑所涉及的行，
+        其后的Token从下一行起即与旧结果重合，只需按新增/删除的行数平移行号。
+        为避免复制整个列表，old_tokens 会被原地更新并作为新结果返回，
+        未受影响的Token对象直接复用（行号原地平移）。
+        
+        Returns:
+            (新文本, 新Token列表, (起始下标, 旧结束下标, 新结束下标))：
+            新列表中 [起始下标, 新结束下标) 的Token替换了旧列表中的 [起始下标, 旧结束下标)
+        """
+        edit_end = offset + deleted_length
+        first_line = old_text.count('\n', 0, offset) + 1
+        old_last_line = first_line + old_text.count('\n', offset, edit_end)
+        
+        # 受影响行在旧文本中的范围
+        line_start = old_text.rfind('\n', 0, offset) + 1
+        line_end = old_text.find('\n', edit_end)
+        if line_end < 0:
+            line_end = len(old_text)
+        
+        new_text = old_text[:offset] + inserted_text + old_text[edit_end:]
+        new_line_end = line_end + len(inserted_text) - deleted_length
+        new_lines = new_text[line_start:new_line_end].split('\n')
+        line_delta = len(new_lines) - (old_last_line - first_line + 1)
+        
+        # 旧Token按行号有序，二分找到受影响行的Token范围（不含EOF）
+        body_end = len(old_tokens) - 1
+        start = self._line_index(old_tokens, first_line, 0, body_end)
+        old_end = self._line_index(old_tokens, old_last_line + 1, start, body_end)
+        
+        # 错误Token及其信息同样按行号划分（须在平移行号之前）
+        if old_tokens is self._last_tokens:
+            error_tokens = self._error_tokens
+        else:
+            error_tokens = [t for t in old_tokens if t.type is TokenType.ERROR]
+        if old_tokens is self._last_tokens and len(self.errors) == len(error_tokens):
+            messages = self.errors
+        else:
+            messages = [self._error_message(t) for t in error_tokens]
+        error_start = self._line_index(error_tokens, first_line, 0, len(error_tokens))
+        error_end = self._line_index(error_tokens, old_last_line + 1, error_start, len(error_tokens))
+        
+        # _analyze_line 会向 self.errors 追加信息，这里的信息列表单独维护
+        self.errors = []
+        middle = []
+        for k, line in enumerate(new_lines):
+            middle.extend(self._analyze_line(line, first_line + k))
+        middle_errors = [t for t in middle if t.type is TokenType.ERROR]
+        
+        # 原地替换受影响的部分（切片赋值只移动指针，不复制整个列表）
+        tokens = old_tokens
+        tokens[start:old_end] = middle
+        new_end = start + len(middle)
+        error_tokens[error_start:error_end] = middle_errors
+        messages[error_start:error_end] = [self._error_message(t) for t in middle_errors]
+        
+        if line_delta:
+            for token in islice(tokens, new_end, None):
+                token.line += line_delta
+            # 行号变了，其后的错误信息需要重新生成
+            after = error_start + len(middle_errors)
+            messages[after:] = [self._error_message(t) for t in error_tokens[after:]]
+        
+        self._last_tokens = tokens
+        self._error_tokens = error_tokens
+        self.errors = messages
+        
+        return new_text, tokens, (start, old_end, new_end)
+    
+    @staticmethod
+    def _line_index(tokens: List[Token], line: int, lo: int, hi: int) -> int:
+        """在 tokens[lo:hi]（按行号有序）中二分查找第一个行号不小于 line 的下标
+        
+        bisect 的 key 参数需要 Python 3.10，这里手写二分以兼容旧版本。
+        """
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tokens[mid].line < line:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    @staticmethod
+    def _error_message(token: Token) -> str:
+        """错误Token对应的错误信息（与 analyze() 中的格式一致）"""
+        return f"未识别的字符 '{token.value}' 在 {token.line}:{token.column}"
+    
     def get_errors(self) -> List[str]:
         return self.errors
     
     def clear_errors(self):
         self.errors = []
 
+
+def compute_edit(old_text: str, new_text: str, block: int = 4096) -> Tuple[int, int, str]:
+    """比较新旧文本，求出单处编辑 (起始位置, 删除长度, 插入文本)
+    
+    先按块比较公共前缀/后缀（切片比较在C层完成），再在块内逐字符定位。
+    """
+    limit = min(len(old_text), len(new_text))
+    
+    prefix = 0
+    while prefix + block <= limit and old_text[prefix:prefix + block] == new_text[prefix:prefix + block]:
+        prefix += block
+    while prefix < limit and old_text[prefix] == new_text[prefix]:
+        prefix += 1
+    
+    # 公共后缀不能与公共前缀重叠
+    limit -= prefix
+    suffix = 0
+    while (suffix + block <= limit and
+           old_text[len(old_text) - suffix - block:len(old_text) - suffix] ==
+           new_text[len(new_text) - suffix - block:len(new_text) - suffix]):
+        suffix += block
+    while suffix < limit and old_text[len(old_text) - suffix - 1] == new_text[len(new_text) - suffix - 1]:
+        suffix += 1
+    
+    return prefix, len(old_text) - suffix - prefix, new_text[prefix:len(new_text) - suffix]
+
 # ==================== GUI应用程序 ====================
 
 class LexicalAnalyzerGUI:
@@ -901,6 +1330,7 @@ class LexicalAnalyzerGUI:
         # 初始化组件
         self.analyzer = LexicalAnalyzer()
         self.regex_converter = RegexToNFA()
+        self.dfa_builder = RegexToDFA()
         self.nfa_converter = NFAToDFA()
         self.dfa_minimizer = DFAMinimizer()
         
@@ -909,6 +1339,11 @@ class LexicalAnalyzerGUI:
         self.current_dfa = None
         self.current_min_dfa = None
         
+        # 上一次分析的代码和结果，用于增量分析
+        self._last_code: Optional[str] = None
+        self._last_tokens: List[Token] = []
+        self._token_items: List[str] = []  # 结果表格中每个Token对应的行
+        
         self.setup_ui()
     
     def setup_ui(self):
@@ -1014,6 +1449,24 @@ end."""
         self.regex_input.pack(fill=tk.X, padx=5, pady=5)
         self.regex_input.insert(0, "(a|b)*abb")
         
+        # NFA构造方法
+        method_frame = ttk.Frame(input_frame)
+        method_frame.pack(fill=tk.X, padx=5)
+        ttk.Label(method_frame, text="NFA构造方法:").pack(side=tk.LEFT)
+        self.nfa_method_var = tk.StringVar(value=RegexToNFA.THOMPSON)
+        ttk.Radiobutton(method_frame, text="Thompson", variable=self.nfa_method_var,
+                        value=RegexToNFA.THOMPSON).pack(side=tk.LEFT, padx=10)
+        ttk.Radiobutton(method_frame, text="Glushkov (无ε转移)", variable=self.nfa_method_var,
+                        value=RegexToNFA.GLUSHKOV).pack(side=tk.LEFT, padx=10)
+        
+        # 完整流程：经NFA（子集构造）或由 followpos 直接构造DFA
+        ttk.Label(method_frame, text="完整流程:").pack(side=tk.LEFT, padx=(20, 0))
+        self.pipeline_var = tk.StringVar(value="NFA")
+        ttk.Radiobutton(method_frame, text="正则→NFA→DFA", variable=self.pipeline_var,
+                        value="NFA").pack(side=tk.LEFT, padx=10)
+        ttk.Radiobutton(method_frame, text="正则→DFA (followpos)", variable=self.pipeline_var,
+                        value="DIRECT").pack(side=tk.LEFT, padx=10)
+        
         # 按钮区域
         button_frame = ttk.Frame(input_frame)
         button_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -1083,6 +1536,7 @@ end."""
 === 正则表达式转换标签页 ===
 • 输入正则表达式（支持基本操作符：|, *, +, ?）
 • 可以分步执行转换或一次性完成全流程
+• 完整流程可选择由 followpos 直接构造DFA，不经过NFA
 • 结果显示每个步骤的详细信息
 
 === 自动机可视化标签页 ===
@@ -1108,6 +1562,8 @@ end."""
 • 正闭包：使用 +，如 a+
 • 可选：使用 ?，如 a?
 • 分组：使用括号，如 (ab)*
+• 字符类：使用方括号，如 [a-zA-Z_]、[0-9]
+• 转义：\\d \\w \\s 表示数字、单词字符、空白；\\+ \\* \\( \\. 等表示字符本身
 
 === 快捷键 ===
 • Ctrl+O：加载文件
@@ -1134,21 +1590,29 @@ end."""
             messagebox.showwarning("警告", "请输入要分析的代码")
             return
         
-        # 清空之前的结果
-        for item in self.result_tree.get_children():
-            self.result_tree.delete(item)
-        
-        self.analyzer.clear_errors()
-        
-        # 执行词法分析
-        tokens = self.analyzer.analyze(code)
-        
-        # 显示结果
-        for i, token in enumerate(tokens, 1):
-            if token.type != TokenType.EOF:
+        if self._last_code is None:
+            # 首次分析：全量分析并填充结果表格
+            for item in self.result_tree.get_children():
+                self.result_tree.delete(item)
+            
+            self.analyzer.clear_errors()
+            tokens = self.analyzer.analyze(code)
+            self._token_items = [
                 self.result_tree.insert("", tk.END, values=(
                     i, token.type.value, token.value, token.line, token.column
                 ))
+                for i, token in enumerate(tokens[:-1], 1)
+            ]
+        else:
+            # 增量分析：只重新分析编辑涉及的行，只更新结果表格中变化的部分
+            offset, deleted_length, inserted_text = compute_edit(self._last_code, code)
+            lines_changed = self._last_code.count('\n', offset, offset + deleted_length) != inserted_text.count('\n')
+            _, tokens, (start, old_end, new_end) = self.analyzer.relex(
+                self._last_code, self._last_tokens, offset, deleted_length, inserted_text)
+            self._update_result_rows(tokens, start, old_end, new_end, lines_changed)
+        
+        self._last_code = code
+        self._last_tokens = tokens
         
         # 显示统计信息
         self.show_statistics(tokens)
@@ -1158,6 +1622,30 @@ end."""
             error_msg = "\n".join(self.analyzer.get_errors())
             messagebox.showerror("词法错误", error_msg)
     
+    def _update_result_rows(self, tokens: List[Token], start: int, old_end: int,
+                            new_end: int, lines_changed: bool):
+        """按增量分析的结果更新结果表格"""
+        tree = self.result_tree
+        items = self._token_items
+        
+        if old_end > start:
+            tree.delete(*items[start:old_end])
+        new_items = [
+            tree.insert("", start + k, values=(
+                start + k + 1, token.type.value, token.value, token.line, token.column
+            ))
+            for k, token in enumerate(tokens[start:new_end])
+        ]
+        items[start:old_end] = new_items
+        
+        # Token数量或行数变化时，其后各行的序号/行号需要刷新
+        if new_end != old_end or lines_changed:
+            for k in range(new_end, len(items)):
+                token = tokens[k]
+                tree.item(items[k], values=(
+                    k + 1, token.type.value, token.value, token.line, token.column
+                ))
+    
     def show_statistics(self, tokens):
         """显示统计信息"""
         self.stats_text.delete(1.0, tk.END)
@@ -1184,6 +1672,9 @@ end."""
         self.code_input.delete(1.0, tk.END)
         for item in self.result_tree.get_children():
             self.result_tree.delete(item)
+        self._last_code = None
+        self._last_tokens = []
+        self._token_items = []
         self.stats_text.delete(1.0, tk.END)
     
     def load_file(self):
@@ -1239,12 +1730,15 @@ end."""
             return
         
         try:
-            self.current_nfa = self.regex_converter.convert(regex, TokenType.IDENTIFIER)
+            method = self.nfa_method_var.get()
+            self.current_nfa = self.regex_converter.convert(regex, TokenType.IDENTIFIER, method)
             
             result = f"正则表达式: {regex}\n"
             result += f"转换为NFA成功！\n\n"
             result += f"NFA信息:\n"
+            result += f"  构造方法: {'Glushkov' if method == RegexToNFA.GLUSHKOV else 'Thompson'}\n"
             result += f"  状态数量: {len(self.current_nfa.states)}\n"
+            result += f"  ε转移数量: {sum(len(s.epsilon_transitions) for s in self.current_nfa.states)}\n"
             result += f"  字母表: {sorted(self.current_nfa.alphabet)}\n"
             result += f"  开始状态: {self.current_nfa.start_state.id}\n"
             result += f"  最终状态: {[s.id for s in self.current_nfa.final_states]}\n\n"
@@ -1342,8 +1836,56 @@ end."""
         except Exception as e:
             messagebox.showerror("错误", f"最小化失败: {e}")
     
+    def direct_to_dfa(self):
+        """由 followpos 直接将正则表达式转换为DFA"""
+        regex = self.regex_input.get().strip()
+        if not regex:
+            messagebox.showwarning("警告", "请输入正则表达式")
+            return
+        
+        try:
+            self.current_dfa = self.dfa_builder.convert(regex, TokenType.IDENTIFIER)
+            self.current_nfa = None
+            self.current_min_dfa = None
+            
+            def state_name(state):
+                return '{' + ', '.join(str(position) for position in sorted(state)) + '}'
+            
+            result = f"正则表达式: {regex}\n"
+            result += "由 followpos 直接构造DFA成功（末尾补结束标记 #）！\n\n"
+            result += "位置表:\n"
+            for position, symbol, followpos in self.dfa_builder.position_table:
+                result += f"  {position}: {symbol}  followpos = {state_name(followpos)}\n"
+            result += "\n"
+            result += f"DFA信息:\n"
+            result += f"  状态数量: {len(self.current_dfa.states)}\n"
+            result += f"  字母表: {sorted(self.current_dfa.alphabet)}\n"
+            result += f"  开始状态: {state_name(self.current_dfa.start_state)}\n"
+            result += f"  最终状态数量: {len(self.current_dfa.final_states)}\n"
+            if self.current_dfa.final_states:
+                final_state_ids = [state_name(state) for state in self.current_dfa.final_states]
+                result += f"  最终状态: {', '.join(final_state_ids)}\n"
+            result += "\n"
+            
+            # 显示状态转换
+            result += "状态转换:\n"
+            for (from_state, symbol), to_state in self.current_dfa.transitions.items():
+                result += f"  δ({state_name(from_state)}, {symbol}) = {state_name(to_state)}\n"
+            
+            self.conversion_result.delete(1.0, tk.END)
+            self.conversion_result.insert(tk.END, result)
+            
+        except Exception as e:
+            self.current_dfa = None
+            messagebox.showerror("错误", f"转换失败: {e}")
+    
     def full_conversion(self):
         """执行完整转换流程"""
+        if self.pipeline_var.get() == "DIRECT":
+            self.direct_to_dfa()
+            if self.current_dfa:
+                self.minimize_dfa()
+            return
         self.convert_to_nfa()
         if self.current_nfa:
             self.convert_to_dfa()
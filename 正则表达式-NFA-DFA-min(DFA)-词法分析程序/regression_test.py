@@ -0,0 +1,962 @@
+# -*- coding: utf-8 -*-
+"""
+词法分析程序回归测试
+
+逐项比较各种分析入口与 analyze() 的输出，覆盖曾经出错的边界情况。
+直接运行本文件即可，任何一项不一致都会抛出 AssertionError。
+"""
+
+import sys
+import os
+import io
+import contextlib
+import importlib.util
+import itertools
+import json
+import random
+import re
+import tempfile
+import types
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '参考程序'))
+
+from lexical_analyzer import LexicalAnalyzer, TokenType, SourceToken
+from lexical.analyzer import (LexicalAnalyzer as AutomataAnalyzer, LexicalRule,
+                              create_pascal_analyzer, create_c_analyzer)
+from lexical.token import TokenType as AutomataTokenType
+from lexical.codegen import generate_scanner_module
+from lexical.lines import LineIndex, ByteLineIndex
+from lexical.parallel import analyze_parallel
+from lexical.automata import RegexToNFA, NFAToDFA, RegexToDFA, DFAMinimizer, StateLimitExceeded
+from lexical.charset import CharClasses
+from lexical.regex_ast import parse as parse_regex, leaves
+
+def token_tuples(tokens):
+    """把Token序列转换为便于比较的元组列表"""
+    return [(token.type.name, token.value, token.line, token.column) for token in tokens]
+
+# 各项测试共用的Pascal样例：大小写混合的关键字、跨行注释、转义字符串、错误字符段、非ASCII字符
+PASCAL_SAMPLES = [
+    "program Demo;\nvar x, y: Integer;\nBEGIN\n  x := 12.5 + y1 * (3 - 4);\n  if x <> y then x := 'a\\'b' else y := 0;\nend.\n",
+    "{ 多行\n注释 } WhIlE i <= 10 do i := i + 1; @#$ k >= 2 é {未闭合\n",
+    "12. 3.14.15 'unterminated\n x_1:=_y;;\t\t'é' Program REAL string",
+    "",
+    "@",
+]
+
+def reference_tokens(analyzer, text):
+    """逐条按优先级尝试规则的朴素分析（不支持起始条件），作为比较的基准"""
+    compiled = [(re.compile(pattern), token_type)
+                for pattern, token_type, *_ in sorted(analyzer.rules, key=lambda rule: rule[2], reverse=True)]
+    
+    def first_match(position):
+        for regex, token_type in compiled:
+            match = regex.match(text, position)
+            if match:
+                return match, token_type
+        return None, None
+    
+    def line_column(offset):
+        return text.count('\n', 0, offset) + 1, offset - text.rfind('\n', 0, offset)
+    
+    tokens = []
+    position = 0
+    while position < len(text):
+        match, token_type = first_match(position)
+        if match:
+            if token_type is TokenType.IDENTIFIER:
+                token_type = analyzer.keywords.get(match.group().lower(), token_type)
+            if token_type not in (TokenType.WHITESPACE, TokenType.COMMENT):
+                tokens.append((token_type.name, match.group(), *line_column(position)))
+            position = match.end()
+        else:
+            # 错误字符一直延续到下一个能匹配规则的位置
+            end = position + 1
+            while end < len(text) and first_match(end)[0] is None:
+                end += 1
+            tokens.append(('ERROR', text[position:end], *line_column(position)))
+            position = end
+    tokens.append(('EOF', '', *line_column(len(text))))
+    return tokens
+
+def test_master_regex():
+    """测试主正则：合并后的单次匹配与逐条按优先级匹配的结果一致"""
+    print("=== 测试: 主正则与逐条匹配的一致性 ===")
+    
+    # 含反向引用的规则无法合并为主正则，退回逐条匹配
+    fallback = LexicalAnalyzer()
+    fallback.rules = [(r'"(x*)"\1', TokenType.STRING_LITERAL, 9)] + fallback.rules
+    
+    for name, analyzer in (("主正则", LexicalAnalyzer()), ("逐条匹配", fallback)):
+        for source in PASCAL_SAMPLES + ['"xx"xx "x"y']:
+            expected = reference_tokens(analyzer, source)
+            actual = token_tuples(analyzer.analyze(source))
+            assert actual == expected, f"{name} {source!r}: {actual} != {expected}"
+            assert len(analyzer.errors) == sum(token[0] == 'ERROR' for token in expected)
+        print(f"{name}: 通过")
+    
+    print()
+
+C_SAMPLES = [
+    'int main() {\n  float x = 1.5e3; /* 注释\n跨行 */ x += 0x1F;\n  if (x >= 2 && y != 3) return "s\\"t";\n}\n',
+    "char c = 'é'; // 行注释\n#include <x> $ ` unsigned Int while_1",
+]
+
+def reference_longest_tokens(analyzer, text):
+    """逐条规则求最长匹配（长度相同时取优先级高的规则）的朴素分析，作为自动机扫描的基准
+
+    re 不直接给出最长匹配，这里从最长的候选结束位置起逐个用 fullmatch 检查；
+    含非贪婪量词的规则按最短匹配，即 re.match 的结果。
+    """
+    def rule_end(rule, position):
+        if parse_regex(rule.pattern).shortest_match:
+            match = rule.regex.match(text, position)
+            return match.end() if match else None
+        for end in range(len(text), position, -1):
+            if rule.regex.fullmatch(text, position, end):
+                return end
+        return None
+    
+    def best_match(position):
+        best_end, best_rule = position, None
+        for rule in analyzer.rules:
+            end = rule_end(rule, position)
+            if end is not None and end > best_end:
+                best_end, best_rule = end, rule
+        return best_end, best_rule
+    
+    def line_column(offset):
+        return text.count('\n', 0, offset) + 1, offset - text.rfind('\n', 0, offset)
+    
+    tokens = []
+    position = 0
+    error_start = -1
+    while position < len(text):
+        end, rule = best_match(position)
+        if rule is None:
+            if error_start < 0:
+                error_start = position
+            position += 1
+            continue
+        if error_start >= 0:
+            tokens.append(('ERROR', text[error_start:position], *line_column(error_start)))
+            error_start = -1
+        value = text[position:end]
+        token_type = rule.token_type
+        if token_type is AutomataTokenType.IDENTIFIER:
+            token_type = analyzer.keywords.get(value.lower(), token_type)
+        if token_type not in (AutomataTokenType.WHITESPACE, AutomataTokenType.COMMENT):
+            tokens.append((token_type.name, value, *line_column(position)))
+        position = end
+    if error_start >= 0:
+        tokens.append(('ERROR', text[error_start:], *line_column(error_start)))
+    tokens.append(('EOF', '', *line_column(len(text))))
+    return tokens
+
+def test_dfa_scanner():
+    """测试表驱动扫描器：与逐条规则求最长匹配的结果一致"""
+    print("=== 测试: analyze_with_automata 与逐条最长匹配的一致性 ===")
+    
+    for name, create_analyzer, samples in (("Pascal", create_pascal_analyzer, PASCAL_SAMPLES),
+                                           ("C", create_c_analyzer, C_SAMPLES)):
+        analyzer = create_analyzer()
+        assert analyzer.build_scanner() is not None, f"{name}: 无法构建扫描器"
+        for source in samples:
+            expected = reference_longest_tokens(analyzer, source)
+            actual = token_tuples(analyzer.analyze_with_automata(source))
+            assert actual == expected, f"{name} {source!r}: {actual} != {expected}"
+        print(f"{name}: 通过 ({len(samples)} 个样例)")
+    
+    print()
+
+def test_mmap_non_ascii():
+    """测试内存映射分析：非ASCII字符出现在字符常量、字符串和注释中"""
+    print("=== 测试: analyze_mmap 与 analyze 在非ASCII文本上的一致性 ===")
+    
+    cases = [
+        ("未闭合的字符常量", create_pascal_analyzer, "x := 'é\ny := 1; z\n"),
+        ("Pascal字符串", create_pascal_analyzer, "s := 'héllo wörld';\nt := 'ü\n"),
+        ("Pascal注释", create_pascal_analyzer, "{ commënt ünïcode } x // 行注释ñ\ny := 2\n"),
+        ("C字符串", create_c_analyzer, 's = "héllo\\ü"; t = "未闭合\nx = 1;\n'),
+        ("C注释", create_c_analyzer, "/* cömment\n多行注释 */ int x; // ñ\nc = 'é';\n"),
+    ]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'source.txt')
+        for name, create_analyzer, source in cases:
+            with open(filename, 'w', encoding='utf-8', newline='') as f:
+                f.write(source)
+            analyzer = create_analyzer()
+            expected = token_tuples(analyzer.analyze(source))
+            actual = token_tuples(analyzer.analyze_mmap(filename))
+            assert actual == expected, f"{name}: {actual} != {expected}"
+            print(f"{name}: 通过 ({len(actual)} 个Token)")
+    
+    print()
+
+def test_stream_long_tokens():
+    """测试流式分析：Token的结束符在当前缓冲区之外"""
+    print("=== 测试: analyze_stream 与 analyze 在长Token上的一致性 ===")
+    
+    modes = LexicalAnalyzer()
+    modes.load_rules_from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexical_rules.txt'))
+    
+    cases = [
+        ("跨块注释", LexicalAnalyzer(), 'a {' + ' '.join(['x'] * 20) + '} b'),
+        ("未闭合的注释", LexicalAnalyzer(), 'a {' + ' '.join(['x'] * 20)),
+        ("错误字符后的注释", LexicalAnalyzer(), 'a @@ {' + ' '.join(['x'] * 20) + '} @ {' + 'y' * 10),
+        ("跨块字符串", LexicalAnalyzer(), "s := '" + 'q' * 30 + "'; t := 'unterminated"),
+        ("起始条件", modes, "{ " + 'c' * 30 + " } s := '" + 'q' * 30 + "' @@ x"),
+    ]
+    
+    for name, analyzer, source in cases:
+        expected = [(token.type, token.value, token.line, token.column) for token in analyzer.analyze(source)]
+        expected_errors = list(analyzer.errors)
+        for chunk_size in (1, 3, 8):
+            actual = [(token.type, token.value, token.line, token.column)
+                      for token in analyzer.analyze_stream(io.StringIO(source), chunk_size=chunk_size)]
+            assert actual == expected, f"{name} (chunk_size={chunk_size}): {actual} != {expected}"
+            assert analyzer.errors == expected_errors, f"{name} (chunk_size={chunk_size}): {analyzer.errors}"
+        print(f"{name}: 通过 ({len(expected)} 个Token)")
+    
+    print()
+
+def test_stream_samples():
+    """测试流式分析：各分析器在样例上的结果与整体分析一致"""
+    print("=== 测试: analyze_stream 在样例上的一致性 ===")
+    
+    # 主分析器的正则匹配依靠前瞻窗口，块大小须不小于样例中最长的回退（如 12.5）
+    analyzer = LexicalAnalyzer()
+    for source in PASCAL_SAMPLES:
+        expected = token_tuples(analyzer.analyze(source))
+        expected_errors = list(analyzer.errors)
+        for chunk_size in (8, 64):
+            actual = token_tuples(analyzer.analyze_stream(io.StringIO(source), chunk_size=chunk_size))
+            assert actual == expected, f"{source!r} (chunk_size={chunk_size}): {actual} != {expected}"
+            assert analyzer.errors == expected_errors
+    print(f"lexical_analyzer: 通过 ({len(PASCAL_SAMPLES)} 个样例)")
+    
+    # 自动机扫描器能判断Token是否走到缓冲区末尾，任意块大小都与 analyze_with_automata 一致
+    for name, create_analyzer, samples in (("Pascal", create_pascal_analyzer, PASCAL_SAMPLES),
+                                           ("C", create_c_analyzer, C_SAMPLES)):
+        analyzer = create_analyzer()
+        for source in samples:
+            expected = token_tuples(analyzer.analyze_with_automata(source))
+            expected_errors = list(analyzer.errors)
+            for chunk_size in (1, 3, 8):
+                actual = token_tuples(analyzer.analyze_stream(io.StringIO(source), chunk_size=chunk_size))
+                assert actual == expected, f"{name} {source!r} (chunk_size={chunk_size}): {actual} != {expected}"
+                assert analyzer.errors == expected_errors
+        print(f"lexical.analyzer {name}: 通过 ({len(samples)} 个样例)")
+    
+    print()
+
+def test_parallel():
+    """测试并行分析：切块、前瞻和边界修复之后与顺序分析的结果一致"""
+    print("=== 测试: analyze_parallel 与 analyze 的一致性 ===")
+    
+    # 很小的块和前瞻使切分点附近的长注释、长字符串必须在主进程中重新同步
+    long_comment = "{ " + "注释 " * 40 + "\n跨行 }\n"
+    long_string = "s := '" + "q" * 60 + "';\n"
+    pieces = PASCAL_SAMPLES + [long_comment, long_string]
+    rng = random.Random(5)
+    text = ''.join(rng.choice(pieces) for _ in range(60))
+    
+    analyzer = create_pascal_analyzer()
+    expected = token_tuples(analyzer.analyze(text))
+    expected_errors = list(analyzer.errors)
+    for chunk_size, overlap in ((200, 16), (500, 64)):
+        actual = token_tuples(analyze_parallel(analyzer, text, workers=2, chunk_size=chunk_size, overlap=overlap))
+        assert actual == expected, f"chunk_size={chunk_size}, overlap={overlap}: 结果不一致"
+        assert analyzer.errors == expected_errors, analyzer.errors
+        print(f"chunk_size={chunk_size}, overlap={overlap}: 通过 ({len(actual)} 个Token)")
+    
+    print()
+
+def test_token_buffer():
+    """测试列式Token序列：compact=True 的结果与Token列表逐项一致"""
+    print("=== 测试: TokenBuffer 与Token列表的一致性 ===")
+    
+    for name, create_analyzer, samples in (("Pascal", create_pascal_analyzer, PASCAL_SAMPLES),
+                                           ("C", create_c_analyzer, C_SAMPLES)):
+        analyzer = create_analyzer()
+        for source in samples:
+            for method in (analyzer.analyze, analyzer.analyze_with_automata):
+                expected = method(source)
+                expected_errors = list(analyzer.errors)
+                buffer = method(source, compact=True)
+                assert token_tuples(buffer) == token_tuples(expected), f"{name} {source!r}"
+                assert analyzer.errors == expected_errors
+                assert list(buffer.iter_types()) == [token.type for token in expected]
+                assert [buffer.value_at(i) for i in range(len(buffer))] == [token.value for token in expected]
+                assert [buffer.position_at(i) for i in range(len(buffer))] == \
+                    [(token.line, token.column) for token in expected]
+                assert buffer[-1] == expected[-1] and buffer[1:3] == expected[1:3]
+                counts = {}
+                for token in expected:
+                    counts[token.type] = counts.get(token.type, 0) + 1
+                assert buffer.type_counts() == counts
+        print(f"{name}: 通过 ({len(samples)} 个样例)")
+    
+    print()
+
+def test_keyword_case():
+    """测试关键字大小写不敏感：短关键字查预展开表，超过 KEYWORD_VARIANT_LIMIT 的长关键字转小写查表"""
+    print("=== 测试: 关键字大小写折叠 ===")
+    
+    words = ["PROGRAM", "Begin", "bEgIn", "ImplementATION", "IMPLEMENTATION", "implementations",
+             "Interpretations", "beginx", "Ignored", "ignored", "x"]
+    source = " ".join(words)
+    
+    cases = (("主程序", LexicalAnalyzer(), TokenType), ("参考程序", create_pascal_analyzer(), AutomataTokenType))
+    for name, analyzer, token_type_enum in cases:
+        analyzer.keywords['implementation'] = token_type_enum.PROGRAM
+        analyzer.keywords['interpretations'] = token_type_enum.BEGIN
+        # 含大写字母的关键字不会被识别
+        analyzer.keywords['Ignored'] = token_type_enum.END
+        expected = [(analyzer.keywords.get(word.lower(), token_type_enum.IDENTIFIER), word) for word in words]
+        if name == "主程序":
+            methods = (analyzer.analyze, lambda text: list(analyzer.analyze_stream(io.StringIO(text), chunk_size=4)))
+        else:
+            methods = (analyzer.analyze, analyzer.analyze_with_automata)
+        for method in methods:
+            tokens = [(token.type, token.value) for token in method(source)
+                      if token.type is not token_type_enum.EOF]
+            assert tokens == expected, f"{name}: {tokens}"
+        print(f"{name}: 通过")
+    
+    print()
+
+# 自动机测试共用的正则表达式：并、连接、闭包、字符类、取反、空分支、有界重复和转义
+REGEX_SAMPLES = ['(a|b)*abb', 'a*b*', '(ab|a)(bc|c)*', 'a+b?c', '(a|b)*a(a|b)(a|b)', r'[a-c]+\.',
+                 '[^b]c*', '(|a)b', 'a{2,3}b{,1}', r'a\.|\[b\]', '(a*|b)*c']
+
+# 长度不超过5的全部输入串，字母表含一个不在任何正则中出现的字符
+LANGUAGE_STRINGS = [''.join(chars) for length in range(6) for chars in itertools.product('abc.[d', repeat=length)]
+
+def language_mismatches(accepts, regex, strings=LANGUAGE_STRINGS):
+    """返回 accepts 与 re.fullmatch 判定不一致的输入串"""
+    compiled = re.compile(regex)
+    return [string for string in strings if accepts(string) != bool(compiled.fullmatch(string))]
+
+def moore_block_count(dfa):
+    """Moore算法逐轮细化（缺失转移指向虚拟死状态），返回等价状态块数，作为最小化的基准"""
+    symbols = sorted(dfa.alphabet)
+    block = {state: (state in dfa.accept_states, dfa.token_types.get(state)) for state in dfa.states}
+    block[None] = None
+    while True:
+        signature = {state: (block[state],) + tuple(block[dfa.transitions.get((state, symbol))] for symbol in symbols)
+                     for state in dfa.states}
+        signature[None] = None
+        if len(set(signature.values())) == len(set(block.values())):
+            return len(set(block.values())) - 1
+        block = signature
+
+def test_dfa_minimizer():
+    """测试Hopcroft最小化：语言不变，状态数与Moore算法一致，再次最小化不再减少"""
+    print("=== 测试: DFA最小化 ===")
+    
+    minimizer = DFAMinimizer()
+    for regex in REGEX_SAMPLES:
+        dfa = NFAToDFA().convert(RegexToNFA().convert(regex))
+        minimized = minimizer.minimize(dfa)
+        mismatches = language_mismatches(lambda string: minimized.simulate(string)[0], regex)
+        assert not mismatches, f"{regex}: {mismatches[:5]}"
+        assert len(minimized.states) == moore_block_count(dfa), regex
+        assert len(minimizer.minimize(minimized).states) == len(minimized.states), regex
+        print(f"{regex}: 通过 ({len(dfa.states)} -> {len(minimized.states)} 个状态)")
+    
+    print()
+
+def naive_closure(states):
+    """沿ε转移深度优先搜索求闭包，作为位集闭包表的基准"""
+    closure = set(states)
+    stack = list(states)
+    while stack:
+        for target in stack.pop().transitions.get('ε', ()):
+            if target not in closure:
+                closure.add(target)
+                stack.append(target)
+    return frozenset(closure)
+
+def test_subset_construction():
+    """测试子集构造：DFA状态与朴素子集构造得到的NFA状态集合一一对应，语言与 re 一致"""
+    print("=== 测试: 子集构造 ===")
+    
+    for regex in REGEX_SAMPLES:
+        nfa = RegexToNFA().convert(regex)
+        start = naive_closure({nfa.start_state})
+        subsets = {start}
+        worklist = [start]
+        while worklist:
+            current = worklist.pop()
+            for symbol in nfa.alphabet:
+                moved = {target for state in current for target in state.transitions.get(symbol, ())}
+                if moved:
+                    target = naive_closure(moved)
+                    if target not in subsets:
+                        subsets.add(target)
+                        worklist.append(target)
+        
+        dfa = NFAToDFA().convert(nfa)
+        assert set(map(frozenset, dfa.states.values())) == subsets, regex
+        assert dfa.states[dfa.start_state] == start, regex
+        mismatches = language_mismatches(lambda string: dfa.simulate(string)[0], regex)
+        assert not mismatches, f"{regex}: {mismatches[:5]}"
+        print(f"{regex}: 通过 ({len(dfa.states)} 个状态)")
+    
+    # 状态数恰好达到上限时正常完成，超过上限时抛出 StateLimitExceeded
+    nfa = RegexToNFA().convert('(a|b)*a(a|b)(a|b)(a|b)')
+    state_count = len(NFAToDFA().convert(nfa).states)
+    assert len(NFAToDFA().convert(nfa, max_states=state_count).states) == state_count
+    try:
+        NFAToDFA().convert(nfa, max_states=state_count - 1)
+        assert False, "应抛出 StateLimitExceeded"
+    except StateLimitExceeded:
+        pass
+    print("状态数上限: 通过")
+    
+    print()
+
+def test_char_classes():
+    """测试字符等价类：划分恰好区分各字符集合，按等价类构建的自动机与 re 一致且与逐字符构建的等价"""
+    print("=== 测试: 字符等价类 ===")
+    
+    rng = random.Random(11)
+    universe = 'abcdefgh'
+    for _ in range(200):
+        char_sets = [set(rng.sample(universe, rng.randint(1, len(universe)))) for _ in range(rng.randint(1, 4))]
+        char_classes = CharClasses(char_sets)
+        membership = lambda char: tuple(char in chars for chars in char_sets)
+        signatures = [membership(next(iter(members))) for members in char_classes.members if members]
+        # 同一等价类的字符属于相同的集合，不同等价类的字符至少被一个集合区分
+        assert len(set(signatures)) == len(signatures)
+        for members in char_classes.members:
+            assert len({membership(char) for char in members}) <= 1
+        for chars in char_sets:
+            assert set().union(*(char_classes.members[class_id] for class_id in char_classes.symbols(chars))) == chars
+        assert char_classes.classify('z') == char_classes.other_class
+    print("随机划分: 通过")
+    
+    strings = [''.join(chars) for length in range(5) for chars in itertools.product("aZ_9.'\n一", repeat=length)]
+    lexer_regexes = ['[a-zA-Z_][a-zA-Z0-9_]*', r'[0-9]+(\.[0-9]+)?', "'[^'\n]*'", '[一-龥][一-龥a-zA-Z0-9_]*', '.']
+    minimizer = DFAMinimizer()
+    for regex in lexer_regexes + REGEX_SAMPLES:
+        char_sets = [chars for chars, _ in RegexToNFA().char_sets(regex)]
+        char_classes = CharClasses(char_sets)
+        dfa = minimizer.minimize(NFAToDFA().convert(RegexToNFA(char_classes).convert(regex)))
+        plain = minimizer.minimize(NFAToDFA().convert(RegexToNFA().convert(regex)))
+        for sample in (strings, LANGUAGE_STRINGS):
+            mismatches = language_mismatches(lambda string: dfa.simulate(string)[0], regex, sample)
+            assert not mismatches, f"{regex}: {mismatches[:5]}"
+        assert len(dfa.states) == len(plain.states), regex
+        assert len(dfa.transitions) <= len(plain.transitions), regex
+        print(f"{regex!r}: 通过 ({char_classes.count} 个等价类, {len(dfa.transitions)} 条转移)")
+    
+    print()
+
+def test_lazy_dfa():
+    """测试按需确定化扫描器：缓存很小、频繁淘汰时结果仍与完整DFA扫描一致"""
+    print("=== 测试: 按需确定化扫描器 ===")
+    
+    for name, create_analyzer, samples in (("Pascal", create_pascal_analyzer, PASCAL_SAMPLES),
+                                           ("C", create_c_analyzer, C_SAMPLES)):
+        analyzer = create_analyzer()
+        for cache_size in (4, 10000):
+            analyzer.lazy_cache_size = cache_size
+            for source in samples:
+                expected = token_tuples(analyzer.analyze_with_automata(source))
+                expected_errors = list(analyzer.errors)
+                actual = token_tuples(analyzer.analyze_with_automata(source, lazy=True))
+                assert actual == expected, f"{name} {source!r} (cache_size={cache_size}): {actual} != {expected}"
+                assert analyzer.errors == expected_errors
+            stats = analyzer.build_lazy_scanner().stats
+            assert stats['cached'] <= cache_size
+            assert (stats['evictions'] > 0) == (cache_size == 4), stats
+        print(f"{name}: 通过 ({len(samples)} 个样例)")
+    
+    # 完整DFA需要 2^17 个状态的规则，按需确定化只构造输入经过的状态
+    analyzer = AutomataAnalyzer()
+    analyzer.add_rule('(a|b)*a(a|b){16}', AutomataTokenType.IDENTIFIER, 2)
+    analyzer.add_rule('[ab]', AutomataTokenType.NUMBER, 1)
+    analyzer.add_rule(' +', AutomataTokenType.WHITESPACE)
+    analyzer.lazy_cache_size = 64
+    rng = random.Random(16)
+    for _ in range(20):
+        source = ' '.join(''.join(rng.choice('ab') for _ in range(rng.randint(1, 30))) for _ in range(5)) + ' c'
+        actual = token_tuples(analyzer.analyze_with_automata(source, lazy=True))
+        assert actual == reference_longest_tokens(analyzer, source), source
+    print("(a|b)*a(a|b){16}: 通过")
+    
+    print()
+
+def test_error_runs():
+    """测试错误处理：连续的未识别字符合并为一个错误Token，错误信息条数受 max_errors 限制"""
+    print("=== 测试: 错误字符段与错误信息上限 ===")
+    
+    cases = (("lexical_analyzer", LexicalAnalyzer(), ('analyze',)),
+             ("lexical.analyzer", create_pascal_analyzer(), ('analyze', 'analyze_with_automata')))
+    for name, analyzer, methods in cases:
+        for method_name in methods:
+            method = getattr(analyzer, method_name)
+            
+            tokens = [token for token in method("x @#$ y " + "@" * 30) if token.type.name == 'ERROR']
+            assert [(token.value, token.column) for token in tokens] == [("@#$", 3), ("@" * 30, 9)], tokens
+            assert len(analyzer.errors) == 2
+            assert "共 3 个字符" in analyzer.errors[0]
+            assert "@" * 20 + "..." in analyzer.errors[1] and "@" * 21 not in analyzer.errors[1]
+            
+            source = "x @ " * 150
+            analyzer.max_errors = 100
+            tokens = method(source)
+            assert sum(token.type.name == 'ERROR' for token in tokens) == 150
+            assert len(analyzer.errors) == 101 and "另有 50 处错误未列出" in analyzer.errors[-1]
+            # 上一次分析中被略去的错误不会计入下一次
+            method(source[:40])
+            assert len(analyzer.errors) == 10
+            analyzer.max_errors = None
+            method(source)
+            assert len(analyzer.errors) == 150
+            print(f"{name}.{method_name}: 通过")
+    
+    print()
+
+def test_lazy_values():
+    """测试零拷贝Token：lazy_values=True 的结果与普通Token逐项相等，值和位置都引用源文本"""
+    print("=== 测试: analyze(lazy_values=True) 的一致性 ===")
+    
+    analyzer = LexicalAnalyzer()
+    for source in PASCAL_SAMPLES:
+        expected = analyzer.analyze(source)
+        expected_errors = list(analyzer.errors)
+        tokens = analyzer.analyze(source, lazy_values=True)
+        assert token_tuples(tokens) == token_tuples(expected), source
+        assert tokens == expected
+        assert analyzer.errors == expected_errors
+        for token in tokens:
+            assert isinstance(token, SourceToken) and token.source is source
+            assert source[token.start:token.end] == token.value
+    print(f"lexical_analyzer: 通过 ({len(PASCAL_SAMPLES)} 个样例)")
+    
+    print()
+
+def test_analyze_bytes():
+    """测试字节模式分析：在UTF-8字节串上扫描的结果与解码后 analyze_with_automata 一致"""
+    print("=== 测试: analyze_bytes 与 analyze_with_automata 的一致性 ===")
+    
+    extra_samples = ["s := 'héllo wörld'; { 注释 } 变量 := 1 😀\nt := 'ü\n", "é"]
+    for name, create_analyzer, samples in (("Pascal", create_pascal_analyzer, PASCAL_SAMPLES + extra_samples),
+                                           ("C", create_c_analyzer, C_SAMPLES + extra_samples)):
+        analyzer = create_analyzer()
+        assert analyzer.build_byte_scanner() is not None, f"{name}: 无法构建字节扫描器"
+        for source in samples:
+            expected = token_tuples(analyzer.analyze_with_automata(source))
+            expected_errors = list(analyzer.errors)
+            data = source.encode('utf-8')
+            for value in (data, bytearray(data), memoryview(data)):
+                for compact in (False, True):
+                    actual = token_tuples(analyzer.analyze_bytes(value, compact))
+                    assert actual == expected, f"{name} {source!r} ({type(value).__name__}): {actual} != {expected}"
+                    assert analyzer.errors == expected_errors
+        print(f"{name}: 通过 ({len(samples)} 个样例)")
+    
+    print()
+
+def test_epsilon_closures():
+    """测试位集ε闭包表：每个状态的闭包与深度优先搜索一致，增加ε转移后重新计算"""
+    print("=== 测试: ε闭包位集 ===")
+    
+    for regex in REGEX_SAMPLES + ['((a*)*|b*)*', '(a?b?)*c?']:
+        nfa = RegexToNFA().convert(regex)
+        _, bit_of, masks = nfa.closure_table()
+        for state in nfa.states:
+            expected = naive_closure({state})
+            assert nfa.states_of(masks[bit_of[state]]) == expected, f"{regex}: {state}"
+            assert nfa.epsilon_closure({state}) == expected
+        print(f"{regex}: 通过 ({len(nfa.states)} 个状态)")
+    
+    # 增加ε转移会作废已算好的闭包表
+    nfa = RegexToNFA().convert('ab')
+    nfa.epsilon_closure({nfa.start_state})
+    accept = next(iter(nfa.accept_states))
+    nfa.add_transition(nfa.start_state, 'ε', accept)
+    assert accept in nfa.epsilon_closure({nfa.start_state})
+    assert NFAToDFA().convert(nfa).simulate('')[0]
+    print("闭包表失效: 通过")
+    
+    print()
+
+def test_glushkov():
+    """测试Glushkov构造：没有ε转移，状态数为位置数加一，语言与 Thompson 构造和 re 一致"""
+    print("=== 测试: Glushkov位置自动机 ===")
+    
+    minimizer = DFAMinimizer()
+    for regex in REGEX_SAMPLES:
+        nfa = RegexToNFA(method=RegexToNFA.GLUSHKOV).convert(regex)
+        assert all('ε' not in state.transitions for state in nfa.states), regex
+        assert len(nfa.states) == len(RegexToNFA().char_sets(regex)) + 1, regex
+        dfa = minimizer.minimize(NFAToDFA().convert(nfa))
+        mismatches = language_mismatches(lambda string: dfa.simulate(string)[0], regex)
+        assert not mismatches, f"{regex}: {mismatches[:5]}"
+        thompson = minimizer.minimize(NFAToDFA().convert(RegexToNFA().convert(regex)))
+        assert len(dfa.states) == len(thompson.states), regex
+        print(f"{regex}: 通过 ({len(nfa.states)} 个NFA状态)")
+    
+    print()
+
+def test_direct_dfa():
+    """测试 followpos 直接构造DFA：语言与 re 一致，最小化后与 Thompson 构造 + 子集构造的结果相同"""
+    print("=== 测试: 正则直接构造DFA ===")
+    
+    minimizer = DFAMinimizer()
+    for regex in REGEX_SAMPLES + ['(a|b)*?b']:
+        direct = RegexToDFA().convert(regex, AutomataTokenType.IDENTIFIER)
+        mismatches = language_mismatches(lambda string: direct.simulate(string)[0], regex.replace('*?', '*'))
+        assert not mismatches, f"{regex}: {mismatches[:5]}"
+        assert all(direct.token_types[state] is AutomataTokenType.IDENTIFIER for state in direct.accept_states)
+        
+        minimized = minimizer.minimize(direct)
+        thompson = minimizer.minimize(NFAToDFA().convert(RegexToNFA().convert(regex, AutomataTokenType.IDENTIFIER)))
+        assert len(minimized.states) == len(thompson.states), regex
+        assert minimized.accept_states == thompson.accept_states, regex
+        assert minimized.transitions == thompson.transitions, regex
+        print(f"{regex}: 通过 ({len(direct.states)} -> {len(minimized.states)} 个状态)")
+    
+    try:
+        RegexToDFA().convert('(a|b)*a(a|b)(a|b)(a|b)', max_states=8)
+        assert False, "应抛出 StateLimitExceeded"
+    except StateLimitExceeded:
+        pass
+    print("状态数上限: 通过")
+    
+    print()
+
+def test_regex_parser():
+    """测试正则解析器：转义、字符类和重复次数的语义与 re 一致，不支持的语法抛出 ValueError"""
+    print("=== 测试: 正则表达式解析 ===")
+    
+    strings = [''.join(chars) for length in range(5) for chars in itertools.product("a1 _.]-\n", repeat=length)]
+    minimizer = DFAMinimizer()
+    for regex in [r'\d+', r'\w\W', r'\s*\S', r'[^\d]+', r'\.\]', r'[\]a-]+', r'[a\-1]', '[.]', '.',
+                  r'[^\n]', r'\n', 'a{3}', '(a|1){1,2}_', '(|a)1', '']:
+        dfa = minimizer.minimize(NFAToDFA().convert(RegexToNFA().convert(regex)))
+        mismatches = language_mismatches(lambda string: dfa.simulate(string)[0], regex, strings)
+        assert not mismatches, f"{regex}: {mismatches[:5]}"
+    print("支持的语法: 通过")
+    
+    for regex, message in (('(ab', "括号不匹配"), ('ab)', "括号不匹配"), ('a\\', "不能以"),
+                           ('^a', "锚点"), ('a$', "锚点"), ('[a', "缺少"), ('[z-a]', "范围错误"),
+                           ('a{3,2}', "重复次数范围错误"), (r'\1', "转义序列"), ('(?=a)', "分组语法"),
+                           ('*a', "无效"), ('a|*', "无效"), ('{2}', "无效")):
+        try:
+            parse_regex(regex)
+            assert False, f"{regex}: 应抛出 ValueError"
+        except ValueError as error:
+            assert message in str(error), f"{regex}: {error}"
+    print("不支持的语法: 通过")
+    
+    # 解析和遍历语法树的递归深度不随正则长度增加；同一模式只解析一次
+    long_regex = '|'.join(['ab'] * 3000)
+    assert len(leaves(parse_regex(long_regex).tree)) == 6000
+    assert parse_regex(long_regex) is parse_regex(long_regex)
+    nfa = RegexToNFA(method=RegexToNFA.GLUSHKOV).convert('a' * 3000)
+    assert len(NFAToDFA().convert(nfa).states) == 3001
+    print("长正则: 通过")
+    
+    print()
+
+def test_benchmark():
+    """测试性能测试脚本：小语料上各实现的Token数一致，结果可写入JSON并与基准比较"""
+    print("=== 测试: 性能测试脚本 ===")
+    
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'benchmark.py')
+    spec = importlib.util.spec_from_file_location('benchmark', path)
+    benchmark = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(benchmark)
+    
+    for language in ('pascal', 'c'):
+        for mix in benchmark.MIXES:
+            text = benchmark.generate_corpus(language, 2000, mix)
+            assert text == benchmark.generate_corpus(language, 2000, mix), f"{language}/{mix}: 语料不可复现"
+            assert len(text) >= 2000, f"{language}/{mix}: {len(text)}"
+        print(f"{language} 语料: 通过 ({len(benchmark.MIXES)} 种组成)")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'result.json')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            assert benchmark.main(['--size', '4K', '--repeat', '1', '--no-memory', '--json', filename]) == 0
+            assert benchmark.main(['--size', '4K', '--repeat', '1', '--no-memory', '--baseline', filename,
+                                   '--variants', 'ref-dfa', '--tolerance', '0.99']) == 0
+        with open(filename, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    
+    # 同一语言上各实现（主程序与参考程序的规则不同，分开比较）产生的Token数相同
+    results = [item for item in report['results'] if 'skipped' not in item]
+    assert {item['variant'] for item in results} >= {'main', 'ref-regex', 'ref-dfa', 'ref-codegen'}
+    for language in ('pascal', 'c'):
+        for prefix in ('main', 'ref-'):
+            counts = {item['variant']: item['tokens'] for item in results
+                      if item['language'] == language and item['variant'].startswith(prefix)}
+            assert len(set(counts.values())) <= 1, f"{language}: {counts}"
+    print(f"main: 通过 ({len(results)} 项结果)")
+    
+    # 吞吐量下降超过容许比例时报告回退
+    baseline = {'results': [dict(item, tokens_per_s=item['tokens_per_s'] * 10) for item in results]}
+    assert len(benchmark.compare_baseline(results, baseline, 0.2)) == len(results)
+    assert benchmark.compare_baseline(results, report, 0.2) == []
+    print("基准比较: 通过")
+    
+    print()
+
+def test_codegen_standalone():
+    """测试生成的扫描器模块：不导入 re，行列号与 analyze_with_automata 一致"""
+    print("=== 测试: codegen 生成的独立扫描器 ===")
+    
+    cases = [
+        ("Pascal", create_pascal_analyzer, "program p;\n{ 注释\n跨行 }\nx := 'é' + 12.5;\n\n@ y\n"),
+        ("C", create_c_analyzer, 'int x = 1;\n/* a\n b */ s = "ü\\n";\r\n# z\n'),
+    ]
+    
+    for name, create_analyzer, source in cases:
+        analyzer = create_analyzer()
+        module_source = generate_scanner_module(analyzer)
+        assert 'import re' not in module_source, f"{name}: 生成的模块仍依赖 re"
+        module = types.ModuleType('generated_lexer')
+        exec(compile(module_source, '<generated_lexer>', 'exec'), module.__dict__)
+        tokens, _ = module.tokenize(source)
+        expected = [(token.type.name, token.value, token.line, token.column)
+                    for token in analyzer.analyze_with_automata(source)]
+        assert [tuple(token) for token in tokens] == expected, f"{name}: {tokens} != {expected}"
+        print(f"{name}: 通过 ({len(tokens)} 个Token)")
+    
+    print()
+
+def test_start_conditions():
+    """测试起始条件：规则文件取代默认规则，闭合的注释和字符串经过 push/pop 规则"""
+    print("=== 测试: 规则文件中的起始条件 ===")
+    
+    rules_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexical_rules.txt')
+    analyzer = LexicalAnalyzer()
+    analyzer.load_rules_from_file(rules_file)
+    analyzer._compile_rules()
+    assert analyzer._match_rule("{ abc }", 0)[2] == (('push', 'COMMENT'),)
+    assert analyzer._match_rule("'abc'", 0)[2] == (('push', 'STR'), ('more', None))
+    tokens = token_tuples(analyzer.analyze("x := 'a\\'b'; { c } y"))
+    assert tokens[2] == ('STRING_LITERAL', "'a\\'b'", 1, 6), tokens
+    assert [token[0] for token in tokens] == ['IDENTIFIER', 'ASSIGN', 'STRING_LITERAL', 'SEMICOLON', 'IDENTIFIER', 'EOF']
+    print("lexical_rules.txt: 注释和字符串由起始条件规则匹配")
+    
+    # 注释内部的文本产生 IDENTIFIER，只有经过 COMMENT 起始条件时才会出现
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'rules.txt')
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("%x COMMENT\n"
+                    "\\{|COMMENT|10|push:COMMENT\n"
+                    "<COMMENT>[^}]+|IDENTIFIER|10\n"
+                    "<COMMENT>\\}|COMMENT|10|pop\n"
+                    "[a-z]+|IDENTIFIER|5\n"
+                    "[ ]+|WHITESPACE|1\n")
+        analyzer = LexicalAnalyzer()
+        analyzer.load_rules_from_file(filename)
+        values = [token.value for token in analyzer.analyze("a { b c } d")]
+        assert values == ['a', ' b c ', 'd', ''], values
+        stream_values = [token.value for token in analyzer.analyze_stream(io.StringIO("a { b c } d"), chunk_size=2)]
+        assert stream_values == values, stream_values
+    print("临时规则文件: 注释内容经过 COMMENT 起始条件")
+    
+    # 输入在起始条件中结束的错误同样受 max_errors 限制
+    analyzer = LexicalAnalyzer()
+    analyzer.load_rules_from_file(rules_file)
+    analyzer.max_errors = 1
+    analyzer.analyze("@ { x")
+    assert analyzer.errors == ["未识别的字符 '@' 在 1:1", "另有 1 处错误未列出"], analyzer.errors
+    print("max_errors: 起始条件错误计入上限")
+    
+    print()
+
+def test_scanner_cache():
+    """测试扫描器缓存：默认不写文件，规则未变时读入转移表，规则改变后缓存失效"""
+    print("=== 测试: 规则文件的扫描器缓存 ===")
+    
+    source = "begin x1 := 12 + y; end"
+    
+    def load(filename, use_cache):
+        analyzer = AutomataAnalyzer()
+        analyzer.rules = []
+        assert analyzer.load_rules_from_file(filename, use_cache=use_cache), analyzer.errors
+        return analyzer
+    
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'rules.txt')
+        cache_file = filename + '.dfa'
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("[a-zA-Z][a-zA-Z0-9]*\tIDENTIFIER\t5\n"
+                    "[0-9]+\tNUMBER\t5\n"
+                    ":=\tASSIGN\t10\n"
+                    "\\+\tPLUS\t10\n"
+                    ";\tSEMICOLON\t10\n"
+                    "[ ]+\tWHITESPACE\t1\n")
+        
+        analyzer = load(filename, use_cache=False)
+        expected = token_tuples(analyzer.analyze_with_automata(source))
+        assert not os.path.exists(cache_file), "默认不应写入缓存文件"
+        
+        analyzer = load(filename, use_cache=True)
+        assert analyzer._scanner is None
+        assert token_tuples(analyzer.analyze_with_automata(source)) == expected
+        assert os.path.exists(cache_file), "构建扫描器后应写入缓存文件"
+        
+        cached = load(filename, use_cache=True)
+        assert cached._scanner is not None, "规则未变时应命中缓存"
+        assert token_tuples(cached.analyze_with_automata(source)) == expected
+        print("缓存往返: 通过")
+        
+        # 改变一条规则的优先级：旧缓存不再命中，重新构建的结果反映新规则
+        with open(filename, 'a', encoding='utf-8') as f:
+            f.write("[0-9]+[a-z]*\tIDENTIFIER\t8\n")
+        changed = load(filename, use_cache=True)
+        assert changed._scanner is None, "规则改变后缓存应失效"
+        fresh = load(filename, use_cache=False)
+        assert token_tuples(changed.analyze_with_automata("x := 12ab")) == \
+            token_tuples(fresh.analyze_with_automata("x := 12ab"))
+        assert load(filename, use_cache=True)._scanner is not None, "重新构建后应写入新的缓存"
+        print("规则改变后失效: 通过")
+    
+    print()
+
+def test_nfa_engine():
+    """测试NFA引擎：最长匹配语义，以及 {m,n} 展开后确定化会膨胀的规则"""
+    print("=== 测试: 位并行NFA引擎 ===")
+    
+    # NFA引擎取最长匹配，re 取第一个成功的分支
+    regex_rule = LexicalRule('a|ab', AutomataTokenType.IDENTIFIER)
+    nfa_rule = LexicalRule('a|ab', AutomataTokenType.IDENTIFIER, engine='nfa')
+    assert regex_rule.match('ab', 0).group() == 'a'
+    assert nfa_rule.match('ab', 0).group() == 'ab'
+    print("a|ab: regex 匹配 'a'，nfa 匹配 'ab'")
+    
+    # 倒数第17个字符为 a：DFA需要 2^17 个状态，超过上限后改用NFA模拟
+    pattern = '(a|b)*a(a|b){16}'
+    rule = LexicalRule(pattern, AutomataTokenType.IDENTIFIER)
+    rule.build_automata()
+    assert rule.min_dfa is None and rule.bit_nfa is not None
+    nfa_rule = LexicalRule(pattern, AutomataTokenType.IDENTIFIER, engine='nfa')
+    rng = random.Random(15)
+    for _ in range(200):
+        text = ''.join(rng.choice('ab') for _ in range(rng.randint(0, 40))) + 'c'
+        match = rule.regex.match(text, 0)
+        expected = match.end() if match else None
+        assert rule.match_automaton(text, 0) == expected, text
+        nfa_match = nfa_rule.match(text, 0)
+        assert (nfa_match.end() if nfa_match else None) == expected, text
+    print(f"{pattern}: 与 re 的匹配结果一致")
+    
+    print()
+
+def test_line_index():
+    """测试行首偏移索引：每个偏移的行列与逐字符计数一致"""
+    print("=== 测试: LineIndex 行列换算 ===")
+    
+    for text in ("", "\n", "abc", "a\nbc\n", "x\r\ny\n\n\nz", "{ 多行\n注释 }\n'é'\n"):
+        index = LineIndex(text)
+        assert index.line_count == text.count('\n') + 1
+        for offset in range(len(text) + 1):
+            expected = (text.count('\n', 0, offset) + 1, offset - text.rfind('\n', 0, offset))
+            assert index.position(offset) == expected, f"{text!r} {offset}"
+            assert index.line_of(offset) == expected[0]
+    print("逐偏移换算: 通过")
+    
+    print()
+
+def test_byte_line_index():
+    """测试字节偏移的行列换算：按顺序和乱序查询都与按字符换算一致"""
+    print("=== 测试: ByteLineIndex 与 LineIndex 的一致性 ===")
+    
+    text = "x := 'é';\n中文 y😀 z\n\n  w é\n"
+    data = text.encode('utf-8')
+    offsets = [(i, len(text[:i].encode('utf-8'))) for i in range(len(text) + 1)]
+    expected = LineIndex(text)
+    rng = random.Random(21)
+    for name, order in (("顺序", offsets), ("乱序", rng.sample(offsets, len(offsets)))):
+        index = ByteLineIndex(data)
+        for char_offset, byte_offset in order:
+            actual = index.position(byte_offset)
+            assert actual == expected.position(char_offset), f"{name} {byte_offset}: {actual}"
+        print(f"{name}查询: 通过 ({len(order)} 个偏移)")
+    
+    print()
+
+def test_gui_relex():
+    """测试GUI分析器的增量分析：多次编辑后与重新完整分析的结果一致"""
+    print("=== 测试: relex 与 analyze 的一致性 ===")
+    
+    try:
+        import lexical_analyzer_gui
+    except ImportError as e:
+        print(f"跳过: 无法导入GUI模块 ({e})")
+        print()
+        return
+    
+    edits = [
+        (0, 0, "program p;\nvar x: integer;\nbegin\nend.\n"),
+        (29, 0, " x := 1 @ 2;\n"),
+        (11, 3, "@"),
+        (0, 11, ""),
+        (5, 0, "\n\n# y\n"),
+        (3, 9, "begin"),
+    ]
+    
+    analyzer = lexical_analyzer_gui.LexicalAnalyzer()
+    text = ""
+    tokens = list(analyzer.analyze(text))
+    for offset, deleted_length, inserted_text in edits:
+        text, tokens, _ = analyzer.relex(text, tokens, offset, deleted_length, inserted_text)
+        reference = lexical_analyzer_gui.LexicalAnalyzer()
+        expected = token_tuples(reference.analyze(text))
+        assert token_tuples(tokens) == expected, f"{text!r}: {token_tuples(tokens)} != {expected}"
+        assert analyzer.errors == reference.errors, f"{text!r}: {analyzer.errors} != {reference.errors}"
+    print(f"{len(edits)} 次编辑: 通过 ({len(tokens)} 个Token)")
+    
+    print()
+
+def run_all_tests():
+    """运行所有测试"""
+    print("词法分析程序回归测试")
+    print("=" * 50)
+    print()
+    
+    test_master_regex()
+    test_dfa_scanner()
+    test_mmap_non_ascii()
+    test_stream_long_tokens()
+    test_stream_samples()
+    test_parallel()
+    test_token_buffer()
+    test_keyword_case()
+    test_dfa_minimizer()
+    test_subset_construction()
+    test_char_classes()
+    test_codegen_standalone()
+    test_benchmark()
+    test_start_conditions()
+    test_lazy_dfa()
+    test_error_runs()
+    test_lazy_values()
+    test_analyze_bytes()
+    test_epsilon_closures()
+    test_glushkov()
+    test_direct_dfa()
+    test_regex_parser()
+    test_scanner_cache()
+    test_nfa_engine()
+    test_line_index()
+    test_byte_line_index()
+    test_gui_relex()
+    
+    print("=" * 50)
+    print("所有测试完成！")
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词法分析器性能测试脚本
+
+生成指定大小的 Pascal / C 合成语料，分别用各个词法分析器实现分析，
+报告 Token/s、MB/s、峰值内存和分阶段耗时（准备 / 分析），输出表格和JSON：
+- main:        lexical_analyzer.py（主正则）及其流式分析
+- ref-*:       参考程序/lexical 的正则逐条匹配、紧凑Token缓冲区、表驱动DFA、
+               按需确定化DFA，以及 codegen 生成的独立扫描器
+- gui:         lexical_analyzer_gui.py（需要 tkinter/matplotlib/networkx，缺少时跳过）
+
+用法:
+    python scripts/benchmark.py --size 1M --mix mixed --json result.json
+    python scripts/benchmark.py --size 1M --baseline result.json   # 与上次结果比较，变慢时返回1
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCE_ROOT = os.path.join(ROOT, '参考程序')
+for path in (ROOT, REFERENCE_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+# ==================== 语料生成 ====================
+
+PASCAL_KEYWORDS = ['program', 'var', 'begin', 'end', 'if', 'then', 'else', 'while', 'do',
+                   'for', 'to', 'integer', 'real', 'string', 'Begin', 'END', 'While']
+C_KEYWORDS = ['int', 'char', 'float', 'double', 'void', 'if', 'else', 'while', 'for',
+              'return', 'struct', 'unsigned', 'static', 'const', 'sizeof']
+WORDS = ['alpha', 'beta', 'count', 'index', 'total', 'result', 'value', 'node', 'buffer',
+         'x', 'y', 'i', 'j', 'tmp_1', 'maxValue', 'item_count']
+
+# 语料组成：片段种类 -> 权重
+MIXES: Dict[str, Dict[str, int]] = {
+    'mixed': {'identifiers': 6, 'numbers': 2, 'operators': 3, 'comments': 1, 'strings': 1},
+    'identifiers': {'identifiers': 1},
+    'numbers': {'numbers': 1},
+    'comments': {'comments': 1},
+    'strings': {'strings': 1},
+    'long': {'long': 1, 'identifiers': 4},
+    'junk': {'junk': 1},
+}
+
+
+def _identifier(rng: random.Random, keywords: List[str]) -> str:
+    if rng.random() < 0.3:
+        return rng.choice(keywords)
+    return rng.choice(WORDS) + (str(rng.randint(0, 99)) if rng.random() < 0.3 else '')
+
+
+def _number(rng: random.Random) -> str:
+    if rng.random() < 0.3:
+        return f"{rng.randint(0, 9999)}.{rng.randint(0, 999)}"
+    return str(rng.randint(0, 10 ** rng.randint(1, 9)))
+
+
+def _pascal_piece(kind: str, rng: random.Random) -> str:
+    """生成一段Pascal语料（以换行结束）"""
+    if kind == 'identifiers':
+        return ' '.join(_identifier(rng, PASCAL_KEYWORDS) for _ in range(rng.randint(3, 10))) + ';\n'
+    if kind == 'numbers':
+        return ' '.join(_number(rng) for _ in range(rng.randint(3, 10))) + '\n'
+    if kind == 'operators':
+        a, b, c = (rng.choice(WORDS) for _ in range(3))
+        return f"  {a} := ({b} + {_number(rng)}) * {c} - 1 / 2; if {a} <> {b} then {c} := {a} >= {b};\n"
+    if kind == 'comments':
+        return '{ ' + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 20))) + ' }\n'
+    if kind == 'strings':
+        return f"s := '{' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 8)))} \\' ok';\n"
+    if kind == 'long':
+        choice = rng.randint(0, 2)
+        if choice == 0:
+            return 'id_' + 'x' * rng.randint(1000, 10000) + ';\n'
+        if choice == 1:
+            return '{ ' + 'comment ' * rng.randint(1000, 8000) + '}\n'
+        return "s := '" + 'y' * rng.randint(1000, 10000) + "';\n"
+    if kind == 'junk':
+        return ''.join(chr(rng.choice((rng.randint(0, 8), rng.randint(127, 255), rng.randint(33, 126))))
+                       for _ in range(rng.randint(20, 80))) + '\n'
+    raise ValueError(f"未知的语料种类: {kind}")
+
+
+def _c_piece(kind: str, rng: random.Random) -> str:
+    """生成一段C语料（以换行结束）"""
+    if kind == 'identifiers':
+        return ' '.join(_identifier(rng, C_KEYWORDS) for _ in range(rng.randint(3, 10))) + ';\n'
+    if kind == 'numbers':
+        return 'x = ' + ' + '.join(_number(rng) for _ in range(rng.randint(3, 10))) + ';\n'
+    if kind == 'operators':
+        a, b, c = (rng.choice(WORDS) for _ in range(3))
+        return f"    {a} = ({b} + {_number(rng)}) * {c}; if ({a} <= {b} && {c} != 0) {{ {a}++; }}\n"
+    if kind == 'comments':
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 20)))
+        return f"/* {words} */\n" if rng.random() < 0.5 else f"// {words}\n"
+    if kind == 'strings':
+        return f"printf(\"{' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 8)))} \\\" %d\\n\", 'c');\n"
+    if kind == 'long':
+        choice = rng.randint(0, 2)
+        if choice == 0:
+            return 'id_' + 'x' * rng.randint(1000, 10000) + ';\n'
+        if choice == 1:
+            return '/* ' + 'comment ' * rng.randint(1000, 8000) + '*/\n'
+        return 's = "' + 'y' * rng.randint(1000, 10000) + '";\n'
+    if kind == 'junk':
+        return _pascal_piece('junk', rng)
+    raise ValueError(f"未知的语料种类: {kind}")
+
+
+def generate_corpus(language: str, size: int, mix: str = 'mixed', seed: int = 1) -> str:
+    """生成约 size 个字符的合成语料"""
+    rng = random.Random(seed)
+    weights = MIXES[mix]
+    kinds = list(weights)
+    make_piece = _c_piece if language == 'c' else _pascal_piece
+    pieces = []
+    length = 0
+    while length < size:
+        piece = make_piece(rng.choices(kinds, [weights[kind] for kind in kinds])[0], rng)
+        pieces.append(piece)
+        length += len(piece)
+    return ''.join(pieces)
+
+
+# ==================== 被测实现 ====================
+
+class Variant:
+    """一个被测实现
+
+    prepare() 创建分析器并完成规则编译等准备工作，返回分析函数；
+    分析函数接受文本，返回Token数。
+    """
+
+    def __init__(self, name: str, languages: Tuple[str, ...], prepare: Callable[[str], Callable[[str], int]]):
+        self.name = name
+        self.languages = languages
+        self.prepare = prepare
+
+
+def _main_variant(mode: str) -> Callable[[str], Callable[[str], int]]:
+    def prepare(language: str) -> Callable[[str], int]:
+        import lexical_analyzer
+        analyzer = lexical_analyzer.LexicalAnalyzer()
+        analyzer._compile_rules()
+        analyzer._compile_keywords()
+        if mode == 'stream':
+            return lambda text: sum(1 for _ in analyzer.analyze_stream(io.StringIO(text)))
+        if mode == 'lazy':
+            return lambda text: len(analyzer.analyze(text, lazy_values=True))
+        return lambda text: len(analyzer.analyze(text))
+    return prepare
+
+
+def _reference_analyzer(language: str):
+    from lexical.analyzer import create_c_analyzer, create_pascal_analyzer
+    return create_c_analyzer() if language == 'c' else create_pascal_analyzer()
+
+
+def _reference_variant(mode: str) -> Callable[[str], Callable[[str], int]]:
+    def prepare(language: str) -> Callable[[str], int]:
+        analyzer = _reference_analyzer(language)
+        if mode == 'regex':
+            return lambda text: len(analyzer.analyze(text))
+        if mode == 'compact':
+            return lambda text: len(analyzer.analyze(text, compact=True))
+        if mode == 'dfa':
+            if analyzer.build_scanner() is None:
+                raise RuntimeError("规则集无法构建为表驱动扫描器")
+            return lambda text: len(analyzer.analyze_with_automata(text))
+        if mode == 'lazy':
+            if analyzer.build_lazy_scanner() is None:
+                raise RuntimeError("规则集无法构建为按需确定化扫描器")
+            return lambda text: len(analyzer.analyze_with_automata(text, lazy=True))
+        if mode == 'bytes':
+            if analyzer.build_byte_scanner() is None:
+                raise RuntimeError("规则集无法构建为UTF-8字节扫描器")
+            # 模拟直接读入的字节输入：语料只编码一次，不计入之后各次分析
+            encoded: List = [None, b'']
+
+            def run(text: str) -> int:
+                if encoded[0] is not text:
+                    encoded[:] = [text, text.encode('utf-8')]
+                return len(analyzer.analyze_bytes(encoded[1], compact=True))
+            return run
+        raise ValueError(mode)
+    return prepare
+
+
+def _codegen_variant(language: str) -> Callable[[str], int]:
+    import types
+    from lexical.codegen import generate_scanner_module
+    source = generate_scanner_module(_reference_analyzer(language))
+    module = types.ModuleType('generated_lexer')
+    exec(compile(source, '<generated_lexer>', 'exec'), module.__dict__)
+    return lambda text: len(module.tokenize(text)[0])
+
+
+def _gui_variant(language: str) -> Callable[[str], int]:
+    import lexical_analyzer_gui
+    analyzer = lexical_analyzer_gui.LexicalAnalyzer()
+    return lambda text: len(analyzer.analyze(text))
+
+
+VARIANTS: List[Variant] = [
+    Variant('main', ('pascal',), _main_variant('list')),
+    Variant('main-lazy', ('pascal',), _main_variant('lazy')),
+    Variant('main-stream', ('pascal',), _main_variant('stream')),
+    Variant('ref-regex', ('pascal', 'c'), _reference_variant('regex')),
+    Variant('ref-compact', ('pascal', 'c'), _reference_variant('compact')),
+    Variant('ref-dfa', ('pascal', 'c'), _reference_variant('dfa')),
+    Variant('ref-lazy', ('pascal', 'c'), _reference_variant('lazy')),
+    Variant('ref-bytes', ('pascal', 'c'), _reference_variant('bytes')),
+    Variant('ref-codegen', ('pascal', 'c'), _codegen_variant),
+    Variant('gui', ('pascal',), _gui_variant),
+]
+
+
+# ==================== 测量 ====================
+
+def measure(variant: Variant, language: str, text: str, repeat: int, memory: bool) -> Dict:
+    """测量一个实现：准备耗时、最佳分析耗时、吞吐量和（可选的）峰值内存"""
+    result: Dict = {'variant': variant.name, 'language': language}
+    try:
+        started = time.perf_counter()
+        run = variant.prepare(language)
+        result['prepare_s'] = time.perf_counter() - started
+    except Exception as e:  # 缺少依赖（如GUI的 tkinter）或规则集不支持
+        result['skipped'] = f"{type(e).__name__}: {e}"
+        return result
+
+    timings = []
+    tokens = 0
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        tokens = run(text)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    result.update({
+        'tokens': tokens,
+        'lex_s': best,
+        'lex_mean_s': sum(timings) / len(timings),
+        'tokens_per_s': tokens / best if best else 0.0,
+        'mb_per_s': size_mb / best if best else 0.0,
+    })
+
+    if memory:
+        # 单独运行一次测量峰值内存（tracemalloc 会明显拖慢分析，不计入耗时）
+        gc.collect()
+        tracemalloc.start()
+        run(text)
+        result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return result
+
+
+def format_table(results: List[Dict]) -> str:
+    """把测量结果格式化为文本表格"""
+    header = f"{'实现':<14}{'语言':<8}{'Token数':>10}{'准备(ms)':>11}{'分析(ms)':>11}" \
+             f"{'Token/s':>12}{'MB/s':>8}{'峰值内存(MB)':>14}"
+    lines = [header, '-' * len(header)]
+    for item in results:
+        if 'skipped' in item:
+            lines.append(f"{item['variant']:<14}{item['language']:<8}  跳过: {item['skipped']}")
+            continue
+        memory = f"{item['peak_memory_mb']:.1f}" if 'peak_memory_mb' in item else '-'
+        lines.append(
+            f"{item['variant']:<14}{item['language']:<8}{item['tokens']:>10}"
+            f"{item['prepare_s'] * 1000:>11.1f}{item['lex_s'] * 1000:>11.1f}"
+            f"{item['tokens_per_s']:>12.0f}{item['mb_per_s']:>8.2f}{memory:>14}"
+        )
+    return '\n'.join(lines)
+
+
+def compare_baseline(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """与基准结果比较，返回吞吐量下降超过 tolerance 的实现说明"""
+    previous = {(item['variant'], item['language']): item
+                for item in baseline.get('results', []) if 'skipped' not in item}
+    regressions = []
+    for item in results:
+        old = previous.get((item['variant'], item['language']))
+        if 'skipped' in item or old is None or not old.get('tokens_per_s'):
+            continue
+        ratio = item['tokens_per_s'] / old['tokens_per_s']
+        if ratio < 1 - tolerance:
+            regressions.append(f"{item['variant']}/{item['language']}: "
+                               f"{old['tokens_per_s']:.0f} -> {item['tokens_per_s']:.0f} Token/s "
+                               f"({(ratio - 1) * 100:+.1f}%)")
+    return regressions
+
+
+def parse_size(text: str) -> int:
+    """解析大小参数：1000、64K、2M"""
+    units = {'K': 1024, 'M': 1024 * 1024}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="词法分析器性能测试")
+    parser.add_argument('--size', default='256K', help="每种语言的语料大小（字符），如 64K、1M，默认 256K")
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed', help="语料组成，默认 mixed")
+    parser.add_argument('--languages', default='pascal,c', help="语言列表，默认 pascal,c")
+    parser.add_argument('--variants', help="只测试这些实现（逗号分隔），默认全部")
+    parser.add_argument('--repeat', type=int, default=3, help="分析的重复次数，取最好成绩，默认3")
+    parser.add_argument('--seed', type=int, default=1, help="语料随机种子")
+    parser.add_argument('--no-memory', action='store_true', help="不测量峰值内存")
+    parser.add_argument('--json', help="把结果写入JSON文件")
+    parser.add_argument('--baseline', help="与之比较的JSON结果文件")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="与基准相比允许的吞吐量下降比例，默认0.2")
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size)
+    languages = [language.strip() for language in args.languages.split(',') if language.strip()]
+    selected = set(args.variants.split(',')) if args.variants else None
+
+    results = []
+    for language in languages:
+        text = generate_corpus(language, size, args.mix, args.seed)
+        print(f"语料: {language}, {args.mix}, {len(text)} 字符, {text.count(chr(10))} 行", file=sys.stderr)
+        for variant in VARIANTS:
+            if language not in variant.languages or (selected and variant.name not in selected):
+                continue
+            results.append(measure(variant, language, text, args.repeat, not args.no_memory))
+
+    print(format_table(results))
+
+    report = {
+        'size': size,
+        'mix': args.mix,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if (baseline.get('size'), baseline.get('mix'), baseline.get('seed')) != (size, args.mix, args.seed):
+            print("\n基准结果的语料参数（size/mix/seed）与本次不同，不做比较", file=sys.stderr)
+            return 0
+        regressions = compare_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\n性能回退:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
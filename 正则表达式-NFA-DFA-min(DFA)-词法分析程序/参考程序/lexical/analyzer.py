@@ -10,41 +10,178 @@
 - 错误处理
 """
 
+import mmap
+import os
 import re
-from typing import List, Dict, Optional, Tuple
-from .token import Token, TokenType
-from .automata import RegexToNFA, NFAToDFA, DFAMinimizer, NFA, DFA
+from bisect import bisect_right
+from typing import List, Dict, Optional, Tuple, Iterator, TextIO, Union, Callable
+from .token import Token, TokenType, TokenBuffer, SourceToken, source_slice
+from .automata import (RegexToNFA, RegexToDFA, DFAMinimizer, NFA, DFA, BitNFA, LazyDFA,
+                       StateLimitExceeded)
+from .charset import CharClasses
+from .scanner import DFAScanner, ByteScanner
+from .cache import CACHE_SUFFIX, rules_digest, load_scanner, save_scanner
+from .firstchar import start_char_regex
+from .lines import LineIndex, make_line_index
+
+
+# 流式分析默认每次读取的字符数
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# 单条规则确定化后的DFA状态数上限，超过时该规则改用位并行NFA模拟（BitNFA）
+DFA_STATE_LIMIT = 5000
+
+# 按需确定化扫描器（LazyDFA）默认缓存的转移数
+LAZY_CACHE_SIZE = 10000
+
+# 规则的匹配引擎：regex 使用 re 模块，nfa 使用 BitNFA 直接模拟Thompson NFA
+RULE_ENGINES = ('regex', 'nfa')
+
+# 错误信息条数上限，超出的错误只计数，分析结束时追加一条汇总（None 表示不限）
+MAX_ERRORS = 100
+
+# 错误信息中一段未识别字符最多显示的字符数
+ERROR_PREVIEW = 20
+
+# 关键字字母数不超过该值时预先展开全部大小写形式（2^n 个），更长的关键字查表前转小写
+KEYWORD_VARIANT_LIMIT = 12
+
+
+def keyword_variants(keyword: str) -> List[str]:
+    """返回关键字的全部大小写形式"""
+    variants = ['']
+    for char in keyword:
+        cases = {char.lower(), char.upper()}
+        variants = [prefix + case for prefix in variants for case in cases]
+    return variants
+
+
+class NFAMatch:
+    """NFA引擎的匹配结果，提供与 re.Match 相同的常用接口"""
+    
+    __slots__ = ('string', 'pos', 'endpos')
+    
+    def __init__(self, string: str, start: int, end: int):
+        self.string = string
+        self.pos = start
+        self.endpos = end
+    
+    def start(self) -> int:
+        return self.pos
+    
+    def end(self) -> int:
+        return self.endpos
+    
+    def span(self) -> Tuple[int, int]:
+        return self.pos, self.endpos
+    
+    def group(self, index: int = 0) -> str:
+        if index != 0:
+            raise IndexError("NFA引擎的匹配结果没有分组")
+        return self.string[self.pos:self.endpos]
 
 
 class LexicalRule:
-    """词法规则类"""
+    """词法规则类
     
-    def __init__(self, pattern: str, token_type: TokenType, priority: int = 0):
+    engine 为 'nfa' 时 match() 用 BitNFA 直接模拟Thompson NFA（最长匹配），
+    适合确定化会指数膨胀的规则；默认的 'regex' 使用 re 模块。
+    两者的匹配语义不同：NFA引擎与自动机扫描器一样取最长匹配（POSIX语义），
+    re 按顺序尝试选择式的分支、取第一个成功的分支。例如 a|ab 在 "ab" 上，
+    'nfa' 匹配 "ab"，'regex' 只匹配 "a"；选择式的分支互不为前缀时两者相同。
+    """
+    
+    def __init__(self, pattern: str, token_type: TokenType, priority: int = 0,
+                 engine: str = 'regex'):
+        if engine not in RULE_ENGINES:
+            raise ValueError(f"未知的匹配引擎 '{engine}'，应为 {', '.join(RULE_ENGINES)}")
         self.pattern = pattern
         self.token_type = token_type
         self.priority = priority
+        self.engine = engine
         self.regex = re.compile(pattern)
+        self.bytes_regex: Optional[re.Pattern] = None  # 内存映射模式下按需编译
         
         # 构建NFA/DFA（可选，用于高级功能）
         self.nfa: Optional[NFA] = None
         self.dfa: Optional[DFA] = None
+        self.min_dfa: Optional[DFA] = None
+        # 位并行NFA：engine 为 'nfa'，或确定化超过 DFA_STATE_LIMIT 个状态时构建
+        self.bit_nfa: Optional[BitNFA] = None
+        if engine == 'nfa':
+            # 正则使用了NFA构造不支持的语法时抛出 ValueError
+            self.nfa = self._build_nfa()
+            self.bit_nfa = BitNFA(self.nfa)
+    
+    def _char_classes(self) -> CharClasses:
+        """本规则的字符等价类"""
+        return CharClasses([chars for chars, _ in RegexToNFA().char_sets(self.pattern)])
+    
+    def _build_nfa(self) -> NFA:
+        """在本规则的字符等价类上构造Thompson NFA"""
+        converter = RegexToNFA(self._char_classes())
+        return converter.convert(self.pattern, self.token_type)
     
     def build_automata(self):
-        """构建自动机"""
+        """构建自动机
+        
+        自动机在本规则的字符等价类上转移：规则中的字符类只对应几个等价类，
+        而不是逐字符展开。DFA由 followpos 方法直接构造（RegexToDFA），不经过NFA；
+        engine 为 'nfa'，或DFA状态数超过 DFA_STATE_LIMIT 时不构建DFA，
+        改用位并行NFA（bit_nfa）。
+        """
+        if self.engine == 'nfa':
+            return
         try:
-            converter = RegexToNFA()
-            self.nfa = converter.convert(self.pattern, self.token_type)
+            regex_to_dfa = RegexToDFA(self._char_classes())
+            try:
+                self.dfa = regex_to_dfa.convert(self.pattern, self.token_type, DFA_STATE_LIMIT)
+            except StateLimitExceeded:
+                # 确定化会指数膨胀：改为构造NFA直接模拟
+                self.dfa = self.min_dfa = None
+                self.nfa = self._build_nfa()
+                self.bit_nfa = BitNFA(self.nfa)
+                return
+            if regex_to_dfa.shortest_match:
+                # 非贪婪规则（如 /\*[\s\S]*?\*/）在首次接受处停止
+                self.dfa.remove_accept_transitions()
             
-            nfa_to_dfa = NFAToDFA()
-            self.dfa = nfa_to_dfa.convert(self.nfa)
+            self.min_dfa = DFAMinimizer().minimize(self.dfa)
         except Exception:
             # 如果构建失败，保持为None
-            pass
+            self.nfa = self.dfa = self.min_dfa = None
     
-    def match(self, text: str, position: int) -> Optional[re.Match]:
+    def match(self, text: str, position: int) -> Optional[Union[re.Match, NFAMatch]]:
         """在指定位置匹配文本"""
+        if self.bit_nfa is not None and self.engine == 'nfa':
+            end = self.bit_nfa.match(text, position)
+            return NFAMatch(text, position, end) if end is not None else None
         return self.regex.match(text, position)
     
+    def match_automaton(self, text: str, position: int) -> Optional[int]:
+        """用本规则的自动机（最小化DFA或位并行NFA）做最长匹配，返回结束位置
+        
+        需先调用 build_automata()；没有可用的自动机或不匹配时返回None。
+        """
+        if self.min_dfa is not None:
+            return self.min_dfa.match(text, position)
+        if self.bit_nfa is not None:
+            return self.bit_nfa.match(text, position)
+        return None
+    
+    def match_bytes(self, data, position: int) -> Optional[re.Match]:
+        r"""在UTF-8字节数据（bytes/mmap）的指定位置匹配
+        
+        模式按字节编译（见 _utf8_bytes_pattern），\d、\w、\s 等只匹配ASCII字符，
+        . 、[^...] 等总是匹配完整的多字节字符，匹配不会停在字符中间；
+        模式本身必须是ASCII，否则非ASCII字符类无法按字节正确表达。
+        """
+        if self.bytes_regex is None:
+            if not self.pattern.isascii():
+                raise ValueError(f"内存映射模式不支持含非ASCII字符的模式: {self.pattern}")
+            self.bytes_regex = re.compile(_utf8_bytes_pattern(self.pattern))
+        return self.bytes_regex.match(data, position)
+    
     def __str__(self):
         return f"Rule({self.pattern}, {self.token_type.value}, {self.priority})"
 
@@ -54,11 +191,36 @@ class LexicalAnalyzer:
     
     def __init__(self):
         self.rules: List[LexicalRule] = []
-        self.tokens: List[Token] = []
+        self.tokens: Union[List[Token], TokenBuffer] = []
         self.errors: List[str] = []
+        # 错误信息条数上限（None 表示不限），超出部分只计数
+        self.max_errors: Optional[int] = MAX_ERRORS
+        self._suppressed_errors = 0
         self.current_line = 1
         self.current_column = 1
+        # 当前分析文本的行首偏移索引：Token只按起始偏移记录，行列在需要时换算
+        self._line_index: Optional[LineIndex] = None
+        # 逐个创建 Token 对象时直接在行首偏移表上二分（紧凑模式下为None，不构建）
+        self._line_starts = None
         self.keywords: Dict[str, TokenType] = {}
+        # 查找下一个可能开始Token的位置（首字符正则的 search），无法确定时为None
+        self._find_start: Optional[Callable] = None
+        self._find_start_key: Optional[tuple] = None
+        self._scanner: Optional[DFAScanner] = None
+        self._scanner_key: Optional[tuple] = None
+        # 由 self._scanner 改写的UTF-8字节扫描器，及它所对应的 DFAScanner
+        self._byte_scanner: Optional[ByteScanner] = None
+        self._byte_scanner_source: Optional[DFAScanner] = None
+        # 按需确定化扫描器缓存的转移数上限（见 build_lazy_scanner）
+        self.lazy_cache_size = LAZY_CACHE_SIZE
+        self._lazy_scanner: Optional[LazyDFA] = None
+        self._lazy_key: Optional[tuple] = None
+        # 扫描器缓存文件（load_rules_from_file 设置），规则集未变时直接读入转移表
+        self.cache_file: Optional[str] = None
+        # 关键字查找表：以Token原文为键（含全部大小写形式），识别标识符时无需转小写
+        self._keyword_table: Dict[str, TokenType] = {}
+        self._long_keywords: Dict[str, TokenType] = {}
+        self._keyword_key: Optional[tuple] = None
         
         # 初始化默认规则
         self._init_default_rules()
@@ -270,15 +432,21 @@ class LexicalAnalyzer:
         for pattern, token_type, priority in c_rules:
             self.add_rule(pattern, token_type, priority)
     
-    def add_rule(self, pattern: str, token_type: TokenType, priority: int = 0):
-        """添加词法规则"""
-        rule = LexicalRule(pattern, token_type, priority)
+    def add_rule(self, pattern: str, token_type: TokenType, priority: int = 0,
+                 engine: str = 'regex'):
+        """添加词法规则（engine 见 LexicalRule）"""
+        rule = LexicalRule(pattern, token_type, priority, engine)
         self.rules.append(rule)
         # 按优先级排序
         self.rules.sort(key=lambda x: x.priority, reverse=True)
     
-    def load_rules_from_file(self, filename: str) -> bool:
-        """从文件加载词法规则"""
+    def load_rules_from_file(self, filename: str, use_cache: bool = False) -> bool:
+        """从文件加载词法规则
+        
+        use_cache 为 True 时（默认关闭，以免在规则文件旁留下文件），编译好的扫描器
+        缓存在规则文件旁的 <filename>.dfa 中，以规则集的哈希为键：
+        规则未变时此处直接读入转移表，否则在首次构建扫描器后写入。
+        """
         try:
             with open(filename, 'r', encoding='utf-8') as f:
                 for line_num, line in enumerate(f, 1):
@@ -289,6 +457,7 @@ class LexicalAnalyzer:
                             pattern = parts[0]
                             token_type_name = parts[1]
                             priority = int(parts[2]) if len(parts) > 2 else 0
+                            engine = parts[3] if len(parts) > 3 else 'regex'
                             
                             # 查找对应的TokenType
                             token_type = None
@@ -297,23 +466,30 @@ class LexicalAnalyzer:
                                     token_type = tt
                                     break
                             
-                            if token_type:
-                                self.add_rule(pattern, token_type, priority)
+                            if engine not in RULE_ENGINES:
+                                self.errors.append(f"第{line_num}行: 未知的匹配引擎 '{engine}'")
+                            elif token_type:
+                                self.add_rule(pattern, token_type, priority, engine)
                             else:
                                 self.errors.append(f"第{line_num}行: 未知的Token类型 '{token_type_name}'")
                         else:
                             self.errors.append(f"第{line_num}行: 格式错误，应为 '模式\t类型\t优先级'")
+            if use_cache:
+                self.cache_file = filename + CACHE_SUFFIX
+                self._load_cached_scanner(self._rule_set_key())
             return True
         except Exception as e:
             self.errors.append(f"加载规则文件失败: {e}")
             return False
     
-    def analyze(self, text: str) -> List[Token]:
-        """执行词法分析"""
-        self.tokens = []
-        self.errors = []
-        self.current_line = 1
-        self.current_column = 1
+    def analyze(self, text: str, compact: bool = False) -> Union[List[Token], TokenBuffer]:
+        """执行词法分析
+        
+        compact 为 True 时结果存入列式的 TokenBuffer（不为每个Token创建对象，
+        也不切片Token的值），适合Token数量很大的输入；按下标访问或迭代时得到
+        引用源文本的 SourceToken，值和位置在访问时才计算。
+        """
+        self._reset(text, compact)
         
         position = 0
         while position < len(text):
@@ -323,63 +499,583 @@ class LexicalAnalyzer:
             for rule in self.rules:
                 match = rule.match(text, position)
                 if match:
-                    value = match.group(0)
-                    token_type = rule.token_type
-                    
-                    # 检查是否为关键字
-                    if token_type == TokenType.IDENTIFIER and value.lower() in self.keywords:
-                        token_type = self.keywords[value.lower()]
-                    
-                    # 创建Token（跳过空白字符和注释）
-                    if token_type not in [TokenType.WHITESPACE, TokenType.COMMENT]:
-                        token = Token(token_type, value, self.current_line, self.current_column)
-                        self.tokens.append(token)
-                    
-                    # 更新位置信息
-                    if token_type == TokenType.NEWLINE:
-                        self.current_line += 1
-                        self.current_column = 1
-                    else:
-                        self.current_column += len(value)
-                    
+                    self._emit(rule.token_type, text, position, match.end())
                     position = match.end()
                     matched = True
                     break
             
             if not matched:
-                # 未匹配的字符，报告错误
-                char = text[position]
-                error_msg = f"未识别的字符 '{char}' 在第 {self.current_line} 行第 {self.current_column} 列"
-                self.errors.append(error_msg)
-                
-                # 创建错误Token
-                error_token = Token(TokenType.ERROR, char, self.current_line, self.current_column)
-                self.tokens.append(error_token)
-                
-                position += 1
-                self.current_column += 1
-        
-        # 添加EOF Token
-        eof_token = Token(TokenType.EOF, '', self.current_line, self.current_column)
-        self.tokens.append(eof_token)
+                # 未匹配的字符：一直跳到下一个能匹配规则的位置，整段只产生一个错误Token
+                end = self._error_run_end(text, position)
+                self._emit(None, text, position, end)
+                position = end
         
+        self._emit_eof(text)
         return self.tokens
     
-    def analyze_with_automata(self, text: str) -> List[Token]:
-        """使用自动机进行词法分析（实验性功能）"""
+    def _error_run_end(self, text: str, position: int) -> int:
+        """position 处无法匹配时，返回这段错误字符的结束位置（其后第一个能匹配规则的位置）
+        
+        借助规则的首字符正则跳过不可能开始Token的字符，只在可能的位置逐条尝试规则。
+        """
+        find_start = self._start_searcher()
+        length = len(text)
+        end = position + 1
+        while end < length:
+            if find_start is not None:
+                found = find_start(text, end)
+                if found is None:
+                    return length
+                end = found.start()
+            for rule in self.rules:
+                if rule.match(text, end):
+                    return end
+            end += 1
+        return length
+    
+    def _start_searcher(self) -> Optional[Callable]:
+        """当前规则集的首字符正则的 search 方法（按规则集缓存）
+        
+        用NFA引擎的规则与 re 的语义可能不同（如 \\w 只含ASCII），有这样的规则时返回None。
+        """
+        key = tuple((rule.pattern, rule.engine) for rule in self.rules)
+        if key != self._find_start_key:
+            start_chars = None
+            if all(rule.engine == 'regex' for rule in self.rules):
+                start_chars = start_char_regex([rule.pattern for rule in self.rules])
+            self._find_start = start_chars.search if start_chars else None
+            self._find_start_key = key
+        return self._find_start
+    
+    def _reset(self, text: str, compact: bool = False):
+        """开始一次新的分析：清空结果并按需创建紧凑Token缓冲区
+        
+        行首偏移索引在第一次需要行列时才构建，紧凑模式下交给 TokenBuffer 共用。
+        text 也可以是UTF-8字节串（见 analyze_bytes），此时Token不由 _emit 产生。
+        """
+        self._line_index = make_line_index(text)
+        self._line_starts = None if compact or not isinstance(text, str) else self._line_index.starts
+        self.tokens = TokenBuffer(text, self._line_index) if compact else []
+        self.errors = []
+        self._suppressed_errors = 0
+        self.current_line = 1
+        self.current_column = 1
+        self._build_keyword_table()
+    
+    def _build_keyword_table(self):
+        """按当前关键字集合构建（或复用）以原文为键的关键字查找表"""
+        key = tuple(self.keywords.items())
+        if key == self._keyword_key:
+            return
+        table: Dict[str, TokenType] = {}
+        long_keywords: Dict[str, TokenType] = {}
+        for keyword, token_type in self.keywords.items():
+            if keyword != keyword.lower():
+                # 标识符总是转小写后再比较，含大写字母的关键字永远不会被识别
+                continue
+            if sum(char.isalpha() for char in keyword) <= KEYWORD_VARIANT_LIMIT:
+                for variant in keyword_variants(keyword):
+                    table.setdefault(variant, token_type)
+            else:
+                long_keywords.setdefault(keyword, token_type)
+        self._keyword_table = table
+        self._long_keywords = long_keywords
+        self._keyword_key = key
+    
+    def _emit(self, token_type: Optional[TokenType], text: str, start: int, end: int,
+              check_keyword: bool = True):
+        """把一个匹配结果（token_type 为None表示一段错误字符）追加到 self.tokens
+        
+        只有真正产生的Token（及错误信息）才由行首偏移索引换算行列，
+        空白和注释只是跳过，不做任何位置记录。
+        """
+        if token_type is None:
+            line, column = self._line_index.position(start)
+            self._report_error(text[start:end], line, column)
+            token_type = TokenType.ERROR
+        else:
+            token_type = self._classify(token_type, text, start, end, check_keyword)
+            if token_type is None:
+                return
+        
+        starts = self._line_starts
+        if starts is None:
+            self.tokens.append(token_type, start, end - start)
+        else:
+            line = bisect_right(starts, start)
+            self.tokens.append(Token(token_type, text[start:end], line, start - starts[line - 1] + 1))
+    
+    def _emit_eof(self, text: str):
+        """添加EOF Token，并把 current_line / current_column 置为文本末尾的位置"""
+        self._finish_errors()
+        self.current_line, self.current_column = self._line_index.position(len(text))
+        if not isinstance(self.tokens, TokenBuffer):
+            self.tokens.append(Token(TokenType.EOF, '', self.current_line, self.current_column))
+        else:
+            self.tokens.append(TokenType.EOF, len(text), 0)
+    
+    def _classify(self, token_type: TokenType, text: str, start: int, end: int,
+                  check_keyword: bool = True) -> Optional[TokenType]:
+        """识别关键字，返回应记录的Token类型（空白和注释返回None）
+        
+        扫描器已区分出关键字时 check_keyword 为 False。
+        """
+        # 检查是否为关键字（按原文查表，不分配小写字符串）
+        if check_keyword and token_type is TokenType.IDENTIFIER:
+            value = text[start:end]
+            keyword = self._keyword_table.get(value)
+            if keyword is None and self._long_keywords:
+                keyword = self._long_keywords.get(value.lower())
+            if keyword is not None:
+                return keyword
+        
+        # 跳过空白字符和注释
+        if token_type in (TokenType.WHITESPACE, TokenType.COMMENT):
+            return None
+        return token_type
+    
+    def _advance_position(self, value: str):
+        """流式分析中按Token原文推进 current_line / current_column（Token可以跨行）"""
+        newline = value.rfind('\n')
+        if newline < 0:
+            self.current_column += len(value)
+        else:
+            self.current_line += value.count('\n')
+            self.current_column = len(value) - newline
+    
+    def _make_token(self, token_type: TokenType, value: str,
+                    check_keyword: bool = True) -> Optional[Token]:
+        """流式分析中根据一个匹配结果创建Token并推进行列位置，空白和注释返回None"""
+        line, column = self.current_line, self.current_column
+        self._advance_position(value)
+        token_type = self._classify(token_type, value, 0, len(value), check_keyword)
+        if token_type is None:
+            return None
+        return Token(token_type, value, line, column)
+    
+    def _report_error(self, value: str, line: int, column: int):
+        """记录一段未识别的字符，错误信息超过 max_errors 条后只计数"""
+        if self.max_errors is not None and len(self.errors) >= self.max_errors:
+            self._suppressed_errors += 1
+        elif len(value) == 1:
+            self.errors.append(f"未识别的字符 '{value}' 在第 {line} 行第 {column} 列")
+        else:
+            preview = value if len(value) <= ERROR_PREVIEW else value[:ERROR_PREVIEW] + '...'
+            self.errors.append(f"未识别的字符序列 '{preview}'（共 {len(value)} 个字符）"
+                               f"在第 {line} 行第 {column} 列")
+    
+    def _make_error(self, value: str) -> Token:
+        """流式分析中记录一段未识别的字符，创建错误Token并推进行列位置"""
+        error_token = Token(TokenType.ERROR, value, self.current_line, self.current_column)
+        self._report_error(value, self.current_line, self.current_column)
+        self._advance_position(value)
+        return error_token
+    
+    def _finish_errors(self):
+        """分析结束时为超出上限而未记录的错误追加一条汇总"""
+        if self._suppressed_errors:
+            self.errors.append(f"另有 {self._suppressed_errors} 处错误未列出")
+            self._suppressed_errors = 0
+    
+    def build_scanner(self) -> Optional[DFAScanner]:
+        """为当前规则集构建（或取出缓存的）表驱动扫描器
+        
+        任一规则无法转换为自动机（使用了不支持的正则语法）时返回None。
+        扫描器的列是所有规则字符等价类的公共细分，关键字中的字符各自单独成类，
+        以便关键字字典树逐字符转移。
+        关键字作为不区分大小写的路径并入扫描器：被第一条 IDENTIFIER 规则
+        识别出的关键字直接得到关键字类型，见 DFAScanner。
+        """
+        key = self._rule_set_key()
+        if key == self._scanner_key or self._load_cached_scanner(key):
+            return self._scanner
+        
         # 为所有规则构建自动机
         for rule in self.rules:
-            if rule.dfa is None:
+            if rule.min_dfa is None:
                 rule.build_automata()
         
-        # 使用标准方法分析（自动机方法需要更复杂的实现）
-        return self.analyze(text)
+        if all(rule.min_dfa is not None for rule in self.rules):
+            char_sets = [chars for rule in self.rules for chars in rule.min_dfa.char_classes.members]
+            for keyword in self.keywords:
+                for char in keyword:
+                    char_sets.extend({case} for case in {char.lower(), char.upper()})
+            char_classes = CharClasses(char_sets)
+            
+            # self.rules 已按优先级降序稳定排序，下标即优先顺序
+            token_types = [rule.token_type for rule in self.rules]
+            keyword_rule = (token_types.index(TokenType.IDENTIFIER)
+                            if TokenType.IDENTIFIER in token_types else -1)
+            self._scanner = DFAScanner(
+                [rule.min_dfa for rule in self.rules],
+                token_types,
+                char_classes,
+                self.keywords,
+                keyword_rule
+            )
+        else:
+            self._scanner = None
+        self._scanner_key = key
+        
+        if self._scanner is not None and self.cache_file:
+            try:
+                save_scanner(self.cache_file, rules_digest(key[0], self.keywords), self._scanner)
+            except OSError:
+                # 缓存只用于加速启动，写入失败（如目录只读）不影响分析
+                pass
+        return self._scanner
+    
+    def build_byte_scanner(self) -> Optional[ByteScanner]:
+        """为当前规则集构建（或取出缓存的）在UTF-8字节上扫描的扫描器
+        
+        由 build_scanner 的转移表改写而来，见 ByteScanner。无法构建扫描器，
+        或规则、关键字中有非ASCII字符时返回None。
+        """
+        scanner = self.build_scanner()
+        if scanner is None:
+            return None
+        if scanner is not self._byte_scanner_source:
+            try:
+                self._byte_scanner = ByteScanner(scanner)
+            except ValueError:
+                self._byte_scanner = None
+            self._byte_scanner_source = scanner
+        return self._byte_scanner
+    
+    def build_lazy_scanner(self) -> Optional[LazyDFA]:
+        """为当前规则集构建（或取出缓存的）按需确定化扫描器
+        
+        只为各规则构造NFA，不做子集构造和最小化；DFA状态在扫描时按需生成，
+        最多缓存 lazy_cache_size 个转移，见 LazyDFA。任一规则无法转换为NFA时返回None。
+        """
+        key = (self._rule_set_key(), self.lazy_cache_size)
+        if key == self._lazy_key:
+            return self._lazy_scanner
+        
+        try:
+            nfas = [rule.nfa if rule.nfa is not None else rule._build_nfa() for rule in self.rules]
+            self._lazy_scanner = LazyDFA(nfas, self.lazy_cache_size)
+        except ValueError:
+            self._lazy_scanner = None
+        self._lazy_key = key
+        return self._lazy_scanner
+    
+    def _rule_set_key(self) -> tuple:
+        """当前规则集（按顺序的模式、类型、优先级）和关键字，作为扫描器的缓存键"""
+        return (tuple((rule.pattern, rule.token_type, rule.priority) for rule in self.rules),
+                tuple(self.keywords.items()))
+    
+    def _load_cached_scanner(self, key: tuple) -> bool:
+        """从缓存文件读入与 key 对应的扫描器，命中时返回True"""
+        if not self.cache_file:
+            return False
+        scanner = load_scanner(self.cache_file, rules_digest(key[0], self.keywords))
+        if scanner is None:
+            return False
+        self._scanner = scanner
+        self._scanner_key = key
+        return True
+    
+    def analyze_with_automata(self, text: str, compact: bool = False,
+                              lazy: bool = False) -> Union[List[Token], TokenBuffer]:
+        """使用自动机进行词法分析
+        
+        各规则的最小化DFA合并为一个表驱动扫描器，按最长匹配识别Token，
+        长度相同时取优先级高的规则（同优先级取先添加的）。扫描时间与输入长度成线性关系。
+        注意这与 analyze() 的“按优先级取第一个匹配的规则”略有不同。
+        有规则只能用位并行NFA模拟（见 LexicalRule.build_automata）时无法合并为扫描器，
+        改为在每个位置逐条规则用各自的自动机做最长匹配，结果相同。
+        若规则集中有自动机不支持的语法，则退回 analyze()。compact 的含义同 analyze()。
+        
+        lazy 为 True 时使用按需确定化的扫描器（见 build_lazy_scanner），结果相同，
+        但省去完整DFA的构造，适合规则很多而输入只用到其中一小部分状态的情形。
+        """
+        if lazy:
+            lazy_scanner = self.build_lazy_scanner()
+            if lazy_scanner is None:
+                return self.analyze(text, compact)
+            self._reset(text, compact)
+            for start, end, rule_index in lazy_scanner.scan(text):
+                self._emit(self.rules[rule_index].token_type if rule_index >= 0 else None,
+                           text, start, end)
+            self._emit_eof(text)
+            return self.tokens
+        
+        scanner = self.build_scanner()
+        if scanner is None:
+            if self.rules and all(rule.min_dfa is not None or rule.bit_nfa is not None
+                                  for rule in self.rules):
+                return self._analyze_with_rule_automata(text, compact)
+            return self.analyze(text, compact)
+        
+        self._reset(text, compact)
+        
+        token_types = scanner.token_types
+        for start, end, rule_index in scanner.scan(text):
+            self._emit(token_types[rule_index] if rule_index >= 0 else None, text, start, end, False)
+        
+        self._emit_eof(text)
+        return self.tokens
+    
+    def analyze_bytes(self, data, compact: bool = False) -> Union[List[SourceToken], TokenBuffer]:
+        """直接在UTF-8字节串（bytes、bytearray、memoryview 或 mmap）上进行词法分析
+        
+        用 build_byte_scanner 的扫描器逐字节查表，不先把整个输入解码为字符串：
+        Token只记录字节区间，结果为引用 data 的 SourceToken 列表（compact 为 True
+        时为以 data 为源文本的 TokenBuffer），值在访问时才解码，列号仍按字符计数。
+        结果与 analyze_with_automata(data 解码后的文本) 相同。
+        规则集无法在字节上扫描时先解码再调用 analyze_with_automata。
+        """
+        scanner = self.build_byte_scanner()
+        if scanner is None:
+            return self.analyze_with_automata(str(data, 'utf-8'), compact)
+        
+        self._reset(data, compact)
+        tokens = self.tokens
+        line_index = self._line_index
+        token_types = scanner.token_types
+        for start, end, rule_index in scanner.scan(data):
+            if rule_index < 0:
+                line, column = line_index.position(start)
+                self._report_error(source_slice(data, start, end), line, column)
+                token_type = TokenType.ERROR
+            else:
+                token_type = token_types[rule_index]
+                if token_type in (TokenType.WHITESPACE, TokenType.COMMENT):
+                    continue
+            if compact:
+                tokens.append(token_type, start, end - start)
+            else:
+                tokens.append(SourceToken(token_type, data, start, end, line_index))
+        
+        self._emit_eof(data)
+        return self.tokens
+    
+    def _analyze_with_rule_automata(self, text: str, compact: bool) -> Union[List[Token], TokenBuffer]:
+        """逐条规则用自动机做最长匹配（长度相同时取优先级高的规则）"""
+        self._reset(text, compact)
+        
+        rules = self.rules
+        position = 0
+        # 连续的错误字符合并为一段，遇到下一个匹配时产生
+        error_start = -1
+        while position < len(text):
+            best_end = position
+            best_rule = None
+            for rule in rules:
+                end = rule.match_automaton(text, position)
+                if end is not None and end > best_end:
+                    best_end = end
+                    best_rule = rule
+            
+            if best_rule is None:
+                if error_start < 0:
+                    error_start = position
+                position += 1
+            else:
+                if error_start >= 0:
+                    self._emit(None, text, error_start, position)
+                    error_start = -1
+                self._emit(best_rule.token_type, text, position, best_end)
+                position = best_end
+        
+        if error_start >= 0:
+            self._emit(None, text, error_start, position)
+        self._emit_eof(text)
+        return self.tokens
+    
+    def analyze_stream(self, fp: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Token]:
+        """流式词法分析：按块读取文件对象，边读边产生Token
+        
+        缓冲区只保留尚未消费的文本，内存占用约为 chunk_size 加上最长Token的长度，
+        与文件大小无关。错误信息记录在 self.errors 中，self.tokens 不会被填充。
+        
+        规则集可以构建为自动机时使用表驱动扫描器（与 analyze_with_automata() 结果一致）：
+        扫描器能判断某个Token是否走到了缓冲区末尾，此时补读后再继续，
+        因此任意长度的跨块Token、注释、字符串都能正确识别。
+        否则退回正则匹配（与 analyze() 结果一致），依靠至少 chunk_size 个字符的
+        前瞻窗口，保证长度不超过 chunk_size 的Token正确。
+        """
+        self.errors = []
+        self._suppressed_errors = 0
+        self.current_line = 1
+        self.current_column = 1
+        self._build_keyword_table()
+        
+        scanner = self.build_scanner()
+        if scanner is None:
+            yield from self._stream_with_regex(fp, chunk_size)
+        else:
+            token_types = scanner.token_types
+            buffer = ''
+            eof = False
+            # 错误字符段可能跨越缓冲区边界：先收集，遇到下一个Token或输入结束时才产生
+            error_parts: List[str] = []
+            while not eof:
+                # 待定Token很长时按缓冲区大小成倍读入，避免反复重扫
+                data = fp.read(max(chunk_size, len(buffer)))
+                if data:
+                    buffer += data
+                else:
+                    eof = True
+                
+                consumed = 0
+                for start, end, rule_index in scanner.scan(buffer, final=eof):
+                    consumed = end
+                    if rule_index < 0:
+                        error_parts.append(buffer[start:end])
+                        continue
+                    if error_parts:
+                        yield self._make_error(''.join(error_parts))
+                        error_parts = []
+                    token = self._make_token(token_types[rule_index], buffer[start:end], False)
+                    if token:
+                        yield token
+                buffer = buffer[consumed:]
+            if error_parts:
+                yield self._make_error(''.join(error_parts))
+        
+        # 产生EOF Token
+        self._finish_errors()
+        yield Token(TokenType.EOF, '', self.current_line, self.current_column)
+    
+    def _stream_with_regex(self, fp: TextIO, chunk_size: int) -> Iterator[Token]:
+        """使用正则逐条匹配的流式分析（前瞻窗口方式）"""
+        buffer = ''
+        position = 0
+        eof = False
+        need_more = False
+        error_parts: List[str] = []
+        
+        while True:
+            if not eof and (need_more or len(buffer) - position < chunk_size):
+                buffer = buffer[position:]
+                position = 0
+                data = fp.read(max(chunk_size, len(buffer)))
+                if data:
+                    buffer += data
+                else:
+                    eof = True
+                need_more = False
+                continue
+            
+            if position >= len(buffer):
+                if error_parts:
+                    yield self._make_error(''.join(error_parts))
+                break
+            
+            for rule in self.rules:
+                match = rule.match(buffer, position)
+                if match:
+                    break
+            else:
+                match = None
+            
+            if match and match.end() == len(buffer) and not eof:
+                # 匹配到达缓冲区末尾，后续输入可能使其更长
+                need_more = True
+                continue
+            
+            if match:
+                if error_parts:
+                    yield self._make_error(''.join(error_parts))
+                    error_parts = []
+                token = self._make_token(rule.token_type, match.group(0))
+                if token:
+                    yield token
+                position = match.end()
+            else:
+                # 跳到下一个能匹配规则的位置，与后续缓冲区中的错误字符合并
+                end = self._error_run_end(buffer, position)
+                error_parts.append(buffer[position:end])
+                position = end
+    
+    def analyze_parallel(self, text: str, workers: Optional[int] = None,
+                         chunk_size: Optional[int] = None) -> List[Token]:
+        """多进程并行词法分析，结果与 analyze() 相同（见 parallel.analyze_parallel）"""
+        from .parallel import analyze_parallel
+        return analyze_parallel(self, text, workers, chunk_size)
+    
+    def analyze_mmap(self, filename: str) -> Iterator[Token]:
+        r"""内存映射方式分析UTF-8文件，逐个产生Token
+        
+        文件以只读方式映射到内存，规则按字节直接在映射区上匹配，
+        不会把整个文件读成Python字符串，操作系统页缓存是唯一的一份数据，
+        打开大文件几乎没有启动延迟。只有产生的Token值会被解码为字符串，
+        列号仍按字符计数，与 analyze() 的输出格式相同。
+        
+        与 analyze() 的差别：不做换行符转换（\r\n 中的 \r 需要规则自行处理），
+        \d、\w、\s 等只匹配ASCII字符。
+        """
+        self.errors = []
+        self._suppressed_errors = 0
+        self.current_line = 1
+        self.current_column = 1
+        self._build_keyword_table()
+        
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # 空文件无法映射
+                yield Token(TokenType.EOF, '', self.current_line, self.current_column)
+                return
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                size = len(data)
+                position = 0
+                # 连续错误字符段的起始字节位置
+                error_start = -1
+                while position < size:
+                    for rule in self.rules:
+                        match = rule.match_bytes(data, position)
+                        if match:
+                            break
+                    else:
+                        match = None
+                    
+                    if match and error_start >= 0:
+                        yield self._make_error(data[error_start:position].decode('utf-8', errors='replace'))
+                        error_start = -1
+                    
+                    if match:
+                        value = match.group(0).decode('utf-8', errors='replace')
+                        token = self._make_token(rule.token_type, value)
+                        if token:
+                            yield token
+                        position = match.end()
+                    else:
+                        # 错误字符按完整的UTF-8编码序列跳过，连续的错误字符合并为一段
+                        if error_start < 0:
+                            error_start = position
+                        position = min(position + _utf8_char_length(data[position]), size)
+                
+                if error_start >= 0:
+                    yield self._make_error(data[error_start:size].decode('utf-8', errors='replace'))
+        
+        self._finish_errors()
+        yield Token(TokenType.EOF, '', self.current_line, self.current_column)
     
     def get_tokens_table(self) -> List[List[str]]:
         """获取Token表格"""
         table = []
         table.append(["序号", "Token类型", "值", "行号", "列号"])
         
+        if isinstance(self.tokens, TokenBuffer):
+            # 直接读取各列，不生成 Token 对象
+            buffer = self.tokens
+            types = TokenBuffer.TYPES
+            position = buffer.line_index.position
+            for i, (type_id, start, length) in enumerate(zip(
+                    buffer.types, buffer.starts, buffer.lengths), 1):
+                line, column = position(start)
+                table.append([
+                    str(i),
+                    types[type_id].value,
+                    source_slice(buffer.source, start, start + length),
+                    str(line),
+                    str(column)
+                ])
+            return table
+        
         for i, token in enumerate(self.tokens, 1):
             table.append([
                 str(i),
@@ -393,6 +1089,9 @@ class LexicalAnalyzer:
     
     def get_token_statistics(self) -> Dict[str, int]:
         """获取Token统计信息"""
+        if isinstance(self.tokens, TokenBuffer):
+            return {token_type.value: count for token_type, count in self.tokens.type_counts().items()}
+        
         stats = {}
         for token in self.tokens:
             token_name = token.type.value
@@ -405,12 +1104,15 @@ class LexicalAnalyzer:
     
     def has_errors(self) -> bool:
         """检查是否有错误"""
+        if isinstance(self.tokens, TokenBuffer):
+            return len(self.errors) > 0 or self.tokens.count(TokenType.ERROR) > 0
         return len(self.errors) > 0 or any(token.type == TokenType.ERROR for token in self.tokens)
     
     def clear(self):
         """清空分析结果"""
         self.tokens = []
         self.errors = []
+        self._suppressed_errors = 0
         self.current_line = 1
         self.current_column = 1
     
@@ -430,6 +1132,63 @@ class LexicalAnalyzer:
         return info
 
 
+def _utf8_char_length(lead_byte: int) -> int:
+    """根据UTF-8首字节得到该字符的编码长度（非法首字节按1处理）"""
+    if lead_byte >= 0xF0:
+        return 4
+    if lead_byte >= 0xE0:
+        return 3
+    if lead_byte >= 0xC0:
+        return 2
+    return 1
+
+
+# 字节模式中的一个完整多字节UTF-8字符：首字节及其后的全部续字节
+_UTF8_SEQUENCE = r'[\xc0-\xff][\x80-\xbf]*'
+
+
+def _utf8_bytes_pattern(pattern: str) -> bytes:
+    r"""把ASCII正则改写为在UTF-8字节上匹配的字节模式
+    
+    直接按字节编译时，. 、[^...]、\S 等每次只匹配一个字节，可能停在多字节字符中间。
+    能匹配非ASCII字节的原子（. 、转义、字符类）改写为
+    “该原子限于ASCII字节 或 一个完整的多字节字符”，其余部分原样保留。
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            end = i + 2
+        elif char == '[':
+            # 找到字符类的结束 ']'（紧跟在 [ 或 [^ 之后的 ']' 是普通字符）
+            end = i + 1
+            if pattern.startswith('^', end):
+                end += 1
+            if pattern.startswith(']', end):
+                end += 1
+            while end < len(pattern) and pattern[end] != ']':
+                end += 2 if pattern[end] == '\\' else 1
+            end += 1
+        elif char == '.':
+            end = i + 1
+        else:
+            parts.append(char)
+            i += 1
+            continue
+        atom = pattern[i:end]
+        try:
+            matches_high_byte = re.fullmatch(atom.encode('ascii'), b'\xc3') is not None
+        except re.error:
+            # 反向引用等不能单独编译的转义，原样保留
+            matches_high_byte = False
+        if matches_high_byte:
+            atom = f"(?:(?![\\x80-\\xff]){atom}|{_UTF8_SEQUENCE})"
+        parts.append(atom)
+        i = end
+    return ''.join(parts).encode('ascii')
+
+
 def create_pascal_analyzer() -> LexicalAnalyzer:
     """创建Pascal语言词法分析器"""
     analyzer = LexicalAnalyzer()
@@ -444,18 +1203,37 @@ def create_c_analyzer() -> LexicalAnalyzer:
     return analyzer
 
 
-def analyze_file(filename: str, language: str = 'pascal') -> Tuple[List[Token], List[str]]:
-    """分析文件"""
+def analyze_file_stream(filename: str, language: str = 'pascal',
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Token]:
+    """流式分析文件，逐个产生Token（不一次性读入整个文件）"""
+    if language.lower() == 'c':
+        analyzer = create_c_analyzer()
+    else:
+        analyzer = create_pascal_analyzer()
+    
+    with open(filename, 'r', encoding='utf-8') as f:
+        yield from analyzer.analyze_stream(f, chunk_size)
+
+
+def analyze_file(filename: str, language: str = 'pascal',
+                 use_mmap: bool = False) -> Tuple[List[Token], List[str]]:
+    """分析文件
+    
+    use_mmap 为 True 时以内存映射方式扫描文件（见 LexicalAnalyzer.analyze_mmap），
+    不把整个文件读入内存。
+    """
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
         if language.lower() == 'c':
             analyzer = create_c_analyzer()
         else:
             analyzer = create_pascal_analyzer()
         
-        tokens = analyzer.analyze(content)
+        if use_mmap:
+            tokens = list(analyzer.analyze_mmap(filename))
+        else:
+            with open(filename, 'r', encoding='utf-8') as f:
+                content = f.read()
+            tokens = analyzer.analyze(content)
         errors = analyzer.get_errors()
         
         return tokens, errors
@@ -6,16 +6,29 @@
 实现有限自动机相关的数据结构和算法：
 - NFA (非确定性有限自动机)
 - DFA (确定性有限自动机)
-- 正则表达式到NFA转换 (Thompson构造法)
+- 正则表达式到NFA转换 (Thompson构造法，或无ε转移的Glushkov构造法)
 - NFA到DFA转换 (子集构造法)
+- 正则表达式直接构造DFA (followpos方法，不经过NFA)
 - DFA最小化
 """
 
-import graphviz
 import io
-from PIL import Image
-from typing import List, Dict, Set, Tuple, Optional, Union
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, List, Dict, Set, Tuple, Optional, Union, FrozenSet, Iterator
 from .token import TokenType
+from .charset import CharClasses
+from .regex_ast import (RegexNode, CharClass, CharSet, Concat, Epsilon, Alternation, Repeat, Positions,
+                        parse, postorder, leaves, map_leaves)
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# 代表“本规则中未显式出现的其他所有字符”的符号。
+# 取否定字符类（如 [^}]、\S、.）的补集时，无法枚举全部Unicode字符，
+# 因此把未出现在正则中的字符统一归入该符号。它不是单个字符，不会与真实输入冲突。
+OTHER = 'OTHER'
 
 
 class State:
@@ -59,12 +72,17 @@ class NFA:
         self.accept_states: Set[State] = set()
         self.alphabet: Set[str] = set()
         self.state_counter = 0
+        self.shortest_match = False  # 含非贪婪量词时按最短匹配接受
+        self.char_classes: Optional[CharClasses] = None  # 非None时转移符号为等价类编号
+        # ε闭包表（见 closure_table），增加状态或ε转移时作废
+        self._closures: Optional[Tuple[List[State], Dict[State, int], List[int]]] = None
     
     def create_state(self) -> State:
         """创建新状态"""
         state = State(self.state_counter)
         self.state_counter += 1
         self.states.add(state)
+        self._closures = None
         return state
     
     def set_start(self, state: State):
@@ -83,20 +101,56 @@ class NFA:
         from_state.add_transition(symbol, to_state)
         if symbol != 'ε':  # ε不加入字母表
             self.alphabet.add(symbol)
+        else:
+            self._closures = None
+    
+    def closure_table(self) -> Tuple[List[State], Dict[State, int], List[int]]:
+        """预先算好的各状态ε闭包（位集），NFA不变时只计算一次
+        
+        状态按编号稠密排列，第 i 个状态对应第 i 位。
+        
+        Returns:
+            (按编号排列的状态, 状态 -> 位下标, 各状态ε闭包的位集)
+        """
+        if self._closures is None:
+            order = sorted(self.states, key=lambda state: state.id)
+            bit_of = {state: index for index, state in enumerate(order)}
+            masks = [0] * len(order)
+            for index, state in enumerate(order):
+                mask = 1 << index
+                stack = [state]
+                while stack:
+                    for target in stack.pop().transitions.get('ε', ()):
+                        target_index = bit_of[target]
+                        if mask >> target_index & 1:
+                            continue
+                        if masks[target_index]:
+                            # 已算好的闭包直接并入，不再沿它的ε转移搜索
+                            mask |= masks[target_index]
+                        else:
+                            mask |= 1 << target_index
+                            stack.append(target)
+                masks[index] = mask
+            self._closures = (order, bit_of, masks)
+        return self._closures
+    
+    def states_of(self, mask: int) -> FrozenSet[State]:
+        """位集 mask（见 closure_table）对应的状态集合"""
+        order = self.closure_table()[0]
+        states = []
+        while mask:
+            low = mask & -mask
+            states.append(order[low.bit_length() - 1])
+            mask ^= low
+        return frozenset(states)
     
     def epsilon_closure(self, states: Set[State]) -> Set[State]:
-        """计算状态集合的ε闭包"""
-        closure = set(states)
-        stack = list(states)
-        
-        while stack:
-            current = stack.pop()
-            for next_state in current.get_transitions('ε'):
-                if next_state not in closure:
-                    closure.add(next_state)
-                    stack.append(next_state)
-        
-        return closure
+        """计算状态集合的ε闭包（由预先算好的各状态闭包位集合并）"""
+        _, bit_of, masks = self.closure_table()
+        mask = 0
+        for state in states:
+            mask |= masks[bit_of[state]]
+        return set(self.states_of(mask))
     
     def move(self, states: Set[State], symbol: str) -> Set[State]:
         """计算状态集合在输入符号下的转移"""
@@ -116,6 +170,7 @@ class DFA:
         self.transitions: Dict[Tuple[str, str], str] = {}  # (状态, 符号) -> 目标状态
         self.alphabet: Set[str] = set()
         self.token_types: Dict[str, TokenType] = {}  # 状态 -> Token类型
+        self.char_classes: Optional[CharClasses] = None  # 非None时转移符号为等价类编号
     
     def add_state(self, state_id: str, nfa_states: Set[State]):
         """添加DFA状态"""
@@ -145,7 +200,11 @@ class DFA:
         
         current_state = self.start_state
         
-        for symbol in input_string:
+        for char in input_string:
+            if self.char_classes is not None:
+                symbol = self.char_classes.classify(char)
+            else:
+                symbol = char if char in self.alphabet else OTHER
             next_state = self.get_transition(current_state, symbol)
             if next_state is None:
                 return False, None
@@ -155,155 +214,224 @@ class DFA:
         token_type = self.token_types.get(current_state) if is_accept else None
         
         return is_accept, token_type
+    
+    def match(self, text: str, position: int) -> Optional[int]:
+        """从 position 开始做最长匹配，返回匹配的结束位置，不匹配时返回None"""
+        state = self.start_state
+        if state is None:
+            return None
+        end = position if state in self.accept_states else None
+        for index in range(position, len(text)):
+            char = text[index]
+            if self.char_classes is not None:
+                symbol = self.char_classes.classify(char)
+            else:
+                symbol = char if char in self.alphabet else OTHER
+            state = self.transitions.get((state, symbol))
+            if state is None:
+                break
+            if state in self.accept_states:
+                end = index + 1
+        return end
+    
+    def remove_accept_transitions(self):
+        """删除从接受状态出发的转移，使DFA首次到达接受状态即停止（最短匹配）"""
+        self.transitions = {
+            key: target for key, target in self.transitions.items()
+            if key[0] not in self.accept_states
+        }
+
+
+class BitNFA:
+    """位并行的NFA模拟器
+    
+    直接模拟Thompson NFA，不做子集构造，适合确定化后状态数指数膨胀的规则
+    （如 (a|b)*a(a|b)(a|b)...）。活动状态集合是一个Python整数位集：
+    - 只为“重要”状态（有非ε出边的状态和接受状态）分配位，ε闭包在构造时预先算好
+    - 每个符号预先算出 (源状态掩码, 目标ε闭包掩码) 列表，目标相同的源状态合并为一项，
+      每读入一个字符只需对列表做若干次按位与/或
+    每个字符的代价与NFA规模成线性关系，与活动状态组合的数目无关。
+    """
+    
+    def __init__(self, nfa: NFA):
+        self.shortest_match = nfa.shortest_match
+        
+        # 符号 -> 列：按等价类构建的NFA直接用等价类编号，否则逐字符编号，未出现的字符为 OTHER 列
+        if nfa.char_classes is not None:
+            self.columns: Dict[str, int] = dict(nfa.char_classes.class_of)
+            self.other_column = nfa.char_classes.other_class
+            column_of = {class_id: class_id for class_id in range(nfa.char_classes.count)}
+        else:
+            symbols = sorted(symbol for symbol in nfa.alphabet if symbol != OTHER)
+            self.columns = {symbol: column for column, symbol in enumerate(symbols)}
+            self.other_column = len(symbols)
+            column_of = dict(self.columns)
+            column_of[OTHER] = self.other_column
+        
+        ordered = sorted(nfa.states, key=lambda state: state.id)
+        important = [state for state in ordered
+                     if state.is_accept or any(symbol != 'ε' for symbol in state.transitions)]
+        bits = {state: 1 << index for index, state in enumerate(important)}
+        self.state_count = len(important)
+        
+        def closure_mask(states: Set[State]) -> int:
+            mask = 0
+            for state in nfa.epsilon_closure(states):
+                mask |= bits.get(state, 0)
+            return mask
+        
+        self.start_mask = closure_mask({nfa.start_state}) if nfa.start_state else 0
+        self.accept_mask = 0
+        for state in nfa.accept_states:
+            self.accept_mask |= bits.get(state, 0)
+        
+        # 列 -> {目标掩码: 源状态掩码}
+        groups: List[Dict[int, int]] = [{} for _ in range(self.other_column + 1)]
+        for state in important:
+            for symbol, targets in state.transitions.items():
+                if symbol == 'ε' or symbol not in column_of:
+                    continue
+                target = closure_mask(targets)
+                group = groups[column_of[symbol]]
+                group[target] = group.get(target, 0) | bits[state]
+        self.steps: List[Tuple[Tuple[int, int], ...]] = [
+            tuple((sources, target) for target, sources in group.items()) for group in groups
+        ]
+    
+    def match(self, text: str, position: int) -> Optional[int]:
+        """从 position 开始匹配，返回匹配的结束位置，不匹配时返回None
+        
+        与DFA相同按最长匹配接受；含非贪婪量词的规则在首次到达接受状态时停止。
+        """
+        columns = self.columns
+        other = self.other_column
+        steps = self.steps
+        accept = self.accept_mask
+        active = self.start_mask
+        end = position if active & accept else None
+        if end is not None and self.shortest_match:
+            return end
+        
+        index = position
+        length = len(text)
+        while active and index < length:
+            next_active = 0
+            for sources, target in steps[columns.get(text[index], other)]:
+                if active & sources:
+                    next_active |= target
+            active = next_active
+            index += 1
+            if active & accept:
+                end = index
+                if self.shortest_match:
+                    break
+        return end
+
+
+class StateLimitExceeded(ValueError):
+    """子集构造产生的DFA状态数超过上限"""
 
 
 class RegexToNFA:
-    """正则表达式到NFA转换器 (Thompson构造法)"""
+    """正则表达式到NFA转换器 (Thompson构造法 / Glushkov构造法)
     
-    def __init__(self):
+    正则由 regex_ast.parse 解析（按模式缓存），支持的语法见该函数；
+    不支持的语法抛出 ValueError。
+    
+    给出 char_classes 时，转移符号为字符等价类编号而不是单个字符，
+    一个字符类只对应它覆盖的几个等价类；char_classes 必须由包含本正则的
+    字符集合（见 char_sets()）划分得到。
+    
+    method 为 GLUSHKOV 时由语法树构造位置自动机：没有ε转移，状态数为
+    正则中字符集合的出现次数加一，子集构造时不需要计算ε闭包。
+    """
+    
+    THOMPSON = 'thompson'
+    GLUSHKOV = 'glushkov'
+    
+    def __init__(self, char_classes: Optional[CharClasses] = None, method: str = THOMPSON):
+        if method not in (self.THOMPSON, self.GLUSHKOV):
+            raise ValueError(f"未知的NFA构造方法: {method}")
         self.state_counter = 0
+        self.shortest_match = False
+        self.char_classes = char_classes
+        self.method = method
+    
+    def char_sets(self, regex: str) -> List[Tuple[FrozenSet[str], bool]]:
+        """返回正则中出现的全部字符集合 (字符集合, 是否取补集)，用于划分字符等价类"""
+        return [(leaf.chars, leaf.negated) for leaf in leaves(parse(regex).tree)]
+    
+    def syntax_tree(self, regex: str) -> Tuple[RegexNode, Set[str]]:
+        """把正则解析为语法树，字符类换算为转移符号的集合
+        
+        字符类先保存为区间，这里才换算为符号：按等价类构建时为它覆盖的等价类编号；
+        否则为字符本身，取补集的字符类展开为“本正则中显式出现的其他字符 + OTHER”。
+        
+        Returns:
+            (叶结点为 CharSet 的语法树, 显式出现的字符集合)
+        """
+        parsed = parse(regex)
+        self.shortest_match = parsed.shortest_match
+        
+        if self.char_classes is not None:
+            char_classes = self.char_classes
+            tree = map_leaves(parsed.tree,
+                              lambda leaf: CharSet(char_classes.symbols(leaf.chars, leaf.negated)))
+            return tree, set()
+        
+        mentioned: Set[str] = set()
+        for leaf in leaves(parsed.tree):
+            mentioned |= leaf.chars
+        
+        def symbols(leaf: CharClass) -> CharSet:
+            if leaf.negated:
+                return CharSet(frozenset((mentioned - leaf.chars) | {OTHER}))
+            return CharSet(leaf.chars)
+        return map_leaves(parsed.tree, symbols), mentioned
     
     def convert(self, regex: str, token_type: Optional[TokenType] = None) -> NFA:
         """将正则表达式转换为NFA"""
-        # 预处理：展开字符类和转义字符
-        processed_regex = self._preprocess_regex(regex)
-        
-        # 添加连接操作符
-        concat_regex = self._add_concat_operator(processed_regex)
-        
-        # 转换为后缀表达式
-        postfix = self._to_postfix(concat_regex)
+        tree, mentioned = self.syntax_tree(regex)
         
         # 构建NFA
-        return self._build_nfa(postfix, token_type)
-    
-    def _preprocess_regex(self, regex: str) -> str:
-        """预处理正则表达式"""
-        result = []
-        i = 0
-        while i < len(regex):
-            if regex[i] == '\\':
-                # 处理转义字符
-                if i + 1 < len(regex):
-                    next_char = regex[i + 1]
-                    if next_char == 'd':
-                        result.append('[0-9]')
-                    elif next_char == 'w':
-                        result.append('[a-zA-Z0-9_]')
-                    elif next_char == 's':
-                        result.append('[ \t\n\r]')
-                    elif next_char in '+*?()[]{}|.^$\\':
-                        result.append(next_char)
-                    else:
-                        result.append(next_char)
-                    i += 2
-                else:
-                    result.append(regex[i])
-                    i += 1
-            elif regex[i] == '[' and i + 1 < len(regex):
-                # 处理字符类
-                j = i + 1
-                while j < len(regex) and regex[j] != ']':
-                    j += 1
-                if j < len(regex):
-                    char_class = regex[i:j+1]
-                    expanded = self._expand_char_class(char_class)
-                    result.append(f'({expanded})')
-                    i = j + 1
-                else:
-                    result.append(regex[i])
-                    i += 1
-            else:
-                result.append(regex[i])
-                i += 1
-        
-        return ''.join(result)
-    
-    def _expand_char_class(self, char_class: str) -> str:
-        """展开字符类为选择表达式"""
-        content = char_class[1:-1]  # 去掉方括号
-        chars = []
-        i = 0
-        
-        while i < len(content):
-            if i + 2 < len(content) and content[i + 1] == '-':
-                # 处理范围 a-z
-                start = ord(content[i])
-                end = ord(content[i + 2])
-                for code in range(start, end + 1):
-                    chars.append(chr(code))
-                i += 3
-            else:
-                chars.append(content[i])
-                i += 1
-        
-        return '|'.join(chars) if chars else ''
-    
-    def _add_concat_operator(self, regex: str) -> str:
-        """添加连接操作符"""
-        output = []
-        for i in range(len(regex)):
-            output.append(regex[i])
-            if (i + 1 < len(regex) and 
-                regex[i] not in '(|' and 
-                regex[i + 1] not in ')|*+?'):
-                output.append('.')
-        return ''.join(output)
-    
-    def _to_postfix(self, regex: str) -> List[str]:
-        """转换为后缀表达式"""
-        precedence = {'|': 1, '.': 2, '*': 3, '+': 3, '?': 3}
-        operators = {'|', '.', '*', '+', '?', '(', ')'}
-        
-        output = []
-        operator_stack = []
-        
-        for token in regex:
-            if token not in operators:
-                output.append(token)
-            elif token == '(':
-                operator_stack.append(token)
-            elif token == ')':
-                while operator_stack and operator_stack[-1] != '(':
-                    output.append(operator_stack.pop())
-                operator_stack.pop()  # 弹出左括号
-            else:
-                while (operator_stack and operator_stack[-1] != '(' and 
-                       precedence.get(operator_stack[-1], 0) >= precedence.get(token, 0)):
-                    output.append(operator_stack.pop())
-                operator_stack.append(token)
-        
-        while operator_stack:
-            output.append(operator_stack.pop())
-        
-        return output
+        if self.method == self.GLUSHKOV:
+            nfa = self._glushkov_nfa(tree, token_type)
+        else:
+            nfa = self._build_nfa(tree, token_type)
+        # 字母表包含正则中显式出现的全部字符（即使没有对应转移），
+        # 未出现的字符在匹配时按 OTHER 处理
+        nfa.alphabet |= mentioned
+        nfa.shortest_match = self.shortest_match
+        nfa.char_classes = self.char_classes
+        return nfa
     
-    def _build_nfa(self, postfix: List[str], token_type: Optional[TokenType]) -> NFA:
-        """根据后缀表达式构建NFA"""
+    def _build_nfa(self, tree: RegexNode, token_type: Optional[TokenType]) -> NFA:
+        """后序遍历语法树构建Thompson NFA"""
         stack = []
         
-        for token in postfix:
-            if token == '|':
+        for node in postorder(tree):
+            if isinstance(node, Alternation):
                 nfa2 = stack.pop()
                 nfa1 = stack.pop()
                 stack.append(self._union_nfa(nfa1, nfa2))
-            elif token == '.':
+            elif isinstance(node, Concat):
                 nfa2 = stack.pop()
                 nfa1 = stack.pop()
                 stack.append(self._concat_nfa(nfa1, nfa2))
-            elif token == '*':
-                nfa = stack.pop()
-                stack.append(self._kleene_star_nfa(nfa))
-            elif token == '+':
+            elif isinstance(node, Repeat):
                 nfa = stack.pop()
-                stack.append(self._plus_nfa(nfa))
-            elif token == '?':
-                nfa = stack.pop()
-                stack.append(self._question_nfa(nfa))
+                if node.operator == '*':
+                    stack.append(self._kleene_star_nfa(nfa))
+                elif node.operator == '+':
+                    stack.append(self._plus_nfa(nfa))
+                else:
+                    stack.append(self._question_nfa(nfa))
+            elif isinstance(node, Epsilon):
+                stack.append(self._epsilon_nfa())
             else:
-                stack.append(self._basic_nfa(token))
+                stack.append(self._basic_nfa(node.symbols))
         
-        result = stack[0] if stack else NFA()
+        result = stack.pop()
         
         # 设置接受状态的Token类型
         if token_type:
@@ -312,56 +440,94 @@ class RegexToNFA:
         
         return result
     
-    def _basic_nfa(self, symbol: str) -> NFA:
-        """创建基本NFA"""
+    def _glushkov_nfa(self, tree: RegexNode, token_type: Optional[TokenType]) -> NFA:
+        """Glushkov构造：由语法树的位置集合直接构建无ε转移的NFA
+        
+        状态 0 为开始状态，位置 p 对应状态 p+1，表示“刚读入位置 p 的字符”，
+        因此进入它的转移都以位置 p 的字符集合为符号：开始状态到 firstpos 中的位置，
+        位置 q 到 followpos(q) 中的位置。lastpos 中的位置为接受状态，
+        正则能匹配空串时开始状态也是接受状态。
+        """
+        positions = Positions(tree)
+        nfa = NFA()
+        start = nfa.create_state()
+        nfa.set_start(start)
+        states = [nfa.create_state() for _ in range(len(positions))]
+        
+        sources = [(start, positions.first)] + list(zip(states, positions.follow))
+        for source, targets in sources:
+            for position in sorted(targets):
+                for symbol in sorted(positions.symbols[position]):
+                    nfa.add_transition(source, symbol, states[position])
+        
+        if positions.nullable:
+            nfa.add_accept(start, token_type)
+        for position in positions.last:
+            nfa.add_accept(states[position], token_type)
+        return nfa
+    
+    def _basic_nfa(self, symbols: FrozenSet[Union[str, int]]) -> NFA:
+        """创建基本NFA（接受字符集合中的任一字符）"""
+        nfa = NFA()
+        start = nfa.create_state()
+        end = nfa.create_state()
+        
+        nfa.set_start(start)
+        nfa.add_accept(end)
+        for symbol in sorted(symbols):
+            nfa.add_transition(start, symbol, end)
+        
+        return nfa
+    
+    def _epsilon_nfa(self) -> NFA:
+        """创建只接受空串的NFA"""
         nfa = NFA()
         start = nfa.create_state()
         end = nfa.create_state()
         
         nfa.set_start(start)
         nfa.add_accept(end)
-        nfa.add_transition(start, symbol, end)
+        nfa.add_transition(start, 'ε', end)
         
         return nfa
     
+    def _copy_states(self, result: NFA, nfa: NFA) -> Dict[State, State]:
+        """把nfa的状态和转移复制到result中，状态重新编号以免与已有状态冲突"""
+        state_map = {}
+        for state in nfa.states:
+            state_map[state] = result.create_state()
+        
+        for state in nfa.states:
+            for symbol, targets in state.transitions.items():
+                for target in targets:
+                    result.add_transition(state_map[state], symbol, state_map[target])
+        
+        return state_map
+    
     def _concat_nfa(self, nfa1: NFA, nfa2: NFA) -> NFA:
         """连接两个NFA"""
         result = NFA()
-        result.state_counter = max(nfa1.state_counter, nfa2.state_counter)
         
-        # 复制所有状态
-        state_map = {}
-        for nfa in [nfa1, nfa2]:
-            for state in nfa.states:
-                new_state = State(state.id)
-                new_state.is_accept = False  # 重置接受状态
-                state_map[state] = new_state
-                result.states.add(new_state)
-        
-        # 复制转移
-        for nfa in [nfa1, nfa2]:
-            for state in nfa.states:
-                for symbol, targets in state.transitions.items():
-                    for target in targets:
-                        result.add_transition(state_map[state], symbol, state_map[target])
+        # 复制所有状态（两个NFA各自编号，需分别映射）
+        map1 = self._copy_states(result, nfa1)
+        map2 = self._copy_states(result, nfa2)
         
         # 设置开始状态
-        result.set_start(state_map[nfa1.start_state])
+        result.set_start(map1[nfa1.start_state])
         
         # 连接nfa1的接受状态到nfa2的开始状态
         for accept_state in nfa1.accept_states:
-            result.add_transition(state_map[accept_state], 'ε', state_map[nfa2.start_state])
+            result.add_transition(map1[accept_state], 'ε', map2[nfa2.start_state])
         
         # 设置nfa2的接受状态为结果的接受状态
         for accept_state in nfa2.accept_states:
-            result.add_accept(state_map[accept_state], accept_state.token_type)
+            result.add_accept(map2[accept_state], accept_state.token_type)
         
         return result
     
     def _union_nfa(self, nfa1: NFA, nfa2: NFA) -> NFA:
         """联合两个NFA"""
         result = NFA()
-        result.state_counter = max(nfa1.state_counter, nfa2.state_counter)
         
         # 创建新的开始和结束状态
         new_start = result.create_state()
@@ -371,38 +537,24 @@ class RegexToNFA:
         result.add_accept(new_end)
         
         # 复制所有状态
-        state_map = {}
-        for nfa in [nfa1, nfa2]:
-            for state in nfa.states:
-                new_state = State(result.state_counter)
-                result.state_counter += 1
-                new_state.is_accept = False
-                state_map[state] = new_state
-                result.states.add(new_state)
-        
-        # 复制转移
-        for nfa in [nfa1, nfa2]:
-            for state in nfa.states:
-                for symbol, targets in state.transitions.items():
-                    for target in targets:
-                        result.add_transition(state_map[state], symbol, state_map[target])
+        map1 = self._copy_states(result, nfa1)
+        map2 = self._copy_states(result, nfa2)
         
         # 连接新开始状态到两个NFA的开始状态
-        result.add_transition(new_start, 'ε', state_map[nfa1.start_state])
-        result.add_transition(new_start, 'ε', state_map[nfa2.start_state])
+        result.add_transition(new_start, 'ε', map1[nfa1.start_state])
+        result.add_transition(new_start, 'ε', map2[nfa2.start_state])
         
         # 连接两个NFA的接受状态到新结束状态
         for accept_state in nfa1.accept_states:
-            result.add_transition(state_map[accept_state], 'ε', new_end)
+            result.add_transition(map1[accept_state], 'ε', new_end)
         for accept_state in nfa2.accept_states:
-            result.add_transition(state_map[accept_state], 'ε', new_end)
+            result.add_transition(map2[accept_state], 'ε', new_end)
         
         return result
     
     def _kleene_star_nfa(self, nfa: NFA) -> NFA:
         """克莱尼星操作"""
         result = NFA()
-        result.state_counter = nfa.state_counter
         
         # 创建新的开始和结束状态
         new_start = result.create_state()
@@ -412,19 +564,7 @@ class RegexToNFA:
         result.add_accept(new_end)
         
         # 复制所有状态
-        state_map = {}
-        for state in nfa.states:
-            new_state = State(result.state_counter)
-            result.state_counter += 1
-            new_state.is_accept = False
-            state_map[state] = new_state
-            result.states.add(new_state)
-        
-        # 复制转移
-        for state in nfa.states:
-            for symbol, targets in state.transitions.items():
-                for target in targets:
-                    result.add_transition(state_map[state], symbol, state_map[target])
+        state_map = self._copy_states(result, nfa)
         
         # 添加ε转移
         result.add_transition(new_start, 'ε', state_map[nfa.start_state])  # 进入
@@ -445,7 +585,6 @@ class RegexToNFA:
     def _question_nfa(self, nfa: NFA) -> NFA:
         """问号操作 (零次或一次)"""
         result = NFA()
-        result.state_counter = nfa.state_counter
         
         # 创建新的开始和结束状态
         new_start = result.create_state()
@@ -455,19 +594,7 @@ class RegexToNFA:
         result.add_accept(new_end)
         
         # 复制所有状态
-        state_map = {}
-        for state in nfa.states:
-            new_state = State(result.state_counter)
-            result.state_counter += 1
-            new_state.is_accept = False
-            state_map[state] = new_state
-            result.states.add(new_state)
-        
-        # 复制转移
-        for state in nfa.states:
-            for symbol, targets in state.transitions.items():
-                for target in targets:
-                    result.add_transition(state_map[state], symbol, state_map[target])
+        state_map = self._copy_states(result, nfa)
         
         # 添加ε转移
         result.add_transition(new_start, 'ε', state_map[nfa.start_state])  # 进入
@@ -480,44 +607,92 @@ class RegexToNFA:
 
 
 class NFAToDFA:
-    """NFA到DFA转换器 (子集构造法)"""
+    """NFA到DFA转换器 (子集构造法)
+    
+    NFA状态集合表示为位集（见 NFA.closure_table），各NFA状态在每个符号下的
+    后继的ε闭包预先算好，move 加闭包只是若干次按位或；
+    位集为键索引已有的DFA状态，字符串ID和状态集合只在创建新状态时生成一次；
+    工作队列使用 deque。总耗时与输出DFA的规模大致成线性关系。
+    """
+    
+    def __init__(self):
+        # 最近一次转换的统计：DFA状态数、转移数、耗时（秒）
+        self.stats: Dict[str, float] = {}
     
-    def convert(self, nfa: NFA) -> DFA:
-        """将NFA转换为DFA"""
+    def convert(self, nfa: NFA, max_states: Optional[int] = None) -> DFA:
+        """将NFA转换为DFA
+        
+        给出 max_states 时，DFA状态数超过它即抛出 StateLimitExceeded，
+        用于及早放弃会指数膨胀的确定化（此时可改用 BitNFA 直接模拟）。
+        """
+        started = time.perf_counter()
         dfa = DFA()
         dfa.alphabet = nfa.alphabet.copy()
-        
-        # 计算初始状态的ε闭包
-        start_closure = nfa.epsilon_closure({nfa.start_state})
+        dfa.char_classes = nfa.char_classes
+        
+        # 各NFA状态在每个符号下的后继的ε闭包位集；只有非ε出边的状态才需要查看
+        order, bit_of, masks = nfa.closure_table()
+        steps: List[Dict[str, int]] = []
+        movable = 0
+        for index, state in enumerate(order):
+            step: Dict[str, int] = {}
+            for symbol, targets in state.transitions.items():
+                if symbol != 'ε':
+                    mask = 0
+                    for target in targets:
+                        mask |= masks[bit_of[target]]
+                    step[symbol] = mask
+            if step:
+                movable |= 1 << index
+            steps.append(step)
+        
+        # 初始状态的ε闭包
+        start_mask = masks[bit_of[nfa.start_state]]
+        start_closure = nfa.states_of(start_mask)
         start_id = self._state_set_to_id(start_closure)
         
         dfa.start_state = start_id
         dfa.add_state(start_id, start_closure)
         
-        # 工作队列
-        unprocessed = [start_closure]
-        processed = {start_id}
+        # NFA状态位集 -> DFA状态ID
+        state_ids: Dict[int, str] = {start_mask: start_id}
+        unprocessed = deque([start_mask])
         
         while unprocessed:
-            current_set = unprocessed.pop(0)
-            current_id = self._state_set_to_id(current_set)
+            current_mask = unprocessed.popleft()
+            current_id = state_ids[current_mask]
             
-            for symbol in dfa.alphabet:
-                # 计算move和ε闭包
-                move_result = nfa.move(current_set, symbol)
-                if move_result:
-                    next_closure = nfa.epsilon_closure(move_result)
+            # 按符号合并各NFA状态的后继闭包，即 move 之后再取ε闭包
+            moves: Dict[str, int] = {}
+            mask = current_mask & movable
+            while mask:
+                low = mask & -mask
+                for symbol, target in steps[low.bit_length() - 1].items():
+                    moves[symbol] = moves.get(symbol, 0) | target
+                mask ^= low
+            
+            for symbol in sorted(moves):
+                next_mask = moves[symbol]
+                next_id = state_ids.get(next_mask)
+                
+                # 如果是新状态，添加到DFA和工作队列
+                if next_id is None:
+                    if max_states is not None and len(state_ids) >= max_states:
+                        raise StateLimitExceeded(f"DFA状态数超过上限 {max_states}")
+                    next_closure = nfa.states_of(next_mask)
                     next_id = self._state_set_to_id(next_closure)
-                    
-                    # 添加转移
-                    dfa.add_transition(current_id, symbol, next_id)
-                    
-                    # 如果是新状态，添加到DFA和工作队列
-                    if next_id not in processed:
-                        dfa.add_state(next_id, next_closure)
-                        unprocessed.append(next_closure)
-                        processed.add(next_id)
-        
+                    state_ids[next_mask] = next_id
+                    dfa.add_state(next_id, next_closure)
+                    unprocessed.append(next_mask)
+                
+                # 添加转移
+                dfa.add_transition(current_id, symbol, next_id)
+        
+        self.stats = {
+            'states': len(dfa.states),
+            'transitions': len(dfa.transitions),
+            'time': time.perf_counter() - started,
+        }
         return dfa
     
     def _state_set_to_id(self, state_set: Set[State]) -> str:
@@ -525,90 +700,383 @@ class NFAToDFA:
         return '{' + ','.join(str(s.id) for s in sorted(state_set, key=lambda x: x.id)) + '}'
 
 
-class DFAMinimizer:
-    """DFA最小化器"""
+class RegexToDFA:
+    """正则表达式直接构造DFA (followpos方法)
     
-    def minimize(self, dfa: DFA) -> DFA:
-        """最小化DFA"""
-        # 初始分割：接受状态和非接受状态
-        accept_states = set(dfa.accept_states)
-        non_accept_states = set(dfa.states.keys()) - accept_states
-        
-        partitions = []
-        if non_accept_states:
-            partitions.append(non_accept_states)
-        if accept_states:
-            partitions.append(accept_states)
-        
-        # 迭代细化分割
-        changed = True
-        while changed:
-            changed = False
-            new_partitions = []
-            
-            for partition in partitions:
-                sub_partitions = self._split_partition(partition, partitions, dfa)
-                if len(sub_partitions) > 1:
-                    changed = True
-                new_partitions.extend(sub_partitions)
-            
-            partitions = new_partitions
-        
-        # 构建最小化DFA
-        return self._build_minimized_dfa(dfa, partitions)
+    在语法树上计算各位置的 followpos（见 regex_ast.Positions），并在正则末尾
+    接一个不匹配任何符号的结束标记位置。DFA状态是“接下来可能匹配的位置”的集合：
+    开始状态为 firstpos，状态 S 在符号 a 下转移到 S 中能匹配 a 的各位置的
+    followpos 之并，含结束标记的状态为接受状态。
+    
+    不创建NFA的 State 对象，也不需要ε闭包；位置集合表示为位集，
+    各位置的 followpos 预先换算为位集。得到的DFA与 RegexToNFA + NFAToDFA
+    识别相同的语言，最小化后完全相同；DFA.states 中的NFA状态集合为空。
+    """
+    
+    def __init__(self, char_classes: Optional[CharClasses] = None):
+        self.char_classes = char_classes
+        # 最近一次转换的正则是否含非贪婪量词（需要最短匹配，见 DFA.remove_accept_transitions）
+        self.shortest_match = False
+        # 最近一次转换的统计：位置数、DFA状态数、转移数、耗时（秒）
+        self.stats: Dict[str, float] = {}
     
-    def _split_partition(self, partition: Set[str], all_partitions: List[Set[str]], dfa: DFA) -> List[Set[str]]:
-        """分割分区"""
-        if len(partition) <= 1:
-            return [partition]
+    def convert(self, regex: str, token_type: Optional[TokenType] = None,
+                max_states: Optional[int] = None) -> DFA:
+        """将正则表达式直接转换为DFA
+        
+        正则使用了不支持的语法时抛出 ValueError；给出 max_states 时，
+        DFA状态数超过它即抛出 StateLimitExceeded（与 NFAToDFA.convert 相同）。
+        """
+        started = time.perf_counter()
+        parser = RegexToNFA(self.char_classes)
+        tree, mentioned = parser.syntax_tree(regex)
+        self.shortest_match = parser.shortest_match
+        
+        # 结束标记是最后一个位置，它不匹配任何符号，只用于判断能否在此结束
+        positions = Positions(Concat(tree, CharSet(frozenset())))
+        end_bit = 1 << (len(positions) - 1)
+        symbols = [sorted(chars) for chars in positions.symbols]
+        follow = []
+        for targets in positions.follow:
+            mask = 0
+            for position in targets:
+                mask |= 1 << position
+            follow.append(mask)
         
-        # 选择分区中的第一个状态作为代表
-        representative = next(iter(partition))
-        groups = {representative: {representative}}
+        dfa = DFA()
+        dfa.alphabet = set(mentioned).union(*positions.symbols)
+        dfa.char_classes = self.char_classes
+        
+        # 位置位集 -> DFA状态ID
+        state_ids: Dict[int, str] = {}
+        
+        def add_state(mask: int) -> str:
+            members = [index for index in range(mask.bit_length()) if mask >> index & 1]
+            state_id = '{' + ','.join(map(str, members)) + '}'
+            state_ids[mask] = state_id
+            dfa.add_state(state_id, set())
+            if mask & end_bit:
+                dfa.accept_states.add(state_id)
+                if token_type:
+                    dfa.token_types[state_id] = token_type
+            return state_id
+        
+        start_mask = 0
+        for position in positions.first:
+            start_mask |= 1 << position
+        dfa.start_state = add_state(start_mask)
+        unprocessed = deque([start_mask])
         
-        for state in partition:
-            if state == representative:
-                continue
+        while unprocessed:
+            current_mask = unprocessed.popleft()
+            current_id = state_ids[current_mask]
             
-            # 检查是否与代表状态等价
-            equivalent = True
-            for symbol in dfa.alphabet:
-                rep_target = dfa.get_transition(representative, symbol)
-                state_target = dfa.get_transition(state, symbol)
-                
-                # 找到目标状态所在的分区
-                rep_partition = self._find_partition(rep_target, all_partitions) if rep_target else None
-                state_partition = self._find_partition(state_target, all_partitions) if state_target else None
-                
-                if rep_partition != state_partition:
-                    equivalent = False
+            # 按符号合并状态中各位置的 followpos
+            moves: Dict[Union[str, int], int] = {}
+            mask = current_mask
+            while mask:
+                low = mask & -mask
+                index = low.bit_length() - 1
+                for symbol in symbols[index]:
+                    moves[symbol] = moves.get(symbol, 0) | follow[index]
+                mask ^= low
+            
+            for symbol in sorted(moves):
+                next_mask = moves[symbol]
+                next_id = state_ids.get(next_mask)
+                if next_id is None:
+                    if max_states is not None and len(state_ids) >= max_states:
+                        raise StateLimitExceeded(f"DFA状态数超过上限 {max_states}")
+                    next_id = add_state(next_mask)
+                    unprocessed.append(next_mask)
+                dfa.add_transition(current_id, symbol, next_id)
+        
+        self.stats = {
+            'positions': len(positions),
+            'states': len(dfa.states),
+            'transitions': len(dfa.transitions),
+            'time': time.perf_counter() - started,
+        }
+        return dfa
+
+
+class LazyDFA:
+    """按需确定化的DFA（多条规则合并）
+    
+    不预先做子集构造：DFA状态是各规则NFA活动状态的位集（见 BitNFA，各规则的位依次拼接），
+    扫描器走到某个状态、读入某个字符时才计算其后继，并缓存在容量为 cache_size 的
+    LRU表中（键为 (状态位集, 列)），超出容量时淘汰最久未用的转移。
+    实际输入只会经过DFA的一小部分状态，因此构造时间和内存都远小于完整的DFA，
+    而缓存命中时每个字符只需一次查表。
+    
+    nfas 按优先级降序给出，每个NFA必须按字符等价类构建（char_classes 非None）。
+    接受的规则取活动状态中下标最小的；含非贪婪量词的规则首次接受后不再继续。
+    stats 记录缓存的命中、未命中、淘汰次数和当前缓存的转移数。
+    """
+    
+    DEAD = 0
+    
+    def __init__(self, nfas: List[NFA], cache_size: int = 10000):
+        if any(nfa.char_classes is None for nfa in nfas):
+            raise ValueError("LazyDFA 需要按字符等价类构建的NFA")
+        # 列为各规则等价类的公共细分，与 DFAScanner 相同
+        self.char_classes = CharClasses(
+            chars for nfa in nfas for chars in nfa.char_classes.members
+        )
+        self.columns: Dict[str, int] = dict(self.char_classes.class_of)
+        self.other_column = self.char_classes.other_class
+        representatives = [next(iter(members), None) for members in self.char_classes.members]
+        
+        steps: List[List[Tuple[int, int]]] = [[] for _ in representatives]
+        self.start_mask = 0
+        self.accept_masks: List[int] = []
+        # 非贪婪规则：(接受位, 该规则全部位)，接受后清除该规则的位
+        self._stops: List[Tuple[int, int]] = []
+        offset = 0
+        for nfa in nfas:
+            bit_nfa = BitNFA(nfa)
+            local = nfa.char_classes
+            for column, char in enumerate(representatives):
+                local_column = local.classify(char) if char is not None else local.other_class
+                steps[column].extend(
+                    (sources << offset, target << offset)
+                    for sources, target in bit_nfa.steps[local_column]
+                )
+            self.start_mask |= bit_nfa.start_mask << offset
+            self.accept_masks.append(bit_nfa.accept_mask << offset)
+            if nfa.shortest_match:
+                self._stops.append((bit_nfa.accept_mask << offset,
+                                    ((1 << bit_nfa.state_count) - 1) << offset))
+            offset += bit_nfa.state_count
+        self.bit_count = offset
+        self.steps: List[Tuple[Tuple[int, int], ...]] = [tuple(column) for column in steps]
+        
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple[int, int], int]' = OrderedDict()
+        self._accepts: Dict[int, int] = {}
+        self.stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'evictions': 0, 'cached': 0}
+    
+    def accept_rule(self, state: int) -> int:
+        """状态接受的规则下标，-1 表示非接受状态"""
+        rule = self._accepts.get(state)
+        if rule is None:
+            rule = -1
+            for index, mask in enumerate(self.accept_masks):
+                if state & mask:
+                    rule = index
                     break
+            if len(self._accepts) >= self.cache_size:
+                self._accepts.clear()
+            self._accepts[state] = rule
+        return rule
+    
+    def next_state(self, state: int, column: int) -> int:
+        """状态在某列下的后继（DEAD 为死状态），优先取缓存"""
+        key = (state, column)
+        target = self._cache.get(key)
+        if target is not None:
+            self.stats['hits'] += 1
+            self._cache.move_to_end(key)
+            return target
+        return self._determinize(state, column)
+    
+    def _determinize(self, state: int, column: int) -> int:
+        """计算一个未缓存的转移并加入缓存"""
+        cache = self._cache
+        self.stats['misses'] += 1
+        source = state
+        for accept, rule_bits in self._stops:
+            if state & accept:
+                source &= ~rule_bits
+        target = 0
+        for sources, targets in self.steps[column]:
+            if source & sources:
+                target |= targets
+        
+        cache[(state, column)] = target
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+            self.stats['evictions'] += 1
+        self.stats['cached'] = len(cache)
+        return target
+    
+    def clear_cache(self):
+        """清空转移缓存和统计"""
+        self._cache.clear()
+        self._accepts.clear()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'cached': 0}
+    
+    def scan(self, text: str, final: bool = True) -> Iterator[Tuple[int, int, int]]:
+        """扫描文本，依次产生 (起始位置, 结束位置, 规则下标)，语义同 DFAScanner.scan"""
+        columns = self.columns
+        other = self.other_column
+        next_state = self.next_state
+        accept_rule = self.accept_rule
+        # 缓存命中的路径内联在循环中，命中次数最后一并计入 stats
+        cache_get = self._cache.get
+        touch = self._cache.move_to_end
+        determinize = self._determinize
+        accepts_get = self._accepts.get
+        hits = 0
+        start = self.start_mask
+        length = len(text)
+        # 失败对 (位置, 状态)：从该处继续扫描不会再遇到接受状态
+        failed = set()
+        # 当前错误字符段的起始位置，-1 表示不在错误段中
+        error_start = -1
+        
+        position = 0
+        while position < length:
+            state = start
+            index = position
+            last_end = -1
+            last_rule = -1
+            last_state = start
+            
+            while index < length:
+                key = (state, columns.get(text[index], other))
+                target = cache_get(key)
+                if target is None:
+                    state = determinize(*key)
+                else:
+                    hits += 1
+                    touch(key)
+                    state = target
+                if not state:
+                    break
+                index += 1
+                if failed and (index, state) in failed:
+                    break
+                rule = accepts_get(state)
+                if rule is None:
+                    rule = accept_rule(state)
+                if rule >= 0:
+                    last_end = index
+                    last_rule = rule
+                    last_state = state
+            else:
+                if not final:
+                    if error_start >= 0:
+                        yield error_start, position, -1
+                    return
             
-            if equivalent:
-                groups[representative].add(state)
+            # 越过最后一次接受位置之后经过的 (状态, 位置) 全部记为失败
+            if last_rule >= 0:
+                back_state, back_index = last_state, last_end
             else:
-                # 创建新组
-                groups[state] = {state}
+                back_state, back_index = start, position
+            while back_index < index:
+                back_state = next_state(back_state, columns.get(text[back_index], other))
+                back_index += 1
+                failed.add((back_index, back_state))
+            
+            self.stats['hits'] += hits
+            hits = 0
+            if last_rule < 0:
+                # 开始状态在其上没有转移的字符不可能开始Token，并入错误段直接跳过
+                if error_start < 0:
+                    error_start = position
+                position += 1
+                while position < length and not next_state(start, columns.get(text[position], other)):
+                    position += 1
+            else:
+                if error_start >= 0:
+                    yield error_start, position, -1
+                    error_start = -1
+                yield position, last_end, last_rule
+                position = last_end
+        
+        if error_start >= 0:
+            yield error_start, length, -1
+
+
+class DFAMinimizer:
+    """DFA最小化器（Hopcroft分割细化算法）
+    
+    缺失的转移视为指向一个虚拟的死状态，它单独成块、不与任何真实状态合并，
+    因此只合并真正等价的状态。接受状态按Token类型分开，不同类型的接受状态不会合并。
+    """
+    
+    def minimize(self, dfa: DFA) -> DFA:
+        """最小化DFA"""
+        partitions = self._refine(dfa)
         
-        return list(groups.values())
+        # 构建最小化DFA
+        return self._build_minimized_dfa(dfa, partitions)
     
-    def _find_partition(self, state: str, partitions: List[Set[str]]) -> Optional[int]:
-        """找到状态所在的分区索引"""
-        for i, partition in enumerate(partitions):
-            if state in partition:
-                return i
-        return None
+    def _refine(self, dfa: DFA) -> List[Set[str]]:
+        """Hopcroft算法：返回等价状态的分区列表，时间复杂度 O(|Σ|·n·log n)"""
+        # 初始分割：非接受状态一块，接受状态按Token类型分块
+        groups: Dict[Tuple[bool, Optional[TokenType]], Set[str]] = {}
+        for state in dfa.states:
+            accepting = state in dfa.accept_states
+            key = (accepting, dfa.token_types.get(state) if accepting else None)
+            groups.setdefault(key, set()).add(state)
+        # 虚拟死状态（None）单独成块
+        blocks: List[Set[Optional[str]]] = list(groups.values()) + [{None}]
+        block_of = {state: index for index, block in enumerate(blocks) for state in block}
+        
+        # 逆转移索引：inverse[符号][目标状态] = 经该符号转移到目标状态的状态列表
+        inverse: Dict[str, Dict[Optional[str], List[Optional[str]]]] = {}
+        for symbol in dfa.alphabet:
+            sources: Dict[Optional[str], List[Optional[str]]] = {None: [None]}
+            for state in dfa.states:
+                sources.setdefault(dfa.transitions.get((state, symbol)), []).append(state)
+            inverse[symbol] = sources
+        
+        worklist = list(range(len(blocks)))
+        while worklist:
+            splitter = list(blocks[worklist.pop()])
+            for sources in inverse.values():
+                # 按所在块收集能转移进 splitter 的状态
+                touched: Dict[int, Set[Optional[str]]] = {}
+                for target in splitter:
+                    for state in sources.get(target, ()):
+                        touched.setdefault(block_of[state], set()).add(state)
+                
+                for index, inside in touched.items():
+                    block = blocks[index]
+                    if len(inside) == len(block):
+                        continue
+                    outside = block - inside
+                    # 较小的一半成为新块并加入工作表；原块若仍在工作表中，两半都会被处理
+                    if len(inside) > len(outside):
+                        inside, outside = outside, inside
+                    blocks[index] = outside
+                    blocks.append(inside)
+                    for state in inside:
+                        block_of[state] = len(blocks) - 1
+                    worklist.append(len(blocks) - 1)
+        
+        return [block for block in blocks if None not in block]
     
     def _build_minimized_dfa(self, original_dfa: DFA, partitions: List[Set[str]]) -> DFA:
         """构建最小化DFA"""
         minimized = DFA()
         minimized.alphabet = original_dfa.alphabet.copy()
-        
-        # 创建分区到新状态ID的映射
-        partition_to_id = {}
-        for i, partition in enumerate(partitions):
-            new_id = f"q{i}"
-            partition_to_id[i] = new_id
+        minimized.char_classes = original_dfa.char_classes
+        symbols = sorted(original_dfa.alphabet)
+        block_of = {state: index for index, partition in enumerate(partitions) for state in partition}
+        
+        # 按从开始状态出发的广度优先顺序编号，开始状态所在分区为 q0
+        order = []
+        seen = set()
+        if original_dfa.start_state in block_of:
+            order.append(block_of[original_dfa.start_state])
+            seen.add(order[0])
+        for index in order:
+            representative = next(iter(partitions[index]))
+            for symbol in symbols:
+                target = original_dfa.get_transition(representative, symbol)
+                if target is not None and block_of[target] not in seen:
+                    seen.add(block_of[target])
+                    order.append(block_of[target])
+        order.extend(index for index in range(len(partitions)) if index not in seen)
+        partition_to_id = {index: f"q{number}" for number, index in enumerate(order)}
+        
+        for index in order:
+            partition = partitions[index]
+            new_id = partition_to_id[index]
             
             # 选择分区中的一个代表状态
             representative = next(iter(partition))
@@ -618,31 +1086,26 @@ class DFAMinimizer:
             if original_dfa.start_state in partition:
                 minimized.start_state = new_id
             
-            # 设置接受状态和Token类型
-            if any(state in original_dfa.accept_states for state in partition):
+            # 设置接受状态和Token类型（同一分区内的状态类型相同）
+            if representative in original_dfa.accept_states:
                 minimized.accept_states.add(new_id)
-                # 使用代表状态的Token类型
                 if representative in original_dfa.token_types:
                     minimized.token_types[new_id] = original_dfa.token_types[representative]
-        
-        # 添加转移
-        for i, partition in enumerate(partitions):
-            representative = next(iter(partition))
-            from_id = partition_to_id[i]
             
-            for symbol in minimized.alphabet:
+            # 添加转移
+            for symbol in symbols:
                 target = original_dfa.get_transition(representative, symbol)
-                if target:
-                    target_partition = self._find_partition(target, partitions)
-                    if target_partition is not None:
-                        to_id = partition_to_id[target_partition]
-                        minimized.add_transition(from_id, symbol, to_id)
+                if target is not None:
+                    minimized.add_transition(new_id, symbol, partition_to_id[block_of[target]])
         
         return minimized
 
 
-def visualize_nfa(nfa: NFA, title: str = "NFA") -> Image.Image:
-    """可视化NFA"""
+def visualize_nfa(nfa: NFA, title: str = "NFA") -> 'Image.Image':
+    """可视化NFA（graphviz 和 Pillow 只在可视化时导入，词法分析本身不依赖它们）"""
+    import graphviz
+    from PIL import Image
+    
     dot = graphviz.Digraph(comment=title)
     dot.attr(rankdir='LR')
     
@@ -671,8 +1134,11 @@ def visualize_nfa(nfa: NFA, title: str = "NFA") -> Image.Image:
     return Image.open(io.BytesIO(img_data))
 
 
-def visualize_dfa(dfa: DFA, title: str = "DFA") -> Image.Image:
+def visualize_dfa(dfa: DFA, title: str = "DFA") -> 'Image.Image':
     """可视化DFA"""
+    import graphviz
+    from PIL import Image
+    
     dot = graphviz.Digraph(comment=title)
     dot.attr(rankdir='LR')
     
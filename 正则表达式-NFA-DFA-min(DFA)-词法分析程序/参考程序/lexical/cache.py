@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扫描器缓存模块
+
+把规则集编译得到的表驱动扫描器（见 DFAScanner）保存为压缩的表文件，
+以规则集（模式、Token类型、优先级）和关键字的哈希为键：
+- 规则未变时直接读入转移表，不再执行 正则 -> NFA -> DFA -> 最小化DFA -> 乘积构造
+- 文件内容为 zlib 压缩的 JSON，哈希或格式版本不符时视为未命中
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from .scanner import DFAScanner
+from .token import TokenType
+
+
+# 缓存格式版本：扫描器的构造方式或表格式改变时递增，使旧缓存失效
+CACHE_VERSION = 1
+
+# 规则文件对应的缓存文件后缀（rules.txt -> rules.txt.dfa）
+CACHE_SUFFIX = '.dfa'
+
+
+def rules_digest(rules: List[Tuple[str, TokenType, int]], keywords: Dict[str, TokenType]) -> str:
+    """规则集的哈希：按顺序的 (模式, Token类型, 优先级) 及关键字表"""
+    content = json.dumps({
+        'version': CACHE_VERSION,
+        'rules': [[pattern, token_type.name, priority] for pattern, token_type, priority in rules],
+        'keywords': [[keyword, token_type.name] for keyword, token_type in keywords.items()],
+    }, ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def save_scanner(filename: str, digest: str, scanner: DFAScanner):
+    """把扫描器写入缓存文件（先写临时文件再替换，避免留下不完整的文件）"""
+    data = scanner.to_dict()
+    data['version'] = CACHE_VERSION
+    data['digest'] = digest
+    payload = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    temp_name = f"{filename}.{os.getpid()}.tmp"
+    with open(temp_name, 'wb') as f:
+        f.write(payload)
+    os.replace(temp_name, filename)
+
+
+def load_scanner(filename: str, digest: str) -> Optional[DFAScanner]:
+    """读取缓存文件；文件不存在、已损坏或哈希不符时返回None"""
+    try:
+        with open(filename, 'rb') as f:
+            data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        if data.get('version') != CACHE_VERSION or data.get('digest') != digest:
+            return None
+        return DFAScanner.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError, zlib.error):
+        return None
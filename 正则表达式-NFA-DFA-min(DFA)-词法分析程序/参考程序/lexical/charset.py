@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字符等价类模块
+
+把规则中出现的全部字符集合对字符进行划分，自动机在等价类编号上转移：
+- [a-zA-Z0-9_] 这样的字符类不再展开为几十条逐字符的转移
+- 扫描器的转移表为稠密的 状态 × 等价类 数组，扫描时先查“字符 -> 等价类”表
+"""
+
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List
+
+
+class CharClasses:
+    """字符等价类划分
+
+    两个字符属于同一等价类，当且仅当每个参与划分的字符集合要么同时包含它们，
+    要么同时不包含。取补集的字符类（[^...]、\\S、. 等）与原集合的划分相同，
+    因此只需提供集合本身。未在任何集合中出现的字符都属于“其他字符”类。
+
+    Attributes:
+        class_of: 显式出现的字符 -> 等价类编号
+        members: 各等价类包含的显式字符（“其他字符”类为空集）
+        other_class: “其他字符”类的编号（总是最后一个）
+    """
+
+    def __init__(self, char_sets: Iterable[AbstractSet[str]]):
+        # 每个字符的签名：包含它的集合下标列表；签名相同即等价
+        signatures: Dict[str, List[int]] = {}
+        for index, chars in enumerate(dict.fromkeys(frozenset(chars) for chars in char_sets)):
+            for char in chars:
+                signatures.setdefault(char, []).append(index)
+
+        class_ids: Dict[tuple, int] = {}
+        members: List[set] = []
+        self.class_of: Dict[str, int] = {}
+        for char in sorted(signatures):
+            signature = tuple(signatures[char])
+            if signature not in class_ids:
+                class_ids[signature] = len(members)
+                members.append(set())
+            self.class_of[char] = class_ids[signature]
+            members[class_ids[signature]].add(char)
+
+        self.other_class = len(members)
+        members.append(set())
+        self.members: List[FrozenSet[str]] = [frozenset(chars) for chars in members]
+
+    @classmethod
+    def from_members(cls, members: List[AbstractSet[str]]) -> 'CharClasses':
+        """按已有的划分（各等价类的显式字符，“其他字符”类在最后）直接恢复，编号保持不变"""
+        char_classes = cls.__new__(cls)
+        char_classes.members = [frozenset(chars) for chars in members]
+        char_classes.other_class = len(members) - 1
+        char_classes.class_of = {
+            char: class_id for class_id, chars in enumerate(char_classes.members) for char in chars
+        }
+        return char_classes
+
+    @property
+    def count(self) -> int:
+        """等价类个数（含“其他字符”类）"""
+        return len(self.members)
+
+    def classify(self, char: str) -> int:
+        """字符所属的等价类编号"""
+        return self.class_of.get(char, self.other_class)
+
+    def symbols(self, chars: AbstractSet[str], negated: bool = False) -> FrozenSet[int]:
+        """字符集合（negated 为 True 时取其补集）对应的等价类编号集合
+
+        该集合必须参与过划分（即恰为若干等价类之并），否则抛出 ValueError。
+        """
+        try:
+            hit = {self.class_of[char] for char in chars}
+        except KeyError:
+            raise ValueError("字符集合未参与等价类划分") from None
+        if sum(len(self.members[class_id]) for class_id in hit) != len(chars):
+            raise ValueError("字符集合未参与等价类划分")
+        if negated:
+            return frozenset(range(self.count)) - hit
+        return frozenset(hit)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扫描器代码生成模块
+
+把规则集编译得到的表驱动扫描器（见 DFAScanner）输出为一个独立的Python模块：
+- 模块中只有转移表、接受表和专门生成的扫描循环，只依赖标准库
+- 不需要 automata.py 等构造代码，也不使用正则表达式
+- 分析结果与 LexicalAnalyzer.analyze_with_automata 相同
+
+用法（在 参考程序 目录下）：
+    python -m lexical.codegen -l c -o c_lexer.py
+    python c_lexer.py source.c
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+from .analyzer import ERROR_PREVIEW, LexicalAnalyzer, create_pascal_analyzer, create_c_analyzer
+from .cache import rules_digest
+from .token import TokenType
+
+
+# 扫描循环中按规则编号查到的处理方式
+KIND_TOKEN = 0    # 产生Token
+KIND_SKIP = 1     # 空白、注释：不产生Token
+
+# 生成模块中与规则集无关的部分：扫描循环和命令行入口
+_MODULE_BODY = '''
+
+def _error(tokens, errors, value, offset, line_starts):
+    """记录从 offset 开始的一段未识别字符，错误信息已达 MAX_ERRORS 条时返回1（只计数）"""
+    line = bisect_right(line_starts, offset)
+    column = offset - line_starts[line - 1] + 1
+    tokens.append(Token('ERROR', value, line, column))
+    if MAX_ERRORS is not None and len(errors) >= MAX_ERRORS:
+        return 1
+    if len(value) == 1:
+        errors.append(f"未识别的字符 '{value}' 在第 {line} 行第 {column} 列")
+    else:
+        preview = value if len(value) <= ERROR_PREVIEW else value[:ERROR_PREVIEW] + '...'
+        errors.append(f"未识别的字符序列 '{preview}'（共 {len(value)} 个字符）"
+                      f"在第 {line} 行第 {column} 列")
+    return 0
+
+
+def tokenize(text):
+    """词法分析，返回 (Token列表, 错误信息列表)
+
+    按最长匹配识别Token，长度相同时取编号小（优先级高）的规则；
+    空白和注释不产生Token，连续无法识别的字符合并为一个 ERROR Token，
+    错误信息最多 MAX_ERRORS 条（其余只计数），列表以 EOF Token 结束。
+    扫描时只记录偏移，产生Token时由行首偏移表二分查找得到行号和列号。
+    """
+    table = TABLE
+    accept = ACCEPT
+    columns = COLUMNS
+    other = OTHER_COLUMN
+    kinds = KINDS
+    token_types = TOKEN_TYPES
+    start_row = table[0]
+    state_count = len(table)
+    length = len(text)
+    tokens = []
+    errors = []
+    append = tokens.append
+    # 各行行首的偏移
+    line_starts = [0]
+    newline = text.find('\\n')
+    while newline >= 0:
+        line_starts.append(newline + 1)
+        newline = text.find('\\n', newline + 1)
+    # 失败对 position * state_count + state：从该处继续扫描不会再遇到接受状态
+    failed = set()
+    # 当前错误字符段的起始位置（-1 表示不在错误段中），以及超出上限未记录的错误数
+    error_start = -1
+    suppressed = 0
+
+    position = 0
+    while position < length:
+        state = 0
+        index = position
+        last_end = -1
+        last_rule = -1
+        last_state = 0
+
+        while index < length:
+            state = table[state][columns.get(text[index], other)]
+            if state < 0:
+                break
+            index += 1
+            if failed and index * state_count + state in failed:
+                break
+            rule = accept[state]
+            if rule >= 0:
+                last_end = index
+                last_rule = rule
+                last_state = state
+
+        # 越过最后一次接受位置之后经过的 (状态, 位置) 全部记为失败
+        if last_rule >= 0:
+            back_state, back_index = last_state, last_end
+        else:
+            back_state, back_index = 0, position
+        while back_index < index:
+            back_state = table[back_state][columns.get(text[back_index], other)]
+            back_index += 1
+            failed.add(back_index * state_count + back_state)
+
+        if last_rule < 0:
+            # 连续无法识别的字符合并为一段，开始状态上没有转移的字符直接跳过
+            if error_start < 0:
+                error_start = position
+            position += 1
+            while position < length and start_row[columns.get(text[position], other)] < 0:
+                position += 1
+            continue
+
+        if error_start >= 0:
+            suppressed += _error(tokens, errors, text[error_start:position], error_start, line_starts)
+            error_start = -1
+
+        if kinds[last_rule] == 0:
+            line = bisect_right(line_starts, position)
+            append(Token(token_types[last_rule], text[position:last_end],
+                         line, position - line_starts[line - 1] + 1))
+        position = last_end
+
+    if error_start >= 0:
+        suppressed += _error(tokens, errors, text[error_start:], error_start, line_starts)
+    if suppressed:
+        errors.append(f"另有 {suppressed} 处错误未列出")
+    line = len(line_starts)
+    append(Token('EOF', '', line, length - line_starts[-1] + 1))
+    return tokens, errors
+
+
+def main(argv=None):
+    """命令行入口：分析文件（省略时读标准输入）并逐行输出Token"""
+    import sys
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        with open(argv[0], 'r', encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+    tokens, errors = tokenize(text)
+    for token in tokens:
+        print(f"{token.line}:{token.column}\\t{token.type}\\t{token.value!r}")
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
+'''
+
+
+def _token_kind(token_type: TokenType) -> int:
+    """Token类型在扫描循环中的处理方式"""
+    if token_type in (TokenType.WHITESPACE, TokenType.COMMENT):
+        return KIND_SKIP
+    return KIND_TOKEN
+
+
+def generate_scanner_module(analyzer: LexicalAnalyzer) -> str:
+    """为分析器的当前规则集（含关键字）生成独立扫描器模块的源代码
+
+    规则集无法合并为扫描器时（含自动机不支持的语法，或有只能用NFA模拟的规则）抛出 ValueError。
+    """
+    scanner = analyzer.build_scanner()
+    if scanner is None:
+        raise ValueError("规则集无法合并为扫描器（含自动机不支持的语法或只能用NFA模拟的规则）")
+
+    rules = [(rule.pattern, rule.token_type, rule.priority) for rule in analyzer.rules]
+    digest = rules_digest(rules, analyzer.keywords)
+    columns = {char: column for char, column in sorted(scanner.columns.items())}
+    table_rows = ',\n'.join(f"    {tuple(row)!r}" for row in scanner.table)
+
+    lines: List[str] = [
+        '#!/usr/bin/env python3',
+        '# -*- coding: utf-8 -*-',
+        '"""',
+        '由 lexical.codegen 生成的独立词法分析器，请勿手工修改',
+        '',
+        f'规则集哈希: {digest}',
+        f'规则数: {len(rules)}，关键字数: {len(analyzer.keywords)}，'
+        f'扫描器状态数: {scanner.state_count}，字符等价类数: {scanner.char_classes.count}',
+        '',
+        '只依赖Python标准库；tokenize(text) 的结果与',
+        'LexicalAnalyzer.analyze_with_automata 相同（Token类型为 TokenType 的名称）。',
+        '"""',
+        '',
+        'from bisect import bisect_right',
+        'from collections import namedtuple',
+        '',
+        '',
+        "Token = namedtuple('Token', ['type', 'value', 'line', 'column'])",
+        '',
+        '# 规则编号 -> Token类型名称（关键字类型在各规则之后）',
+        f'TOKEN_TYPES = {tuple(token_type.name for token_type in scanner.token_types)!r}',
+        '',
+        '# 规则编号 -> 处理方式：0 产生Token，1 跳过（空白、注释）',
+        f'KINDS = {tuple(_token_kind(token_type) for token_type in scanner.token_types)!r}',
+        '',
+        '# 字符 -> 转移表的列（字符等价类），未出现的字符使用 OTHER_COLUMN',
+        f'COLUMNS = {columns!r}',
+        f'OTHER_COLUMN = {scanner.other_column!r}',
+        '',
+        '# TABLE[state][column] -> 下一状态，-1 为死状态；0 为开始状态',
+        f'TABLE = (\n{table_rows},\n)',
+        '',
+        '# ACCEPT[state] -> 接受的规则编号，-1 为非接受状态',
+        f'ACCEPT = {tuple(scanner.accept_rule)!r}',
+        '',
+        '# 错误信息条数上限（None 表示不限），错误信息中一段未识别字符最多显示的字符数',
+        f'MAX_ERRORS = {analyzer.max_errors!r}',
+        f'ERROR_PREVIEW = {ERROR_PREVIEW!r}',
+    ]
+    return '\n'.join(lines) + '\n' + _MODULE_BODY
+
+
+def write_scanner_module(analyzer: LexicalAnalyzer, filename: str):
+    """生成独立扫描器模块并写入文件"""
+    source = generate_scanner_module(analyzer)
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(source)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="把词法规则集生成为独立的Python扫描器模块")
+    parser.add_argument('-l', '--language', choices=['pascal', 'c'], default='pascal',
+                        help="内置规则集（默认 pascal）")
+    parser.add_argument('-r', '--rules', help="额外加载的规则文件（模式\\t类型\\t优先级）")
+    parser.add_argument('-o', '--output', required=True, help="输出的模块文件名")
+    args = parser.parse_args(argv)
+
+    analyzer = create_c_analyzer() if args.language == 'c' else create_pascal_analyzer()
+    if args.rules and not analyzer.load_rules_from_file(args.rules):
+        for error in analyzer.get_errors():
+            print(error, file=sys.stderr)
+        return 1
+
+    try:
+        write_scanner_module(analyzer, args.output)
+    except (ValueError, OSError) as e:
+        print(f"生成失败: {e}", file=sys.stderr)
+        return 1
+    print(f"已生成 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+首字符集合模块
+
+分析正则表达式（re 语法）能匹配的首字符，合并为一个字符类正则：
+- 文本中不被它匹配的位置不可能开始任何Token
+- 错误恢复时据此一次跳过一整段无法识别的字符，而不必在每个位置逐条尝试规则
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+
+# 字符类中的 \d、\w 等类别 -> 正则写法
+_CATEGORY_CLASSES = {
+    sre_parse.CATEGORY_DIGIT: r'\d', sre_parse.CATEGORY_NOT_DIGIT: r'\D',
+    sre_parse.CATEGORY_SPACE: r'\s', sre_parse.CATEGORY_NOT_SPACE: r'\S',
+    sre_parse.CATEGORY_WORD: r'\w', sre_parse.CATEGORY_NOT_WORD: r'\W',
+}
+
+# Python 3.11 新增的结构，旧版本中不存在
+_POSSESSIVE_REPEAT = getattr(sre_parse, 'POSSESSIVE_REPEAT', None)
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+
+
+def _class_text(items) -> Optional[str]:
+    """把语法树中的字符类（IN 的内容）还原为 [...] 写法，含无法还原的成员时返回None"""
+    negate = ''
+    body = []
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = '^'
+        elif op is sre_parse.LITERAL:
+            body.append(re.escape(chr(av)))
+        elif op is sre_parse.RANGE:
+            body.append(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+        elif op is sre_parse.CATEGORY and av in _CATEGORY_CLASSES:
+            body.append(_CATEGORY_CLASSES[av])
+        else:
+            return None
+    return f"[{negate}{''.join(body)}]"
+
+
+def _first_chars(items) -> Tuple[Optional[List[str]], bool]:
+    """求正则语法树能匹配的首字符
+
+    返回 (首字符的字符类写法列表, 能否匹配空串)，含无法分析的结构时返回 (None, True)。
+    锚点和环视不消耗字符，按可空处理（忽略环视的限制只会使首字符集合偏大）。
+    """
+    parts: List[str] = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            return parts + [re.escape(chr(av))], False
+        if op is sre_parse.NOT_LITERAL:
+            return parts + [f"[^{re.escape(chr(av))}]"], False
+        if op is sre_parse.ANY:
+            return parts + [r'[\s\S]'], False
+        if op is sre_parse.IN:
+            part = _class_text(av)
+            if part is None:
+                return None, True
+            return parts + [part], False
+        if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue
+
+        if op is sre_parse.SUBPATTERN:
+            if av[1] & re.IGNORECASE:
+                return None, True
+            alternatives = [av[3]]
+        elif op is sre_parse.BRANCH:
+            alternatives = av[1]
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, _POSSESSIVE_REPEAT):
+            alternatives = [av[2]]
+        elif op is _ATOMIC_GROUP:
+            alternatives = [av]
+        else:
+            return None, True
+
+        nullable = False
+        for alternative in alternatives:
+            first, empty = _first_chars(alternative)
+            if first is None:
+                return None, True
+            parts.extend(first)
+            nullable = nullable or empty
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, _POSSESSIVE_REPEAT) and av[0] == 0:
+            nullable = True
+        if not nullable:
+            return parts, False
+    return parts, True
+
+
+def start_char_regex(patterns: List[str]) -> Optional['re.Pattern']:
+    """把一组规则的首字符集合合并为一个正则，文本中不被它匹配的位置不可能开始任何Token
+
+    错误恢复时据此直接跳过不可能开始Token的字符。有规则无法分析首字符
+    （含反向引用、忽略大小写、能匹配空串等）时返回None，表示每个位置都可能开始Token。
+    """
+    parts: List[str] = []
+    for pattern in patterns:
+        try:
+            parsed = sre_parse.parse(pattern)
+        except re.error:
+            return None
+        if parsed.state.flags & re.IGNORECASE:
+            return None
+        first, nullable = _first_chars(parsed)
+        if first is None or nullable:
+            return None
+        parts.extend(first)
+    if not parts:
+        return None
+    return re.compile('|'.join(dict.fromkeys(parts)))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行号索引模块
+
+分析时Token只记录在源文本中的起始偏移，行号和列号由行首偏移索引换算：
+- 索引在第一次查询位置时才构建，一次性找出全部换行符
+- 由偏移求 (行号, 列号) 只需一次二分查找，分析循环中不再逐Token维护行列
+- 跨行的Token（多行注释、字符串）之后的位置同样正确
+- UTF-8 字节串（ByteLineIndex）的偏移按字节，列号仍按字符计数
+"""
+
+import re
+from array import array
+from bisect import bisect_right
+from typing import Tuple
+
+_NEWLINE = re.compile('\n')
+_NEWLINE_BYTES = re.compile(b'\n')
+
+
+class LineIndex:
+    """源文本的行首偏移索引
+
+    只有 '\\n' 算作换行（'\\r\\n' 中的 '\\r' 属于上一行的末尾）。
+    行号、列号都从1开始，列号按字符计数。
+
+    Attributes:
+        text: 源文本
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._starts = None
+
+    @property
+    def starts(self) -> array:
+        """各行行首的偏移（第 i 行对应下标 i-1），首次访问时构建"""
+        if self._starts is None:
+            self._build()
+        return self._starts
+
+    def _build(self):
+        """一次性找出全部换行符，记录各行行首的偏移"""
+        starts = array('q', [0])
+        starts.extend(match.end() for match in _NEWLINE.finditer(self.text))
+        self._starts = starts
+
+    @property
+    def line_count(self) -> int:
+        """行数（末尾的换行符之后算作新的一行）"""
+        return len(self.starts)
+
+    def line_of(self, offset: int) -> int:
+        """偏移 offset 所在的行号"""
+        return bisect_right(self.starts, offset)
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """偏移 offset 对应的 (行号, 列号)"""
+        starts = self._starts
+        if starts is None:
+            self._build()
+            starts = self._starts
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+
+class ByteLineIndex(LineIndex):
+    """UTF-8 字节串（bytes、memoryview、mmap 等）的行首偏移索引
+
+    偏移按字节计，列号与 LineIndex 相同按字符计数：
+    换算列号时才解码字节，不需要预先解码整个输入。
+    记住上一次换算的 (偏移, 行号, 列号)：同一行中向后的偏移只解码两次查询之间的字节，
+    按顺序换算一行中的全部Token只需解码这一行一遍。
+    """
+
+    def __init__(self, text):
+        super().__init__(text)
+        self._last = (0, 1, 1)
+
+    def _build(self):
+        starts = array('q', [0])
+        starts.extend(match.end() for match in _NEWLINE_BYTES.finditer(self.text))
+        self._starts = starts
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """字节偏移 offset 对应的 (行号, 列号)"""
+        line, column = super().position(offset)
+        if column > 1:
+            line_start = offset - column + 1
+            last_offset, last_line, last_column = self._last
+            if last_line == line and line_start <= last_offset <= offset:
+                column = last_column + len(str(self.text[last_offset:offset], 'utf-8', 'replace'))
+            else:
+                column = len(str(self.text[line_start:offset], 'utf-8', 'replace')) + 1
+        self._last = (offset, line, column)
+        return line, column
+
+
+def make_line_index(text) -> LineIndex:
+    """按源文本的类型创建行首偏移索引（字符串用 LineIndex，UTF-8 字节串用 ByteLineIndex）"""
+    return LineIndex(text) if isinstance(text, str) else ByteLineIndex(text)
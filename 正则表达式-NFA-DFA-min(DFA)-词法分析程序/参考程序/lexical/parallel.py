@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行词法分析模块
+
+把大文本在安全的重新同步点切块，用进程池并行分析，再校验/修复块边界后拼接：
+- 预扫描：只用注释、字符串等可能跨行的规则做一遍匹配，
+  取不在这些Token内部的换行符之后的位置作为切分点
+- 各进程从块起点独立分析，结果为 (起点, 终点, 规则下标) 片段，
+  并带有块后一段前瞻文本，保证块末尾附近的匹配与顺序分析一致
+- 拼接时从上一块真实的结束位置继续：若该位置恰是本块某个片段的起点即已同步，
+  否则在主进程中顺序重新分析，直到与本块的片段边界重合
+- 行号、列号、关键字和错误信息在主进程中按顺序统一生成，结果与 analyze() 相同
+
+词法分析器是无状态的（每个Token只取决于起点和文本），因此一旦边界重合，
+其后的片段与顺序分析完全一致。
+"""
+
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Optional
+
+from .token import Token, TokenType
+from .analyzer import LexicalAnalyzer, LexicalRule, DEFAULT_CHUNK_SIZE
+
+
+# 可能跨越多行的Token类型，切分点不能落在它们内部
+SPANNING_TYPES = {
+    TokenType.COMMENT,
+    TokenType.STRING_LITERAL,
+    TokenType.CHAR_LITERAL,
+    TokenType.PREPROCESSOR,
+}
+
+# 每块的最小字符数，太小时进程间传输的开销超过并行收益
+MIN_CHUNK_SIZE = 256 * 1024
+
+
+# ==================== 工作进程 ====================
+
+_worker_rules: List[LexicalRule] = []
+
+
+def _init_worker(rule_specs: List[Tuple[str, TokenType, int, str]]):
+    """工作进程初始化：每个进程只编译一次规则"""
+    global _worker_rules
+    _worker_rules = [LexicalRule(pattern, token_type, priority, engine)
+                     for pattern, token_type, priority, engine in rule_specs]
+
+
+def _lex_chunk(piece: str, offset: int, limit: int, at_eof: bool) -> Tuple[array, bool]:
+    """分析一个块
+
+    piece 为块文本加上前瞻文本，limit 为块本身的长度。从块起点开始匹配，
+    直到某个片段结束于 limit 或其后为止。
+
+    Returns:
+        (扁平的片段数组 [起点, 终点, 规则下标, ...]（全局位置，错误字符的规则下标为-1）,
+         最后一个片段是否可信（未被前瞻文本的末尾截断）)
+    """
+    rules = _worker_rules
+    spans = array('q')
+    position = 0
+    length = len(piece)
+
+    while position < limit:
+        for index, rule in enumerate(rules):
+            match = rule.match(piece, position)
+            if match:
+                end = match.end()
+                break
+        else:
+            index = -1
+            end = position + 1
+        spans.extend((offset + position, offset + end, index))
+        position = end
+
+    return spans, at_eof or position < length
+
+
+# ==================== 主进程 ====================
+
+def find_split_points(text: str, rules: List[LexicalRule], chunk_size: int) -> List[int]:
+    """预扫描文本，返回切分点列表（均为换行符之后的位置，且不在注释/字符串内部）"""
+    patterns = [rule.pattern for rule in rules if rule.token_type in SPANNING_TYPES]
+    span_starts: List[int] = []
+    span_ends: List[int] = []
+    if patterns:
+        try:
+            spanning = re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+        except re.error:
+            # 无法合并（如含编号反向引用）时不切分
+            return []
+        for match in spanning.finditer(text):
+            span_starts.append(match.start())
+            span_ends.append(match.end())
+
+    points = []
+    target = chunk_size
+    while target < len(text):
+        newline = text.find('\n', target)
+        while newline >= 0:
+            # 换行符落在某个注释/字符串内部时，跳到该Token之后继续找
+            index = bisect_right(span_starts, newline) - 1
+            if index >= 0 and span_ends[index] > newline:
+                newline = text.find('\n', span_ends[index])
+            else:
+                break
+        if newline < 0 or newline + 1 >= len(text):
+            break
+        points.append(newline + 1)
+        target = newline + 1 + chunk_size
+    return points
+
+
+def analyze_parallel(analyzer: LexicalAnalyzer, text: str, workers: Optional[int] = None,
+                     chunk_size: Optional[int] = None,
+                     overlap: int = DEFAULT_CHUNK_SIZE) -> List[Token]:
+    """多进程并行词法分析，结果（Token、错误信息）与 analyzer.analyze(text) 相同
+
+    Args:
+        analyzer: 提供规则和关键字的分析器，结果同样写入 analyzer.tokens / analyzer.errors
+        text: 源文本
+        workers: 进程数，默认为CPU核数
+        chunk_size: 每块的目标字符数，默认按每个进程约4块计算（不小于 MIN_CHUNK_SIZE）
+        overlap: 每块附带的前瞻字符数；长度不超过它的Token跨块时也能正确识别
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(MIN_CHUNK_SIZE, len(text) // (workers * 4))
+
+    points = find_split_points(text, analyzer.rules, chunk_size) if workers > 1 else []
+    if not points:
+        return analyzer.analyze(text)
+
+    analyzer._reset(text)
+
+    rules = analyzer.rules
+    rule_specs = [(rule.pattern, rule.token_type, rule.priority, rule.engine) for rule in rules]
+    bounds = [0] + points + [len(text)]
+    chunks = list(zip(bounds[:-1], bounds[1:]))
+
+    # 连续的错误字符（各块中逐个给出）合并为一段，遇到下一个Token时产生
+    error_start = -1
+
+    def emit(start: int, end: int, rule_index: int):
+        nonlocal error_start
+        if rule_index < 0:
+            if error_start < 0:
+                error_start = start
+            return
+        if error_start >= 0:
+            analyzer._emit(None, text, error_start, start)
+            error_start = -1
+        analyzer._emit(rules[rule_index].token_type, text, start, end)
+
+    def relex_one(position: int) -> int:
+        """在主进程中顺序分析一个Token，返回其结束位置"""
+        for index, rule in enumerate(rules):
+            match = rule.match(text, position)
+            if match:
+                emit(position, match.end(), index)
+                return match.end()
+        emit(position, position + 1, -1)
+        return position + 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(rule_specs,)) as executor:
+        results = executor.map(
+            _lex_chunk,
+            [text[start:end + overlap] for start, end in chunks],
+            [start for start, _ in chunks],
+            [end - start for start, end in chunks],
+            [end + overlap >= len(text) for _, end in chunks],
+        )
+
+        position = 0
+        for spans, last_trusted in results:
+            starts = spans[0::3]
+            count = len(starts) - (0 if last_trusted else 1)
+            if count <= 0:
+                continue
+            chunk_end = spans[3 * count - 2]
+
+            # 同步：从真实位置 position 出发，找到本块中以它为起点的片段
+            index = bisect_left(starts, position, 0, count)
+            while position < chunk_end and (index >= count or starts[index] != position):
+                position = relex_one(position)
+                index = bisect_left(starts, position, index, count)
+
+            if position >= chunk_end:
+                continue
+            for k in range(index, count):
+                emit(spans[3 * k], spans[3 * k + 1], spans[3 * k + 2])
+            position = chunk_end
+
+    while position < len(text):
+        position = relex_one(position)
+
+    if error_start >= 0:
+        analyzer._emit(None, text, error_start, len(text))
+    analyzer._emit_eof(text)
+
+    return analyzer.tokens
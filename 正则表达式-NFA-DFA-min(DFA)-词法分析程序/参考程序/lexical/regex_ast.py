@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正则表达式语法树模块
+
+用递归下降一遍解析正则，得到语法树，并按“位置”（字符集合在正则中的每一次出现）
+计算 nullable、firstpos、lastpos 和 followpos：
+- 字符类保存为字符区间（CharClass），[a-z] 是一个区间，不逐字符展开为选择
+- 同一模式只解析一次（parse 按模式缓存），各种自动机构造共用解析结果
+- Glushkov 构造（位置自动机）由位置集合直接得到没有ε转移的NFA，
+  每个位置一个状态，另加一个开始状态
+- 语法树的结点不可变，可以作为字典的键、在多处共用
+- 遍历语法树、计算位置集合时不递归，很长的正则也不会超出递归深度
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, FrozenSet, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+# 字符区间 (起始字符, 结束字符)，两端都包含
+CharRange = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class CharClass:
+    """解析得到的字符类：排好序、互不重叠也不相邻的字符区间，negated 为 True 时取补集
+
+    单个字符、[...]、\\d 等转义和 . 都表示为字符类。
+    """
+    ranges: Tuple[CharRange, ...]
+    negated: bool = False
+
+    @property
+    def chars(self) -> FrozenSet[str]:
+        """区间中的全部字符（不含取补集），划分字符等价类时才需要"""
+        return _range_chars(self.ranges)
+
+
+@lru_cache(maxsize=1024)
+def _range_chars(ranges: Tuple[CharRange, ...]) -> FrozenSet[str]:
+    """字符区间展开为字符集合（按区间缓存，同一字符类多次使用时只展开一次）"""
+    return frozenset(chr(code) for low, high in ranges
+                     for code in range(ord(low), ord(high) + 1))
+
+
+@dataclass(frozen=True)
+class CharSet:
+    """字符集合（单个字符、字符类、. 等），匹配其中任一符号
+
+    符号为字符（或 OTHER），按字符等价类构建时为等价类编号。
+    """
+    symbols: FrozenSet[Union[str, int]]
+
+
+@dataclass(frozen=True)
+class Epsilon:
+    """空串"""
+
+
+@dataclass(frozen=True)
+class Concat:
+    """连接 left right"""
+    left: 'RegexNode'
+    right: 'RegexNode'
+
+
+@dataclass(frozen=True)
+class Alternation:
+    """选择 left | right"""
+    left: 'RegexNode'
+    right: 'RegexNode'
+
+
+@dataclass(frozen=True)
+class Repeat:
+    """重复：operator 为 '*'（零次或多次）、'+'（一次或多次）或 '?'（零次或一次）"""
+    child: 'RegexNode'
+    operator: str
+
+
+RegexNode = Union[CharClass, CharSet, Epsilon, Concat, Alternation, Repeat]
+
+
+class ParsedRegex(NamedTuple):
+    """parse() 的结果
+
+    Attributes:
+        tree: 语法树，叶结点为 CharClass 或 Epsilon
+        shortest_match: 是否含非贪婪量词（整条规则按最短匹配处理）
+    """
+    tree: RegexNode
+    shortest_match: bool
+
+
+# 区间运算在码点上进行：区间列表排好序、互不重叠也不相邻
+_Intervals = List[Tuple[int, int]]
+
+
+def _normalize(intervals: _Intervals) -> _Intervals:
+    """排序并合并重叠或相邻的区间"""
+    merged: _Intervals = []
+    for low, high in sorted(intervals):
+        if merged and low <= merged[-1][1] + 1:
+            if high > merged[-1][1]:
+                merged[-1] = (merged[-1][0], high)
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def _subtract(a: _Intervals, b: _Intervals) -> _Intervals:
+    """区间列表之差 a - b"""
+    result: _Intervals = []
+    index = 0
+    for low, high in a:
+        while index < len(b) and b[index][1] < low:
+            index += 1
+        cursor = index
+        while cursor < len(b) and b[cursor][0] <= high:
+            if b[cursor][0] > low:
+                result.append((low, b[cursor][0] - 1))
+            low = b[cursor][1] + 1
+            cursor += 1
+        if low <= high:
+            result.append((low, high))
+    return result
+
+
+def _intersect(a: _Intervals, b: _Intervals) -> _Intervals:
+    """区间列表之交"""
+    return _subtract(a, _subtract(a, b))
+
+
+def _char_class(intervals: _Intervals, negated: bool = False) -> CharClass:
+    return CharClass(tuple((chr(low), chr(high)) for low, high in _normalize(intervals)), negated)
+
+
+def _union(a: Tuple[_Intervals, bool], b: Tuple[_Intervals, bool]) -> Tuple[_Intervals, bool]:
+    """两个 (区间列表, 是否取补集) 的并集"""
+    a_ranges, a_negated = a
+    b_ranges, b_negated = b
+    if not a_negated and not b_negated:
+        return _normalize(a_ranges + b_ranges), False
+    if a_negated and b_negated:
+        return _intersect(a_ranges, b_ranges), True
+    if a_negated:
+        return _subtract(a_ranges, b_ranges), True
+    return _subtract(b_ranges, a_ranges), True
+
+
+# 转义字符类：字符 -> 区间列表（按ASCII解释），大写形式取补集
+_CLASS_ESCAPES = {
+    'd': [(ord('0'), ord('9'))],
+    'w': [(ord('0'), ord('9')), (ord('A'), ord('Z')), (ord('_'), ord('_')), (ord('a'), ord('z'))],
+    's': [(ord('\t'), ord('\r')), (ord(' '), ord(' '))],
+}
+_CHAR_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v', '0': '\0'}
+_REPEAT_PATTERN = re.compile(r'\{(\d+(,\d*)?|,\d*)\}')
+
+
+class _Parser:
+    """递归下降解析器，文法（自顶向下优先级递增）：
+
+        alternation := concat ('|' concat)*
+        concat      := repeat*
+        repeat      := atom ('*' | '+' | '?' | '{m,n}')*      量词后可再跟 '?'（非贪婪）
+        atom        := '(' alternation ')' | '[' class ']' | '\\' escape | '.' | char
+
+    连接和选择都是左结合的，与按优先级转换为后缀表达式的结果相同。
+    只有括号嵌套才递归，连接和选择在循环中处理。
+    {m}、{m,}、{m,n}、{,n} 展开为由 * 和 ? 组成的等价语法树（见 _bounded），
+    语法树中因此只有三种量词。
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.position = 0
+        self.shortest_match = False
+
+    def parse(self) -> ParsedRegex:
+        tree = self._alternation()
+        if self.position < len(self.pattern):
+            # 只有多余的 ')' 会使解析提前结束
+            raise ValueError("括号不匹配")
+        return ParsedRegex(tree, self.shortest_match)
+
+    def _peek(self) -> str:
+        return self.pattern[self.position] if self.position < len(self.pattern) else ''
+
+    def _alternation(self) -> RegexNode:
+        node = self._concat()
+        while self._peek() == '|':
+            self.position += 1
+            node = Alternation(node, self._concat())
+        return node
+
+    def _concat(self) -> RegexNode:
+        node = None
+        while self._peek() not in ('', '|', ')'):
+            item = self._repeat()
+            node = item if node is None else Concat(node, item)
+        return Epsilon() if node is None else node
+
+    def _repeat(self) -> RegexNode:
+        node = self._atom()
+        while True:
+            char = self._peek()
+            bounds = _REPEAT_PATTERN.match(self.pattern, self.position) if char == '{' else None
+            if char in ('*', '+', '?'):
+                node = Repeat(node, char)
+                self.position += 1
+            elif bounds:
+                node = _bounded(node, bounds.group(1))
+                self.position = bounds.end()
+            else:
+                break
+            if self._peek() == '?':
+                # 非贪婪量词：整条规则按最短匹配处理
+                self.shortest_match = True
+                self.position += 1
+        return node
+
+    def _atom(self) -> RegexNode:
+        pattern = self.pattern
+        char = pattern[self.position]
+        self.position += 1
+        if char == '(':
+            if pattern.startswith('?', self.position):
+                raise ValueError(f"不支持的分组语法: {pattern[self.position - 1:self.position + 2]}")
+            node = self._alternation()
+            if self._peek() != ')':
+                raise ValueError("括号不匹配")
+            self.position += 1
+            return node
+        if char == '[':
+            return self._class()
+        if char == '\\':
+            if self.position >= len(pattern):
+                raise ValueError("正则表达式不能以 '\\' 结尾")
+            escaped = pattern[self.position]
+            self.position += 1
+            if escaped.lower() in _CLASS_ESCAPES:
+                return _char_class(_CLASS_ESCAPES[escaped.lower()], escaped.isupper())
+            code = ord(_escape_char(escaped))
+            return _char_class([(code, code)])
+        if char == '.':
+            return _char_class([(ord('\n'), ord('\n'))], True)
+        if char in '*+?':
+            raise ValueError("无效的正则表达式")
+        if char in '^$':
+            raise ValueError(f"不支持锚点 '{char}'")
+        if char == '{' and _REPEAT_PATTERN.match(pattern, self.position - 1):
+            raise ValueError("无效的正则表达式")
+        return _char_class([(ord(char), ord(char))])
+
+    def _class(self) -> CharClass:
+        """解析 '[' 之后的字符类，直到对应的 ']'"""
+        pattern = self.pattern
+        i = self.position
+        negated = False
+        if i < len(pattern) and pattern[i] == '^':
+            negated = True
+            i += 1
+
+        result: Tuple[_Intervals, bool] = ([], False)
+        first = True
+        while i < len(pattern) and (pattern[i] != ']' or first):
+            first = False
+            char = pattern[i]
+            if char == '\\':
+                if i + 1 >= len(pattern):
+                    break
+                escaped = pattern[i + 1]
+                i += 2
+                if escaped.lower() in _CLASS_ESCAPES:
+                    result = _union(result, (_CLASS_ESCAPES[escaped.lower()], escaped.isupper()))
+                    continue
+                char = _escape_char(escaped)
+            else:
+                i += 1
+
+            if i + 1 < len(pattern) and pattern[i] == '-' and pattern[i + 1] != ']':
+                # 范围 a-z 保存为一个区间
+                end_char = pattern[i + 1]
+                i += 2
+                if end_char == '\\':
+                    if i >= len(pattern):
+                        break
+                    end_char = _escape_char(pattern[i])
+                    i += 1
+                if ord(end_char) < ord(char):
+                    raise ValueError(f"字符类范围错误: {char}-{end_char}")
+                result = _union(result, ([(ord(char), ord(end_char))], False))
+            else:
+                result = _union(result, ([(ord(char), ord(char))], False))
+
+        if i >= len(pattern):
+            raise ValueError("字符类缺少 ']'")
+        self.position = i + 1
+        intervals, complement = result
+        return _char_class(intervals, complement != negated)
+
+
+def _bounded(node: RegexNode, bounds: str) -> RegexNode:
+    """把 node{bounds}（bounds 形如 m、m,、m,n、,n 或 ,）展开为等价的语法树
+
+    X{m,n} = X...X (X(X...)?)?：前 m 个必须出现，其后 n-m 个依次嵌套为可选；
+    X{m,} = X...X X*。子树在展开结果中共用，每次出现各有自己的位置。
+    """
+    low, comma, high = bounds.partition(',')
+    minimum = int(low) if low else 0
+    maximum = (int(high) if high else None) if comma else minimum
+    if maximum is not None and maximum < minimum:
+        raise ValueError(f"重复次数范围错误: {{{bounds}}}")
+
+    tail: Optional[RegexNode] = None
+    if maximum is None:
+        tail = Repeat(node, '*')
+    else:
+        for _ in range(maximum - minimum):
+            tail = Repeat(node if tail is None else Concat(node, tail), '?')
+    for _ in range(minimum):
+        tail = node if tail is None else Concat(node, tail)
+    return Epsilon() if tail is None else tail
+
+
+def _escape_char(char: str) -> str:
+    """解析单字符转义"""
+    if char in _CHAR_ESCAPES:
+        return _CHAR_ESCAPES[char]
+    if char.isalnum():
+        raise ValueError(f"不支持的转义序列 '\\{char}'")
+    return char
+
+
+@lru_cache(maxsize=1024)
+def parse(pattern: str) -> ParsedRegex:
+    """解析正则表达式（结果按模式缓存，语法树不可变，可放心共用）
+
+    支持的语法：连接、| 、* + ? (含非贪婪形式)、括号分组、. 、字符类 [...] / [^...]
+    以及 \\d \\w \\s \\D \\W \\S 等转义，{m,n} 等重复次数展开为等价的语法树。
+    锚点、反向引用、环视等不支持，
+    遇到时抛出 ValueError。
+    """
+    return _Parser(pattern).parse()
+
+
+def postorder(tree: RegexNode) -> Iterator[RegexNode]:
+    """后序遍历语法树（显式栈），子结点从左到右，与后缀表达式的顺序相同"""
+    stack: List[Tuple[RegexNode, bool]] = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done or isinstance(node, (CharClass, CharSet, Epsilon)):
+            yield node
+        elif isinstance(node, Repeat):
+            stack.append((node, True))
+            stack.append((node.child, False))
+        else:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+
+
+def leaves(tree: RegexNode) -> List[CharClass]:
+    """语法树中从左到右的全部字符类"""
+    return [node for node in postorder(tree) if isinstance(node, CharClass)]
+
+
+def map_leaves(tree: RegexNode, convert: Callable[[CharClass], RegexNode]) -> RegexNode:
+    """把语法树中的每个字符类替换为 convert(字符类)，返回新的语法树"""
+    results: List[RegexNode] = []
+    for node in postorder(tree):
+        if isinstance(node, CharClass):
+            results.append(convert(node))
+        elif isinstance(node, (CharSet, Epsilon)):
+            results.append(node)
+        elif isinstance(node, Repeat):
+            results.append(Repeat(results.pop(), node.operator))
+        else:
+            right = results.pop()
+            left = results.pop()
+            results.append(type(node)(left, right))
+    return results.pop()
+
+
+class Positions:
+    """正则的位置集合
+
+    位置按在正则中从左到右出现的顺序从0编号；在语法树中共用的子树，
+    每出现一次都有各自的位置。
+
+    Attributes:
+        symbols: 各位置的字符集合
+        nullable: 整个正则能否匹配空串
+        first: 整个正则的 firstpos（匹配的第一个字符可能来自的位置）
+        last: 整个正则的 lastpos（匹配的最后一个字符可能来自的位置）
+        follow: 各位置的 followpos（紧随其后的字符可能来自的位置）
+    """
+
+    def __init__(self, tree: RegexNode):
+        self.symbols: List[FrozenSet[Union[str, int]]] = []
+        self.follow: List[Set[int]] = []
+        self.nullable, self.first, self.last = self._compute(tree)
+
+    def _compute(self, tree: RegexNode) -> Tuple[bool, Set[int], Set[int]]:
+        """后序遍历语法树，返回 (nullable, firstpos, lastpos)，同时填写 followpos
+
+        语法树的叶结点须为 CharSet 或 Epsilon（字符类先由 map_leaves 换算为符号集合）。
+        """
+        follow = self.follow
+        results: List[Tuple[bool, Set[int], Set[int]]] = []
+        for node in postorder(tree):
+            if isinstance(node, CharSet):
+                position = len(self.symbols)
+                self.symbols.append(node.symbols)
+                follow.append(set())
+                results.append((False, {position}, {position}))
+            elif isinstance(node, Epsilon):
+                results.append((True, set(), set()))
+            elif isinstance(node, Repeat):
+                nullable, first, last = results.pop()
+                if node.operator in '*+':
+                    for position in last:
+                        follow[position] |= first
+                results.append((nullable or node.operator in '*?', first, last))
+            elif isinstance(node, CharClass):
+                raise TypeError("计算位置集合前需把字符类换算为符号集合")
+            else:
+                right_nullable, right_first, right_last = results.pop()
+                left_nullable, left_first, left_last = results.pop()
+                if isinstance(node, Alternation):
+                    results.append((left_nullable or right_nullable,
+                                    left_first | right_first, left_last | right_last))
+                else:
+                    for position in left_last:
+                        follow[position] |= right_first
+                    results.append((
+                        left_nullable and right_nullable,
+                        left_first | right_first if left_nullable else left_first,
+                        left_last | right_last if right_nullable else right_last,
+                    ))
+        return results.pop()
+
+    def __len__(self) -> int:
+        return len(self.symbols)
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表驱动扫描器模块
+
+把各条词法规则的最小化DFA合并（乘积构造）为一个整数转移表，
+按“最长匹配 + 规则优先级裁决”扫描输入：
+- 每个字符只查一次表，不存在正则回溯
+- 记录“从(状态, 位置)出发不可能再到达接受状态”的失败对，
+  保证回退重扫时总耗时仍与输入长度成线性关系
+- 关键字以不区分大小写的字典树并入乘积构造，标识符规则接受的串恰为关键字时
+  直接接受为关键字类型，无需在识别后再查关键字表
+- 转移表的列为各规则字符等价类的公共细分，扫描时先查“字符 -> 等价类”表
+- ByteScanner 把转移表改写为在 UTF-8 字节上转移，输入无需先解码为字符串
+"""
+
+from collections import deque
+from typing import List, Dict, Tuple, Optional, Iterator
+
+from .automata import DFA
+from .charset import CharClasses
+from .token import TokenType
+
+
+class DFAScanner:
+    """由多条规则的DFA合并而成的扫描器
+
+    转移表 table[state][column] 给出下一状态，-1 表示死状态，列为字符等价类编号；
+    columns 把字符映射到列，未出现的字符使用 other_column。
+    accept_rule[state] 给出该状态接受的规则下标，-1 表示非接受状态。
+    规则下标越小优先级越高（调用方按优先级降序传入规则）。
+    各规则的DFA在各自的字符等价类上转移（DFA.char_classes），
+    char_classes 必须是它们的公共细分：每个列对应各规则中的一个等价类。
+
+    给出 keywords（小写关键字 -> 类型）和 keyword_rule（标识符规则的下标）时，
+    该规则胜出且匹配的串（不区分大小写）是关键字的接受状态改为接受关键字，
+    关键字类型追加在 token_types 之后，accept_rule 中的下标指向它们。
+    此时关键字中的字符（两种大小写）在 char_classes 中必须各自单独成类。
+    """
+
+    DEAD = -1
+
+    def __init__(self, dfas: List[DFA], token_types: List[TokenType], char_classes: CharClasses,
+                 keywords: Optional[Dict[str, TokenType]] = None, keyword_rule: int = -1):
+        self.token_types = list(token_types)
+        self.char_classes = char_classes
+        self.columns: Dict[str, int] = dict(char_classes.class_of)
+        self.other_column = char_classes.other_class
+        self.table: List[List[int]] = []
+        self.accept_rule: List[int] = []
+        self._build(dfas, keywords or {}, keyword_rule)
+
+    def _build_keyword_trie(self, keywords: Dict[str, TokenType]) -> Tuple[List[Dict[int, int]], Dict[int, int]]:
+        """构建不区分大小写的关键字字典树
+
+        Returns:
+            (各节点的转移 {等价类: 子节点}, 关键字结束节点 -> token_types 中的下标)
+        """
+        trie: List[Dict[int, int]] = [{}]
+        ends: Dict[int, int] = {}
+        type_index: Dict[TokenType, int] = {}
+        for keyword, token_type in keywords.items():
+            # 与 LexicalAnalyzer 一致：标识符转小写后查表，只有小写关键字可能被识别
+            if not keyword or keyword != keyword.lower():
+                continue
+            node = 0
+            for char in keyword:
+                child = trie[node].get(self.char_classes.classify(char))
+                if child is None:
+                    child = len(trie)
+                    trie.append({})
+                    for case in {char.lower(), char.upper()}:
+                        class_id = self.char_classes.classify(case)
+                        if len(self.char_classes.members[class_id]) != 1:
+                            raise ValueError(f"关键字字符 '{case}' 未单独成为等价类")
+                        trie[node][class_id] = child
+                node = child
+            if node not in ends:
+                if token_type not in type_index:
+                    type_index[token_type] = len(self.token_types)
+                    self.token_types.append(token_type)
+                ends[node] = type_index[token_type]
+        return trie, ends
+
+    def _build(self, dfas: List[DFA], keywords: Dict[str, TokenType], keyword_rule: int):
+        """乘积构造：合并所有规则的DFA（及关键字字典树）"""
+        trie, keyword_ends = self._build_keyword_trie(keywords) if keyword_rule >= 0 else ([{}], {})
+        # 字典树作为下标为 len(dfas) 的附加分量，总在乘积状态的最后
+        trie_index = len(dfas)
+
+        # 每条规则：列 -> 规则内的等价类（取列中任一字符，“其他字符”列对应规则的“其他字符”类）
+        representatives = [next(iter(members), None) for members in self.char_classes.members]
+        local_symbols = []
+        for dfa in dfas:
+            local = dfa.char_classes
+            local_symbols.append([
+                local.classify(char) if char is not None else local.other_class
+                for char in representatives
+            ])
+
+        # 乘积状态只记录仍存活的分量：((规则下标, DFA状态), ...)
+        start = tuple(
+            (index, dfa.start_state) for index, dfa in enumerate(dfas)
+            if dfa.start_state is not None
+        )
+        if keyword_ends:
+            start += ((trie_index, 0),)
+        state_ids = {start: 0}
+        queue = deque([start])
+        self.table = []
+        self.accept_rule = []
+
+        while queue:
+            current = queue.popleft()
+
+            accepted = [index for index, state in current
+                        if index < trie_index and state in dfas[index].accept_states]
+            rule = min(accepted) if accepted else self.DEAD
+            if rule >= 0 and rule == keyword_rule and current[-1][0] == trie_index:
+                rule = keyword_ends.get(current[-1][1], rule)
+            self.accept_rule.append(rule)
+
+            row = []
+            for column in range(len(representatives)):
+                target = []
+                for index, state in current:
+                    if index == trie_index:
+                        next_state = trie[state].get(column)
+                    else:
+                        next_state = dfas[index].get_transition(state, local_symbols[index][column])
+                    if next_state is not None:
+                        target.append((index, next_state))
+                if not target:
+                    row.append(self.DEAD)
+                    continue
+                target = tuple(target)
+                if target not in state_ids:
+                    state_ids[target] = len(state_ids)
+                    queue.append(target)
+                row.append(state_ids[target])
+            self.table.append(row)
+
+    @property
+    def state_count(self) -> int:
+        """合并后的状态数"""
+        return len(self.table)
+
+    def to_dict(self) -> dict:
+        """导出转移表等扫描所需的数据（可JSON序列化），见 from_dict"""
+        return {
+            'token_types': [token_type.name for token_type in self.token_types],
+            'char_classes': [''.join(sorted(chars)) for chars in self.char_classes.members],
+            'table': [target for row in self.table for target in row],
+            'accept_rule': self.accept_rule,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DFAScanner':
+        """由 to_dict 导出的数据直接恢复扫描器，不再构造自动机"""
+        scanner = cls.__new__(cls)
+        scanner.token_types = [TokenType[name] for name in data['token_types']]
+        scanner.char_classes = CharClasses.from_members(data['char_classes'])
+        scanner.columns = dict(scanner.char_classes.class_of)
+        scanner.other_column = scanner.char_classes.other_class
+        width = scanner.char_classes.count
+        table = data['table']
+        scanner.table = [table[start:start + width] for start in range(0, len(table), width)]
+        scanner.accept_rule = list(data['accept_rule'])
+        return scanner
+
+    def scan(self, text: str, final: bool = True) -> Iterator[Tuple[int, int, int]]:
+        """扫描文本，依次产生 (起始位置, 结束位置, 规则下标)
+
+        连续无法匹配任何规则的字符合并为一个规则下标为 -1 的片段：
+        开始状态在其上没有转移的字符不可能开始Token，直接跳过而不再逐个尝试。
+        空匹配不计入（开始状态即使是接受状态也不产生Token）。
+
+        final 为 False 表示 text 只是输入的一个前缀（流式读取的缓冲区）：
+        某个Token的扫描走到 text 末尾时自动机仍未进入死状态，说明后续输入
+        可能改变结果，此时停止产生，由调用方补充输入后从最后产生的结束位置继续。
+        这时一段错误字符可能被缓冲区边界分成相邻的两个片段，由调用方合并。
+        """
+        table = self.table
+        accept_rule = self.accept_rule
+        columns = self.columns
+        other = self.other_column
+        start_row = table[0]
+        state_count = len(table)
+        length = len(text)
+        # 失败对 position * state_count + state：从该处继续扫描不会再遇到接受状态
+        failed = set()
+        # 当前错误字符段的起始位置，-1 表示不在错误段中
+        error_start = -1
+
+        position = 0
+        while position < length:
+            state = 0
+            index = position
+            last_end = -1
+            last_rule = -1
+            last_state = 0
+
+            while index < length:
+                state = table[state][columns.get(text[index], other)]
+                if state < 0:
+                    break
+                index += 1
+                if failed and index * state_count + state in failed:
+                    break
+                rule = accept_rule[state]
+                if rule >= 0:
+                    last_end = index
+                    last_rule = rule
+                    last_state = state
+            else:
+                if not final:
+                    if error_start >= 0:
+                        yield error_start, position, -1
+                    return
+
+            # 越过最后一次接受位置之后经过的 (状态, 位置) 全部记为失败
+            if last_rule >= 0:
+                back_state, back_index = last_state, last_end
+            else:
+                back_state, back_index = 0, position
+            while back_index < index:
+                back_state = table[back_state][columns.get(text[back_index], other)]
+                back_index += 1
+                failed.add(back_index * state_count + back_state)
+
+            if last_rule < 0:
+                if error_start < 0:
+                    error_start = position
+                position += 1
+                while position < length and start_row[columns.get(text[position], other)] < 0:
+                    position += 1
+            else:
+                if error_start >= 0:
+                    yield error_start, position, -1
+                    error_start = -1
+                yield position, last_end, last_rule
+                position = last_end
+
+        if error_start >= 0:
+            yield error_start, length, -1
+
+    def match(self, text: str, position: int) -> Optional[Tuple[int, TokenType]]:
+        """在指定位置做一次最长匹配，返回 (结束位置, Token类型)，失败返回None"""
+        state = 0
+        result = None
+        for index in range(position, len(text)):
+            state = self.table[state][self.columns.get(text[index], self.other_column)]
+            if state < 0:
+                break
+            rule = self.accept_rule[state]
+            if rule >= 0:
+                result = (index + 1, self.token_types[rule])
+        return result
+
+
+class ByteScanner:
+    """在 UTF-8 字节串上扫描的表驱动扫描器（由 DFAScanner 改写而来）
+
+    要求规则和关键字中显式出现的字符都是ASCII，非ASCII字符全部属于“其他字符”类。
+    每个字节先查256项的“字节 -> 列”表：ASCII字节对应原来的列，多字节字符的
+    首字节对应“其他字符”列，后续字节（0x80-0xBF）对应新增的“续字节”列。
+    开始状态在续字节上没有转移，其余状态在续字节上转移到自身，因此一个多字节字符
+    恰好相当于一次“其他字符”转移，Token的边界总在字符边界上，结果与
+    DFAScanner 在解码后的文本上扫描相同（位置换为字节偏移）。
+    """
+
+    DEAD = -1
+
+    def __init__(self, scanner: DFAScanner):
+        if any(ord(char) > 0x7F for char in scanner.columns):
+            raise ValueError("规则中有非ASCII字符，无法在UTF-8字节上扫描")
+        self.token_types = scanner.token_types
+        continuation = len(scanner.table[0])
+        self.table: List[List[int]] = [row + [state] for state, row in enumerate(scanner.table)]
+        self.table[0][continuation] = self.DEAD
+        self.accept_rule: List[int] = list(scanner.accept_rule)
+        if any(0 in row for row in scanner.table):
+            # 扫描中途可能回到开始状态：另设一个副本承担这些转移，副本在续字节上转移到自身
+            copy = len(self.table)
+            self.table.append(scanner.table[0] + [copy])
+            self.accept_rule.append(self.accept_rule[0])
+            for row in self.table:
+                for column in range(continuation):
+                    if row[column] == 0:
+                        row[column] = copy
+        other = scanner.other_column
+        self.byte_columns: List[int] = [
+            scanner.columns.get(chr(byte), other) if byte < 0x80
+            else continuation if byte < 0xC0 else other
+            for byte in range(256)
+        ]
+
+    @property
+    def state_count(self) -> int:
+        """转移表的状态数"""
+        return len(self.table)
+
+    def scan(self, data) -> Iterator[Tuple[int, int, int]]:
+        """扫描UTF-8字节串（bytes、bytearray、memoryview 或 mmap），
+        依次产生 (起始字节位置, 结束字节位置, 规则下标)
+
+        与 DFAScanner.scan 相同：按最长匹配、失败对记忆保证线性时间，
+        连续无法匹配的字符合并为一个规则下标为 -1 的片段。
+        """
+        table = self.table
+        accept_rule = self.accept_rule
+        columns = self.byte_columns
+        start_row = table[0]
+        state_count = len(table)
+        length = len(data)
+        # 失败对 position * state_count + state：从该处继续扫描不会再遇到接受状态
+        failed = set()
+        # 当前错误字符段的起始位置，-1 表示不在错误段中
+        error_start = -1
+
+        position = 0
+        while position < length:
+            state = 0
+            index = position
+            last_end = -1
+            last_rule = -1
+            last_state = 0
+
+            while index < length:
+                state = table[state][columns[data[index]]]
+                if state < 0:
+                    break
+                index += 1
+                if failed and index * state_count + state in failed:
+                    break
+                rule = accept_rule[state]
+                if rule >= 0:
+                    last_end = index
+                    last_rule = rule
+                    last_state = state
+
+            # 越过最后一次接受位置之后经过的 (状态, 位置) 全部记为失败
+            if last_rule >= 0:
+                back_state, back_index = last_state, last_end
+            else:
+                back_state, back_index = 0, position
+            while back_index < index:
+                back_state = table[back_state][columns[data[back_index]]]
+                back_index += 1
+                failed.add(back_index * state_count + back_state)
+
+            if last_rule < 0:
+                if error_start < 0:
+                    error_start = position
+                position += 1
+                while position < length and start_row[columns[data[position]]] < 0:
+                    position += 1
+            else:
+                if error_start >= 0:
+                    yield error_start, position, -1
+                    error_start = -1
+                yield position, last_end, last_rule
+                position = last_end
+
+        if error_start >= 0:
+            yield error_start, length, -1
@@ -8,8 +8,12 @@ Token定义模块
 """
 
 import enum
+from array import array
+from collections import Counter
 from dataclasses import dataclass
-from typing import Optional, Any, Tuple
+from typing import Optional, Any, Tuple, List, Dict, Iterator, Union
+
+from .lines import LineIndex, make_line_index
 
 
 class TokenType(enum.Enum):
@@ -283,6 +287,172 @@ class Token:
         return end_line, end_column
 
 
+def source_slice(source, start: int, end: int) -> str:
+    """源文本 [start, end) 的内容；源文本为 UTF-8 字节串时解码为字符串"""
+    value = source[start:end]
+    if isinstance(value, str):
+        return value
+    return str(value, 'utf-8', 'replace')
+
+
+class SourceToken:
+    """引用源文本的Token（零拷贝）
+    
+    只保存类型和在源文本中的区间 [start, end)，多个Token共用同一份源文本：
+    value 在访问时才从源文本切片，行号和列号在访问时才由行首偏移索引换算。
+    只关心Token类型的后续阶段（如语法分析）因此不会为每个Token分配字符串。
+    除不能修改外，用法与 Token 相同，与值、位置相同的 Token 比较相等。
+    源文本也可以是 UTF-8 字节串（start、end 为字节偏移），value 在访问时才解码。
+    
+    Attributes:
+        type: Token类型
+        source: 源文本（str 或 UTF-8 字节串）
+        start: 起始偏移
+        end: 结束偏移
+        line_index: 源文本的行首偏移索引
+    """
+    
+    __slots__ = ('type', 'source', 'start', 'end', 'line_index')
+    
+    def __init__(self, token_type: TokenType, source: str, start: int, end: int,
+                 line_index: LineIndex):
+        self.type = token_type
+        self.source = source
+        self.start = start
+        self.end = end
+        self.line_index = line_index
+    
+    @property
+    def value(self) -> str:
+        """Token的字符串值（每次访问时从源文本切片，字节串源文本同时解码）"""
+        return source_slice(self.source, self.start, self.end)
+    
+    @property
+    def line(self) -> int:
+        """所在行号 (从1开始)"""
+        return self.line_index.line_of(self.start)
+    
+    @property
+    def column(self) -> int:
+        """所在列号 (从1开始)"""
+        return self.line_index.position(self.start)[1]
+    
+    @property
+    def length(self) -> int:
+        """Token长度（字符数）"""
+        if isinstance(self.source, str):
+            return self.end - self.start
+        return len(self.value)
+    
+    @property
+    def metadata(self) -> dict:
+        """附加元数据（零拷贝Token不保存元数据，总为空字典）"""
+        return {}
+    
+    def to_token(self) -> Token:
+        """生成内容相同的 Token 对象"""
+        line, column = self.line_index.position(self.start)
+        return Token(self.type, self.value, line, column)
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (Token, SourceToken)):
+            return NotImplemented
+        return (self.type == other.type and self.value == other.value
+                and self.line == other.line and self.column == other.column)
+    
+    __hash__ = None
+    
+    __str__ = Token.__str__
+    __repr__ = Token.__repr__
+    is_keyword = Token.is_keyword
+    is_operator = Token.is_operator
+    is_literal = Token.is_literal
+    is_delimiter = Token.is_delimiter
+    is_whitespace = Token.is_whitespace
+    get_end_position = Token.get_end_position
+
+
+class TokenBuffer:
+    """紧凑的Token序列（列式存储）
+    
+    每个Token只保存3个整数：类型编号、在源文本中的起始偏移、长度，
+    分别存放在 array 列中，不创建 Token 对象；Token的值按需从源文本切片，
+    行号和列号按需由行首偏移索引（LineIndex）换算。
+    按下标访问或迭代时才生成引用源文本的 SourceToken 视图，因此可以当作只读的
+    List[Token] 使用；只需要类型时用 iter_types() 或 type_at()，不生成任何对象。
+    
+    Attributes:
+        source: 源文本（str 或 UTF-8 字节串，后者的偏移和长度按字节计）
+        line_index: 源文本的行首偏移索引
+        types: 类型编号列（TokenBuffer.TYPES 的下标）
+        starts: 起始偏移列
+        lengths: 长度列
+    """
+    
+    TYPES: List[TokenType] = list(TokenType)
+    TYPE_IDS: Dict[TokenType, int] = {token_type: index for index, token_type in enumerate(TYPES)}
+    
+    def __init__(self, source: str, line_index: Optional[LineIndex] = None):
+        self.source = source
+        self.line_index = line_index if line_index is not None else make_line_index(source)
+        self.types = array('H')
+        self.starts = array('q')
+        self.lengths = array('I')
+    
+    def append(self, token_type: TokenType, start: int, length: int):
+        """追加一个Token"""
+        self.types.append(self.TYPE_IDS[token_type])
+        self.starts.append(start)
+        self.lengths.append(length)
+    
+    def __len__(self) -> int:
+        return len(self.types)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[SourceToken, List[SourceToken]]:
+        if isinstance(index, slice):
+            return [self._view(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TokenBuffer index out of range")
+        return self._view(index)
+    
+    def __iter__(self) -> Iterator[SourceToken]:
+        for index in range(len(self)):
+            yield self._view(index)
+    
+    def _view(self, index: int) -> SourceToken:
+        """为第 index 个Token生成引用源文本的 SourceToken（不切片、不换算位置）"""
+        start = self.starts[index]
+        return SourceToken(self.TYPES[self.types[index]], self.source,
+                           start, start + self.lengths[index], self.line_index)
+    
+    def iter_types(self) -> Iterator[TokenType]:
+        """依次产生各Token的类型"""
+        return map(self.TYPES.__getitem__, self.types)
+    
+    def type_at(self, index: int) -> TokenType:
+        """第 index 个Token的类型"""
+        return self.TYPES[self.types[index]]
+    
+    def value_at(self, index: int) -> str:
+        """第 index 个Token的值（从源文本切片）"""
+        start = self.starts[index]
+        return source_slice(self.source, start, start + self.lengths[index])
+    
+    def position_at(self, index: int) -> Tuple[int, int]:
+        """第 index 个Token的 (行号, 列号)"""
+        return self.line_index.position(self.starts[index])
+    
+    def count(self, token_type: TokenType) -> int:
+        """某类型Token的个数"""
+        return self.types.count(self.TYPE_IDS[token_type])
+    
+    def type_counts(self) -> Dict[TokenType, int]:
+        """按类型统计Token个数（直接在类型列上计数）"""
+        return {self.TYPES[type_id]: count for type_id, count in Counter(self.types).items()}
+
+
 class TokenCategory(enum.Enum):
     """Token分类
     
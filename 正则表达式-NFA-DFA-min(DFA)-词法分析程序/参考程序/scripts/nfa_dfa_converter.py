@@ -8,9 +8,12 @@ NFA到DFA转换器 - Good Enough Compiler
 
 import graphviz
 import io
+import time
+from collections import deque
 from PIL import Image
-from typing import List, Dict, Set, Tuple, Optional
+from typing import List, Dict, Set, FrozenSet, Tuple, Optional
 from .lexical_analyzer import State, NFA, DFA, TokenType
+from lexical.regex_ast import CharClass, Concat, Epsilon, Repeat, parse, postorder
 
 class RegexToNFA:
     """正则表达式到NFA转换器"""
@@ -20,54 +23,16 @@ class RegexToNFA:
     
     def convert(self, regex: str, token_type: TokenType = None) -> NFA:
         """将正则表达式转换为NFA"""
-        # 定义操作符优先级
-        precedence = {'|': 1, '.': 2, '*': 3, '+': 3, '?': 3}
-        operators = {'|', '.', '*', '+', '?', '(', ')'}
-        
-        def add_concat_operator(regex):
-            """在需要的位置添加连接操作符('.')"""
-            output = []
-            for i in range(len(regex)):
-                output.append(regex[i])
-                if i+1 < len(regex) and regex[i] not in '(|' and regex[i+1] not in ')|*+?':
-                    output.append('.')
-            return ''.join(output)
-        
-        def to_postfix(regex):
-            """使用调度场算法将中缀表达式转换为后缀表达式"""
-            output = []
-            operator_stack = []
-            
-            for token in regex:
-                if token not in operators:  # 普通字符
-                    output.append(token)
-                elif token == '(':  # 左括号
-                    operator_stack.append(token)
-                elif token == ')':  # 右括号
-                    while operator_stack and operator_stack[-1] != '(':
-                        output.append(operator_stack.pop())
-                    operator_stack.pop()  # 弹出左括号
-                else:  # 其他操作符
-                    while (operator_stack and operator_stack[-1] != '(' and 
-                           precedence.get(operator_stack[-1], 0) >= precedence.get(token, 0)):
-                        output.append(operator_stack.pop())
-                    operator_stack.append(token)
-            
-            # 将剩余操作符添加到输出
-            while operator_stack:
-                output.append(operator_stack.pop())
-                
-            return output
-        
-        def basic_nfa(symbol):
-            """为单个符号创建基本NFA"""
+        def basic_nfa(symbols):
+            """为一组符号创建基本NFA（每个符号一条转移）"""
             nfa = NFA()
             start = nfa.create_state()
             end = nfa.create_state()
             
             nfa.set_start(start)
             nfa.add_end(end, token_type)
-            nfa.add_transition(start, symbol, end)
+            for symbol in symbols:
+                nfa.add_transition(start, symbol, end)
             
             return nfa
         
@@ -226,56 +191,45 @@ class RegexToNFA:
             
             return result
         
-        def build_nfa(postfix):
-            """根据后缀表达式构建NFA"""
+        def build_nfa(tree):
+            """后序遍历语法树构建NFA（顺序与按后缀表达式构建相同）"""
             stack = []
             
-            for token in postfix:
-                if token == '*':
-                    if not stack:
-                        raise ValueError("无效的表达式: * 操作符没有操作数")
-                    nfa = stack.pop()
-                    stack.append(kleene_star_nfa(nfa))
-                elif token == '+':
-                    if not stack:
-                        raise ValueError("无效的表达式: + 操作符没有操作数")
+            for node in postorder(tree):
+                if isinstance(node, CharClass):
+                    if node.negated:
+                        raise ValueError("不支持取补集的字符类（如 . 和 [^...]）")
+                    stack.append(basic_nfa(sorted(node.chars)))
+                elif isinstance(node, Epsilon):
+                    stack.append(basic_nfa(['ε']))
+                elif isinstance(node, Repeat):
                     nfa = stack.pop()
-                    stack.append(plus_nfa(nfa))
-                elif token == '?':
-                    if not stack:
-                        raise ValueError("无效的表达式: ? 操作符没有操作数")
-                    nfa = stack.pop()
-                    stack.append(question_nfa(nfa))
-                elif token == '.':
-                    if len(stack) < 2:
-                        raise ValueError("无效的表达式: . 操作符需要两个操作数")
-                    nfa2 = stack.pop()
-                    nfa1 = stack.pop()
-                    stack.append(concat_nfa(nfa1, nfa2))
-                elif token == '|':
-                    if len(stack) < 2:
-                        raise ValueError("无效的表达式: | 操作符需要两个操作数")
+                    if node.operator == '*':
+                        stack.append(kleene_star_nfa(nfa))
+                    elif node.operator == '+':
+                        stack.append(plus_nfa(nfa))
+                    else:
+                        stack.append(question_nfa(nfa))
+                else:
                     nfa2 = stack.pop()
                     nfa1 = stack.pop()
-                    stack.append(union_nfa(nfa1, nfa2))
-                else:
-                    stack.append(basic_nfa(token))
+                    if isinstance(node, Concat):
+                        stack.append(concat_nfa(nfa1, nfa2))
+                    else:
+                        stack.append(union_nfa(nfa1, nfa2))
             
-            if len(stack) != 1:
-                raise ValueError("无效的表达式")
-                
-            return stack[0]
+            return stack.pop()
         
-        # 处理正则表达式并构建NFA
-        regex_with_concat = add_concat_operator(regex)
-        postfix = to_postfix(regex_with_concat)
-        return build_nfa(postfix)
+        # 解析正则表达式（语法错误时抛出 ValueError）并构建NFA
+        return build_nfa(parse(regex).tree)
 
 class NFAToDFA:
     """NFA到DFA转换器（子集构造法）"""
     
     def __init__(self):
         self.state_counter = 0
+        # 最近一次转换的统计：DFA状态数、转移数、耗时（秒）
+        self.stats: Dict[str, float] = {}
     
     def epsilon_closure(self, states: Set[State]) -> Set[State]:
         """计算状态集合的ε闭包"""
@@ -300,12 +254,17 @@ class NFAToDFA:
         return result
     
     def convert(self, nfa: NFA) -> DFA:
-        """将NFA转换为DFA"""
+        """将NFA转换为DFA
+        
+        状态集合以 frozenset 为键索引已有的DFA状态（O(1)查找），
+        字符串ID只在创建新状态时生成一次，工作列表使用 deque。
+        """
+        started = time.perf_counter()
         dfa = DFA()
         dfa.alphabet = nfa.alphabet.copy()
         
         # 计算初始状态的ε闭包
-        start_closure = self.epsilon_closure({nfa.start_state})
+        start_closure = frozenset(self.epsilon_closure({nfa.start_state}))
         start_state_id = self._state_set_to_id(start_closure)
         
         dfa.start_state = start_state_id
@@ -317,29 +276,27 @@ class NFAToDFA:
                 dfa.accept_states[start_state_id] = state.token_type
                 break
         
-        # 工作列表
-        worklist = [start_closure]
-        processed = {start_state_id}
+        # 工作列表；状态集合 -> DFA状态ID
+        worklist = deque([start_closure])
+        state_ids: Dict[FrozenSet[State], str] = {start_closure: start_state_id}
         
         while worklist:
-            current_states = worklist.pop(0)
-            current_id = self._state_set_to_id(current_states)
+            current_states = worklist.popleft()
+            current_id = state_ids[current_states]
             
             # 对每个输入符号
             for symbol in dfa.alphabet:
                 # 计算转移
                 next_states = self.move(current_states, symbol)
                 if next_states:
-                    next_closure = self.epsilon_closure(next_states)
-                    next_id = self._state_set_to_id(next_closure)
-                    
-                    # 添加转移
-                    dfa.transitions[(current_id, symbol)] = next_id
+                    next_closure = frozenset(self.epsilon_closure(next_states))
+                    next_id = state_ids.get(next_closure)
                     
                     # 如果是新状态，添加到DFA
-                    if next_id not in processed:
+                    if next_id is None:
+                        next_id = self._state_set_to_id(next_closure)
+                        state_ids[next_closure] = next_id
                         dfa.states[next_id] = next_closure
-                        processed.add(next_id)
                         worklist.append(next_closure)
                         
                         # 检查是否为接受状态
@@ -347,7 +304,15 @@ class NFAToDFA:
                             if state.is_end:
                                 dfa.accept_states[next_id] = state.token_type
                                 break
+                    
+                    # 添加转移
+                    dfa.transitions[(current_id, symbol)] = next_id
         
+        self.stats = {
+            'states': len(dfa.states),
+            'transitions': len(dfa.transitions),
+            'time': time.perf_counter() - started,
+        }
         return dfa
     
     def _state_set_to_id(self, states: Set[State]) -> str:
@@ -356,120 +321,103 @@ class NFAToDFA:
         return '{' + ','.join(map(str, state_ids)) + '}'
 
 class DFAMinimizer:
-    """DFA最小化器"""
+    """DFA最小化器（Hopcroft分割细化算法）"""
     
     def minimize(self, dfa: DFA) -> DFA:
         """最小化DFA"""
-        # 初始分割：接受状态和非接受状态
-        accept_states = set(dfa.accept_states.keys())
-        non_accept_states = set(dfa.states.keys()) - accept_states
-        
-        partitions = []
-        if non_accept_states:
-            partitions.append(non_accept_states)
-        if accept_states:
-            partitions.append(accept_states)
-        
-        # 迭代细化分割
-        changed = True
-        while changed:
-            changed = False
-            new_partitions = []
-            
-            for partition in partitions:
-                # 尝试分割当前分区
-                sub_partitions = self._split_partition(partition, partitions, dfa)
-                if len(sub_partitions) > 1:
-                    changed = True
-                new_partitions.extend(sub_partitions)
-            
-            partitions = new_partitions
+        partitions = self._refine(dfa)
         
         # 构建最小化的DFA
         return self._build_minimized_dfa(dfa, partitions)
     
-    def _split_partition(self, partition: Set[str], all_partitions: List[Set[str]], dfa: DFA) -> List[Set[str]]:
-        """分割分区"""
-        if len(partition) <= 1:
-            return [partition]
+    def _refine(self, dfa: DFA) -> List[Set[str]]:
+        """Hopcroft算法：返回等价状态的分区列表，时间复杂度 O(|Σ|·n·log n)
         
-        # 选择分区中的第一个状态作为代表
-        representative = next(iter(partition))
-        groups = {representative: {representative}}
+        缺失的转移视为指向单独成块的虚拟死状态（None）；
+        接受状态按Token类型分块，不同类型的接受状态不会合并。
+        """
+        # 初始分割：非接受状态一块，接受状态按Token类型分块
+        groups = {}
+        for state in dfa.states:
+            key = (state in dfa.accept_states, dfa.accept_states.get(state))
+            groups.setdefault(key, set()).add(state)
+        blocks = list(groups.values()) + [{None}]
+        block_of = {state: i for i, block in enumerate(blocks) for state in block}
         
-        for state in partition:
-            if state == representative:
-                continue
-            
-            # 检查状态是否与代表状态等价
-            equivalent = True
-            for symbol in dfa.alphabet:
-                rep_next = dfa.transitions.get((representative, symbol))
-                state_next = dfa.transitions.get((state, symbol))
-                
-                # 找到下一个状态所在的分区
-                rep_partition = self._find_partition(rep_next, all_partitions) if rep_next else None
-                state_partition = self._find_partition(state_next, all_partitions) if state_next else None
+        # 逆转移索引：inverse[符号][目标状态] = 经该符号转移到目标状态的状态列表
+        inverse = {}
+        for symbol in dfa.alphabet:
+            sources = {None: [None]}
+            for state in dfa.states:
+                sources.setdefault(dfa.transitions.get((state, symbol)), []).append(state)
+            inverse[symbol] = sources
+        
+        worklist = list(range(len(blocks)))
+        while worklist:
+            splitter = list(blocks[worklist.pop()])
+            for sources in inverse.values():
+                # 按所在块收集能转移进 splitter 的状态
+                touched = {}
+                for target in splitter:
+                    for state in sources.get(target, ()):
+                        touched.setdefault(block_of[state], set()).add(state)
                 
-                if rep_partition != state_partition:
-                    equivalent = False
-                    break
-            
-            if equivalent:
-                groups[representative].add(state)
-            else:
-                # 创建新组
-                groups[state] = {state}
+                for i, inside in touched.items():
+                    if len(inside) == len(blocks[i]):
+                        continue
+                    outside = blocks[i] - inside
+                    # 较小的一半成为新块并加入工作表
+                    if len(inside) > len(outside):
+                        inside, outside = outside, inside
+                    blocks[i] = outside
+                    blocks.append(inside)
+                    for state in inside:
+                        block_of[state] = len(blocks) - 1
+                    worklist.append(len(blocks) - 1)
         
-        return list(groups.values())
-    
-    def _find_partition(self, state: str, partitions: List[Set[str]]) -> Optional[Set[str]]:
-        """找到状态所在的分区"""
-        for partition in partitions:
-            if state in partition:
-                return partition
-        return None
+        return [block for block in blocks if None not in block]
     
     def _build_minimized_dfa(self, original_dfa: DFA, partitions: List[Set[str]]) -> DFA:
         """根据分区构建最小化的DFA"""
         minimized_dfa = DFA()
         minimized_dfa.alphabet = original_dfa.alphabet.copy()
+        symbols = sorted(original_dfa.alphabet)
+        block_of = {state: i for i, partition in enumerate(partitions) for state in partition}
+        
+        # 按从起始状态出发的广度优先顺序编号，起始状态为 q0
+        order = []
+        if original_dfa.start_state in block_of:
+            order.append(block_of[original_dfa.start_state])
+        seen = set(order)
+        for i in order:
+            representative = next(iter(partitions[i]))
+            for symbol in symbols:
+                next_state = original_dfa.transitions.get((representative, symbol))
+                if next_state is not None and block_of[next_state] not in seen:
+                    seen.add(block_of[next_state])
+                    order.append(block_of[next_state])
+        order.extend(i for i in range(len(partitions)) if i not in seen)
+        partition_to_state = {i: f"q{number}" for number, i in enumerate(order)}
         
-        # 为每个分区创建新状态
-        partition_to_state = {}
-        for i, partition in enumerate(partitions):
-            new_state_id = f"q{i}"
-            partition_to_state[frozenset(partition)] = new_state_id
+        for i in order:
+            partition = partitions[i]
+            new_state_id = partition_to_state[i]
             minimized_dfa.states[new_state_id] = partition
+            representative = next(iter(partition))
             
-            # 检查是否为接受状态
-            for state in partition:
-                if state in original_dfa.accept_states:
-                    minimized_dfa.accept_states[new_state_id] = original_dfa.accept_states[state]
-                    break
+            # 检查是否为接受状态（同一分区内的状态Token类型相同）
+            if representative in original_dfa.accept_states:
+                minimized_dfa.accept_states[new_state_id] = original_dfa.accept_states[representative]
             
             # 检查是否为起始状态
             if original_dfa.start_state in partition:
                 minimized_dfa.start_state = new_state_id
-        
-        # 添加转移
-        for partition in partitions:
-            representative = next(iter(partition))
-            from_state = partition_to_state[frozenset(partition)]
             
-            for symbol in minimized_dfa.alphabet:
+            # 添加转移
+            for symbol in symbols:
                 next_state = original_dfa.transitions.get((representative, symbol))
-                if next_state:
-                    # 找到目标状态所在的分区
-                    target_partition = None
-                    for p in partitions:
-                        if next_state in p:
-                            target_partition = frozenset(p)
-                            break
-                    
-                    if target_partition:
-                        to_state = partition_to_state[target_partition]
-                        minimized_dfa.transitions[(from_state, symbol)] = to_state
+                if next_state is not None:
+                    minimized_dfa.transitions[(new_state_id, symbol)] = partition_to_state[block_of[next_state]]
         
         return minimized_dfa
 